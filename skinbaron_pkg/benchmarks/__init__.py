@@ -0,0 +1,3 @@
+"""
+Benchmarks of the pipeline stages on synthetic payloads. Run with ``python -m skinbaron_pkg.benchmarks run``.
+"""
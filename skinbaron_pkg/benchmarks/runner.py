@@ -0,0 +1,149 @@
+"""
+Runs the stages, saves the results as a JSON baseline and compares two baselines.
+"""
+import datetime
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from .stages import STAGES, clear
+
+SIZES = (1000, 10000, 100000)
+
+
+def measure(setup, run, repeat=5, memory=True):
+    """
+    Times a stage and measures its peak memory.
+    :param setup: Function building the inputs, called before every repeat outside the timed region.
+    :param run: The measured function, called with the inputs.
+    :param repeat (int, optional): Number of timed runs.
+    :param memory (bool, optional): Also run once under tracemalloc for the peak allocation. This is a separate run,
+        tracing slows the code down too much to be timed.
+    :return (dict): seconds_min, seconds_median, repeat and peak_mb (None if memory is False).
+    """
+    times = []
+    for _ in range(repeat):
+        inputs = setup()
+        gc.collect()
+        start = time.perf_counter()
+        run(inputs)
+        times.append(time.perf_counter() - start)
+    peak_mb = None
+    if memory:
+        inputs = setup()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            run(inputs)
+            peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally:
+            tracemalloc.stop()
+    return {'seconds_min': min(times), 'seconds_median': statistics.median(times), 'repeat': repeat,
+            'peak_mb': peak_mb}
+
+
+def run_benchmarks(sizes=SIZES, stages=None, repeat=5, memory=True, log=None):
+    """
+    Runs every stage at every size.
+    :param sizes (iterable, optional): Market sizes (number of listings / price list entries / sales).
+    :param stages (iterable, optional): Stage names (see stages.STAGES), defaults to all.
+    :param repeat (int, optional): Timed runs per stage and size.
+    :param memory (bool, optional): Measure the peak memory too.
+    :param log (file, optional): Progress lines are written here, e.g. sys.stderr.
+    :return (dict): {'meta': {...}, 'results': [{'stage', 'size', 'seconds_min', ...}, ...]}
+    """
+    names = list(stages or STAGES)
+    unknown = [name for name in names if name not in STAGES]
+    if unknown:
+        raise ValueError(f"Unknown stages {unknown}, choose from {list(STAGES)}")
+    results = []
+    for size in sizes:
+        for name in names:
+            setup, run = STAGES[name](size)
+            result = {'stage': name, 'size': size, **measure(setup, run, repeat, memory)}
+            results.append(result)
+            if log is not None:
+                print(_format_row(result), file=log, flush=True)
+        clear()
+    return {'meta': {'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__,
+                     'platform': platform.platform(), 'created': datetime.datetime.now().isoformat(timespec='seconds')},
+            'results': results}
+
+
+def _format_row(result):
+    peak = '-' if result.get('peak_mb') is None else f"{result['peak_mb']:.1f}"
+    return f"{result['stage']:<40} {result['size']:>8} {result['seconds_min'] * 1000:>12.2f} ms {peak:>10} MB"
+
+
+def save(report, path):
+    with open(path, 'w') as fh:
+        json.dump(report, fh, indent=2)
+
+
+def load(path):
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def compare(baseline, current, threshold=0.1, metric='seconds_min'):
+    """
+    Diffs two benchmark reports.
+    :param baseline (dict): Report from run_benchmarks / load.
+    :param current (dict): Report to check against the baseline.
+    :param threshold (float, optional): Relative slowdown (or memory growth) counted as a regression, 0.1 for 10%.
+    :param metric (str, optional): Timing compared, 'seconds_min' or 'seconds_median'.
+    :return (DataFrame): stage, size, the baseline and current time and peak memory, their ratios and a regression
+        flag, for every (stage, size) present in both reports.
+    """
+    columns = ['stage', 'size', metric, 'peak_mb']
+    old = pd.DataFrame(baseline['results'], columns=columns)
+    new = pd.DataFrame(current['results'], columns=columns)
+    diff = old.merge(new, on=['stage', 'size'], suffixes=('_baseline', '_current'))
+    diff['time_ratio'] = diff[f'{metric}_current'] / diff[f'{metric}_baseline']
+    diff['memory_ratio'] = (diff['peak_mb_current'] / diff['peak_mb_baseline']).astype('float64')
+    diff['regression'] = (diff['time_ratio'] > 1 + threshold) | (diff['memory_ratio'] > 1 + threshold)
+    return diff
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='python -m skinbaron_pkg.benchmarks',
+                                     description='Benchmarks the skinbaron_pkg pipeline stages on synthetic payloads.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='run the benchmarks and save the results')
+    run_parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES))
+    run_parser.add_argument('--stages', nargs='+', choices=list(STAGES))
+    run_parser.add_argument('--repeat', type=int, default=5)
+    run_parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc run')
+    run_parser.add_argument('--output', '-o', help='JSON file the results are written to')
+
+    compare_parser = commands.add_parser('compare', help='diff two saved results, exit 1 on regressions')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.1)
+    compare_parser.add_argument('--metric', choices=['seconds_min', 'seconds_median'], default='seconds_min')
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        report = run_benchmarks(args.sizes, args.stages, args.repeat, not args.no_memory, log=sys.stdout)
+        if args.output:
+            save(report, args.output)
+        return 0
+
+    diff = compare(load(args.baseline), load(args.current), args.threshold, args.metric)
+    with pd.option_context('display.width', 200, 'display.max_rows', None):
+        print(diff.to_string(index=False, float_format='{:.4g}'.format))
+    regressions = diff[diff['regression']]
+    if len(regressions):
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}")
+        return 1
+    return 0
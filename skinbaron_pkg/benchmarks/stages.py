@@ -0,0 +1,141 @@
+"""
+The benchmarked pipeline stages. Each stage is a function of the market size returning (setup, run): setup builds the
+inputs outside the timed region and run(inputs) is the measured call.
+
+Payloads come from the simulator's SyntheticMarket: a price list of `size` items, NewestItems / BestDeals pages of
+`size` listings and the GetNewestSales30Days answer to the vague search 'Doppler', about 1.3 * `size` sales.
+"""
+from functools import lru_cache
+
+import pandas as pd
+
+from skinbaron_pkg.src.data_utils import Report_generator
+from skinbaron_pkg.src.dataparsing import DataProcessor
+from skinbaron_pkg.src.market_analysis import ItemFilter
+from skinbaron_pkg.src.simulator import SyntheticMarket
+from skinbaron_pkg.src.visualization_prediction import MarketTrends, PricePrediction
+
+TODAY = '2024-01-01'
+QUERY = 'Doppler'
+FILTERS = [
+    {'itemPrice_between': (5, 50), 'rarityName_in': ['Covert', 'Classified']},
+    {'exteriorName': 'Factory New', 'wear_below': 0.05},
+    {'itemName': 'AK-47 | Redline', 'isSouvenir': False},
+    {'sticker_list': ['Crown (Foil)'], 'itemPrice_between': (0, 100)},
+    {'variantTypeName': 'Knife', 'tradeLockHoursLeft_max': 0},
+]
+
+
+@lru_cache(maxsize=None)
+def _market(size):
+    return SyntheticMarket(items=size, sales_per_item=10, end=TODAY)
+
+
+@lru_cache(maxsize=None)
+def _payloads(size):
+    market = _market(size)
+    return {
+        'GetPriceList': market.get_price_list(),
+        'NewestItems': market.listings(size, 'newestItems', newest=size),
+        'BestDeals': market.listings(size, 'bestDeals', newest=size),
+        'GetNewestSales30Days': market.newest_sales_30_days(QUERY, False, False),
+    }
+
+
+class _PayloadAPI:
+    """
+    Client handed to newestsales_df_pipeline, answering from the pre-built payloads so the JSON is not regenerated
+    inside the timed region.
+    """
+
+    def __init__(self, data):
+        self.data = data
+
+    def __call__(self, api_key=None, app_id=None, **kwargs):
+        return self
+
+    def get_price_list(self):
+        return self.data['GetPriceList']
+
+    def newest_sales_30_days(self, item_name, stat_trak, souvenir, doppler_phase=None):
+        return self.data['GetNewestSales30Days']
+
+
+def _parse(size, endpoint):
+    return lambda: _payloads(size)[endpoint], lambda payload: DataProcessor.json_to_dataframe(payload, endpoint=endpoint)
+
+
+def _filter_frames(size):
+    return (DataProcessor.json_to_dataframe(_payloads(size)['NewestItems'], endpoint='NewestItems'),
+            DataProcessor.json_to_dataframe(_payloads(size)['BestDeals'], endpoint='BestDeals'))
+
+
+def _filter_cold(size):
+    def run(frames):
+        # a new ItemFilter per run, so the merge and index builds are part of the measurement
+        item_filter = ItemFilter(*frames)
+        return [item_filter.filter_items(**spec) for spec in FILTERS]
+    return lambda: _filter_frames(size), run
+
+
+def _filter_warm(size):
+    def setup():
+        item_filter = ItemFilter(*_filter_frames(size))
+        for spec in FILTERS:
+            item_filter.filter_items(**spec)
+        return item_filter
+    return setup, lambda item_filter: [item_filter.filter_items(**spec) for spec in FILTERS]
+
+
+def _pipeline_inputs(size):
+    Report_generator.clear_name_cache()
+    return Report_generator('', ''), _PayloadAPI(_payloads(size))
+
+
+def _run_pipeline(inputs):
+    report, api = inputs
+    return report.newestsales_df_pipeline(
+        api, lambda payload: DataProcessor.json_to_dataframe(payload, endpoint='auto'),
+        lambda pricelist_df, df: report.cheapest(pricelist_df, df, verbose=False),
+        report.separate_item_and_condition, '', '', QUERY, False, False)
+
+
+def _pipeline(size):
+    return lambda: _pipeline_inputs(size), _run_pipeline
+
+
+@lru_cache(maxsize=None)
+def _merged(size):
+    return _run_pipeline(_pipeline_inputs(size))
+
+
+def _price_trend(size):
+    return lambda: _merged(size), lambda merged: MarketTrends.price_trend(merged, plot=False)
+
+
+def _price_prediction(size):
+    def setup():
+        return MarketTrends.price_trend(_merged(size), plot=False)
+    return setup, lambda trend_df: PricePrediction.price_prediction(trend_df, today=pd.Timestamp(TODAY))
+
+
+STAGES = {
+    'json_to_dataframe/GetPriceList': lambda size: _parse(size, 'GetPriceList'),
+    'json_to_dataframe/NewestItems': lambda size: _parse(size, 'NewestItems'),
+    'json_to_dataframe/BestDeals': lambda size: _parse(size, 'BestDeals'),
+    'json_to_dataframe/GetNewestSales30Days': lambda size: _parse(size, 'GetNewestSales30Days'),
+    'filter_items/cold': _filter_cold,
+    'filter_items/warm': _filter_warm,
+    'newestsales_df_pipeline': _pipeline,
+    'price_trend': _price_trend,
+    'price_prediction': _price_prediction,
+}
+
+
+def clear():
+    """
+    Drops the cached payloads and intermediate frames.
+    """
+    _market.cache_clear()
+    _payloads.cache_clear()
+    _merged.cache_clear()
@@ -1,3 +1,57 @@
-# read version from installed package
-from importlib.metadata import version
-__version__ = version("skinbaron_pkg")
\ No newline at end of file
+from importlib import import_module
+
+# public name -> module defining it. Modules are imported on first attribute access (PEP 562), so
+# `from skinbaron_pkg.src import SkinBaronAPI` loads the client (requests) only, and pandas, matplotlib etc. load
+# when something needing them is used.
+_EXPORTS = {
+    'SkinBaronAPI': 'skinbaron_api',
+    'SkinBaronAPIError': 'skinbaron_api',
+    'SkinBaronConnectionError': 'skinbaron_api',
+    'SkinBaronHTTPError': 'skinbaron_api',
+    'SkinBaronRateLimitError': 'skinbaron_api',
+    'SkinBaronResponseError': 'skinbaron_api',
+    'AsyncSkinBaronAPI': 'async_api',
+    'TokenBucket': 'rate_limit',
+    'ResponseCache': 'cache',
+    'MemoryCache': 'cache',
+    'DiskCache': 'cache',
+    'METRICS': 'instrumentation',
+    'Metrics': 'instrumentation',
+    'DataProcessor': 'dataparsing',
+    'ItemFilter': 'market_analysis',
+    'Report_generator': 'data_utils',
+    'MarketTrends': 'visualization_prediction',
+    'PricePrediction': 'visualization_prediction',
+    'MODELS': 'forecasting',
+    'backtest': 'forecasting',
+    'TimeSeriesStore': 'timeseries',
+    'SQLiteHistory': 'history',
+    'ParquetHistory': 'history',
+    'NewestItemsPoller': 'poller',
+    'AlertEngine': 'alerts',
+    'SpreadScanner': 'arbitrage',
+    'SyntheticMarket': 'simulator',
+    'SimulatorServer': 'simulator',
+    'RequestScheduler': 'scheduler',
+    'ItemIndex': 'search',
+}
+
+__all__ = ['__version__'] + list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name == '__version__':
+        # read version from installed package, importlib.metadata alone takes longer than the rest of this file
+        from importlib.metadata import version
+        value = globals()['__version__'] = version("skinbaron_pkg")
+        return value
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
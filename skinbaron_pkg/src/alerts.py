@@ -0,0 +1,318 @@
+import itertools
+import math
+from bisect import bisect_right
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .market_analysis import ItemFilter
+    from .poller import SeenSet
+except ImportError:
+    from market_analysis import ItemFilter
+    from poller import SeenSet
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value)) or value is pd.NA
+
+
+class _PrefixMasks:
+    """
+    ORs of the first i of a list of alert bits. Checkpoints are kept every STEP bits and the rest is ORed in on demand,
+    so memory stays linear in the number of alerts while a lookup costs at most STEP small ORs.
+    """
+
+    STEP = 64
+
+    __slots__ = ('bits', 'checkpoints')
+
+    def __init__(self, bits):
+        self.bits = list(bits)
+        self.checkpoints = [0]
+        for start in range(0, len(self.bits), self.STEP):
+            mask = self.checkpoints[-1]
+            for bit in self.bits[start:start + self.STEP]:
+                mask |= bit
+            self.checkpoints.append(mask)
+
+    def __getitem__(self, count):
+        block, rest = divmod(count, self.STEP)
+        mask = self.checkpoints[block]
+        for bit in self.bits[block * self.STEP:block * self.STEP + rest]:
+            mask |= bit
+        return mask
+
+    def total(self):
+        return self.checkpoints[-1]
+
+
+class _Bounds:
+    """
+    Lower and upper bounds that registered alerts put on one numeric column, indexed so one bisect per bound side
+    finds every alert a value satisfies. Strict bounds are turned into inclusive ones with nextafter.
+    """
+
+    __slots__ = ('lows', 'low_masks', 'highs', 'high_masks', 'unbounded_low', 'unbounded_high')
+
+    def __init__(self, alerts, all_bits):
+        lows = sorted((low, bit) for bit, (low, _) in alerts if low is not None)
+        # highs sorted descending, so the alerts admitting a value (high >= value) form a prefix
+        highs = sorted(((high, bit) for bit, (_, high) in alerts if high is not None), reverse=True)
+        self.lows = [low for low, _ in lows]
+        self.low_masks = _PrefixMasks(bit for _, bit in lows)
+        self.highs = [-high for high, _ in highs]
+        self.high_masks = _PrefixMasks(bit for _, bit in highs)
+        self.unbounded_low = all_bits & ~self.low_masks.total()
+        self.unbounded_high = all_bits & ~self.high_masks.total()
+
+    def mask(self, value):
+        """
+        :return (int): Bits of the alerts whose bounds on this column admit `value`.
+        """
+        if _is_missing(value):
+            return self.unbounded_low & self.unbounded_high
+        low_ok = self.unbounded_low | self.low_masks[bisect_right(self.lows, value)]
+        high_ok = self.unbounded_high | self.high_masks[bisect_right(self.highs, -value)]
+        return low_ok & high_ok
+
+
+def _positions(mask):
+    """
+    Positions of the set bits of an int, in increasing order.
+    """
+    if not mask:
+        return []
+    packed = np.frombuffer(mask.to_bytes((mask.bit_length() + 7) // 8, 'little'), dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(packed, bitorder='little')).tolist()
+
+
+class AlertEngine:
+    """
+    Standing deal alerts: many registered filter specs matched against every incoming listing at once.
+
+    A spec takes the same arguments as ItemFilter.filter_items plus `min_discount`, the minimum discount of the
+    listing's itemPrice against a reference price (the lowest price of its marketHashName in GetPriceList).
+
+    Specs are compiled into per-attribute indexes of alert bitmaps (Python ints, one bit per alert): for equality /
+    'in' predicates a dict from value to the bits of the alerts accepting it, for range predicates sorted bounds with
+    prefix bitmaps. Matching a listing ANDs one bitmap per indexed attribute, so its cost depends on the number of
+    attributes used, not on the number of registered alerts. Only sticker_list requirements are checked per alert,
+    and only for alerts that survived every other attribute.
+
+    Attributes:
+        references (dict): Reference price per marketHashName.
+        notified (SeenSet): (alert_id, salesId) pairs already reported by scan / poll_best_deals.
+
+    Example:
+    ```
+    engine = AlertEngine()
+    engine.register('cheap-redline', itemName='AK-47 | Redline', exteriorName='Field-Tested', min_discount=0.15)
+    engine.register('low-float-knife', rarityName='Covert', wear_below=0.01, itemPrice_between=(0, 500))
+    engine.set_reference_prices(api.get_price_list())
+    for alert_id, listing in engine.scan(NewestItemsPoller(api)):
+        print(alert_id, listing['itemName'], listing['itemPrice'])
+    ```
+    """
+
+    def __init__(self, notified_capacity=100000):
+        self.references = {}
+        self.notified = SeenSet(notified_capacity)
+        self._specs = {}
+        self._ids = itertools.count()
+        self._compiled = None
+
+    def __len__(self):
+        return len(self._specs)
+
+    def register(self, alert_id=None, min_discount=None, **filters):
+        """
+        Registers an alert.
+        :param alert_id (hashable, optional): Id reported when the alert matches, defaults to a running number.
+        :param min_discount (float, optional): Minimum discount against the reference price, e.g. 0.2 for 20% below.
+        :param filters: ItemFilter.filter_items arguments (itemName, rarityName_in, itemPrice_between, where, ...).
+        :return: The alert id.
+        """
+        if alert_id is None:
+            alert_id = next(self._ids)
+        predicates = ItemFilter.predicates(**filters)
+        if min_discount is not None:
+            predicates.append(('discount', '>=', min_discount))
+        for column, op, value in predicates:
+            if op not in ('==', 'in', 'round==', 'between', '<', '<=', '>', '>=', 'contains'):
+                raise ValueError(f"Unknown predicate operator {op!r}")
+        self._specs[alert_id] = predicates
+        self._compiled = None
+        return alert_id
+
+    def unregister(self, alert_id):
+        """
+        Removes an alert.
+        :raises KeyError: If no alert has this id.
+        """
+        del self._specs[alert_id]
+        self._compiled = None
+
+    def set_reference_prices(self, pricelist):
+        """
+        Sets the prices discounts are measured against.
+        :param pricelist (dict or DataFrame): A GetPriceList response or its parsed DataFrame, with marketHashName and
+            lowestPrice. Items listed several times (e.g. doppler phases) keep their lowest price.
+        """
+        if isinstance(pricelist, dict):
+            pricelist = pd.DataFrame(pricelist.get('map') or [], columns=['marketHashName', 'lowestPrice'])
+        lowest = pricelist.groupby(pricelist['marketHashName'].astype(object))['lowestPrice'].min()
+        self.references = {name: float(price) for name, price in lowest.items()}
+
+    def _compile(self):
+        """
+        Builds the bitmap indexes of all registered alerts.
+        """
+        ids = list(self._specs)
+        all_bits = (1 << len(ids)) - 1
+        equal = {}
+        bounds = {}
+        stickers = {}
+        for position, alert_id in enumerate(ids):
+            bit = 1 << position
+            accepted = {}
+            ranges = {}
+            for column, op, value in self._specs[alert_id]:
+                if op == 'contains':
+                    stickers[bit] = set(value)
+                elif op in ('==', 'in', 'round=='):
+                    key = ('round', column) if op == 'round==' else column
+                    values = set(value) if op == 'in' else {value}
+                    accepted[key] = accepted[key] & values if key in accepted else values
+                else:
+                    low, high = ranges.get(column, (None, None))
+                    if op == 'between':
+                        new_low, new_high = value
+                    else:
+                        new_low = value if op in ('>', '>=') else None
+                        new_high = value if op in ('<', '<=') else None
+                        if op == '>':
+                            new_low = np.nextafter(float(value), math.inf)
+                        elif op == '<':
+                            new_high = np.nextafter(float(value), -math.inf)
+                    if new_low is not None:
+                        low = float(new_low) if low is None else max(low, float(new_low))
+                    if new_high is not None:
+                        high = float(new_high) if high is None else min(high, float(new_high))
+                    ranges[column] = (low, high)
+            for key, values in accepted.items():
+                index = equal.setdefault(key, [0, {}])
+                index[0] |= bit
+                for value in values:
+                    index[1][value] = index[1].get(value, 0) | bit
+            for column, bound in ranges.items():
+                bounds.setdefault(column, []).append((bit, bound))
+
+        equal = {key: (all_bits & ~constrained, masks) for key, (constrained, masks) in equal.items()}
+        bounds = {column: _Bounds(alerts, all_bits) for column, alerts in bounds.items()}
+        sticker_bits = 0
+        for bit in stickers:
+            sticker_bits |= bit
+        self._compiled = (ids, all_bits, equal, bounds, stickers, sticker_bits)
+
+    def _values(self, listing):
+        """
+        The listing's attributes as filters see them: sticker_count / sticker_list from the raw stickers and the
+        discount against the reference price.
+        """
+        values = dict(listing)
+        stickers = listing.get('stickers')
+        if 'sticker_list' not in values:
+            names = [sticker['localizedName'] for sticker in stickers] if isinstance(stickers, list) else []
+            values['sticker_list'] = names
+            values.setdefault('sticker_count', len(names))
+        reference = self.references.get(listing.get('marketHashName'))
+        price = listing.get('itemPrice')
+        if 'discount' not in values:
+            values['discount'] = 1 - price / reference if reference and not _is_missing(price) else None
+        return values
+
+    def match(self, listing):
+        """
+        Finds the alerts a listing triggers.
+        :param listing (dict): A listing from NewestItems / BestDeals (raw JSON record or a DataFrame row as dict).
+        :return (list): Ids of the matching alerts, in registration order.
+        """
+        if self._compiled is None:
+            self._compile()
+        ids, mask, equal, bounds, stickers, sticker_bits = self._compiled
+        if not mask:
+            return []
+        values = self._values(listing)
+        for key, (unconstrained, masks) in equal.items():
+            if isinstance(key, tuple):
+                value = values.get(key[1])
+                value = None if _is_missing(value) else round(value)
+            else:
+                value = values.get(key)
+                if _is_missing(value):
+                    value = None
+            mask &= unconstrained | (masks.get(value, 0) if value is not None else 0)
+            if not mask:
+                return []
+        for column, index in bounds.items():
+            mask &= index.mask(values.get(column))
+            if not mask:
+                return []
+        if mask & sticker_bits:
+            names = set(values['sticker_list'] or [])
+            for position in _positions(mask & sticker_bits):
+                if not stickers[1 << position] <= names:
+                    mask &= ~(1 << position)
+        return [ids[position] for position in _positions(mask)]
+
+    def match_frame(self, df):
+        """
+        Matches every row of a parsed listings frame.
+        :param df (DataFrame): Listings, e.g. DataProcessor.json_to_dataframe(api.best_deals(100)).
+        :return (DataFrame): One (row, alert_id) pair per match, row being the position in df.
+        """
+        columns = {}
+        for column in df.columns:
+            series = df[column]
+            if series.dtype == np.float32:
+                # the shortest repr of a float32 is the decimal it was parsed from, e.g. 12.3 and not 12.300000190734863
+                columns[column] = series.to_numpy().astype(str).astype(np.float64)
+            else:
+                columns[column] = series.astype(object).where(series.notna(), None).to_numpy()
+        names = list(columns)
+        pairs = []
+        for row, values in enumerate(zip(*columns.values())):
+            for alert_id in self.match(dict(zip(names, values))):
+                pairs.append((row, alert_id))
+        return pd.DataFrame(pairs, columns=['row', 'alert_id'])
+
+    def scan(self, batches):
+        """
+        Matches a stream of listing batches, reporting every (alert, listing) pair once.
+        :param batches (iterable): DataFrames of listings, e.g. a NewestItemsPoller.
+        :return (generator): (alert_id, listing as dict) tuples.
+        """
+        for df in batches:
+            records = df.to_dict('records')
+            for row, alert_id in self.match_frame(df).itertuples(index=False):
+                listing = records[row]
+                if self.notified.add((alert_id, listing.get('salesId'))):
+                    yield alert_id, listing
+
+    def poll_best_deals(self, api, general_pipeline, size=100, refresh_reference=False):
+        """
+        One deal-alert cycle: fetches BestDeals (and the price list if no reference prices are set yet) and reports
+        the alerts that fire for listings not reported before.
+        :param api (SkinBaronAPI): Client, ideally with a ResponseCache so the price list is not downloaded every cycle.
+        :param general_pipeline: Function parsing a response into a DataFrame (DataProcessor.json_to_dataframe).
+        :param size (int, optional): Number of best deals fetched, max 100.
+        :param refresh_reference (bool, optional): Re-fetch the reference prices even if some are set.
+        :return (list): (alert_id, listing as dict) tuples.
+        """
+        if refresh_reference or not self.references:
+            self.set_reference_prices(api.get_price_list())
+        deals = general_pipeline(api.best_deals(size))
+        if deals is None or deals.empty:
+            return []
+        return list(self.scan([deals]))
@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+
+
+def _phase(series):
+    """
+    Doppler phase as a join key: missing values and the API's '-' placeholder become ''.
+    """
+    series = series.astype(object)
+    return series.where(series.notna() & (series != '-'), '').astype(str)
+
+
+class SpreadScanner:
+    """
+    Market-wide spread scanner: compares every item's lowest ask in GetPriceList with its recent median sale price.
+
+    Everything is computed with grouped and element-wise pandas/NumPy operations over the whole market at once:
+    sale statistics per item, the join with the price list, spread, liquidity, expected profit after fees and a
+    top-K selection with argpartition.
+
+    Attributes:
+        fee (float): Share of the resale price lost to marketplace fees.
+        window_days (float): Length of the sales window the statistics cover, used for sales per day.
+        min_sales (int): Items with fewer recent sales are left out, their median is not trustworthy.
+
+    Example:
+    ```
+    scanner = SpreadScanner(fee=0.15)
+    stats = SpreadScanner.sale_statistics(history.query(start='2023-11-01'), window_days=30)
+    top = scanner.scan(DataProcessor.json_to_dataframe(api.get_price_list()), stats, top=25)
+    print(top[['marketHashName', 'lowestPrice', 'median_price', 'expected_profit', 'sales_per_day']])
+    ```
+    """
+
+    SORT_KEYS = ('score', 'expected_profit', 'roi', 'spread_pct', 'sales_per_day')
+
+    def __init__(self, fee=0.15, window_days=30, min_sales=3):
+        """
+        Initializes the SpreadScanner class
+        :param fee (float, optional): Share of the resale price lost to marketplace fees.
+        :param window_days (float, optional): Length of the sales window, used for sales per day.
+        :param min_sales (int, optional): Minimum number of recent sales an item needs to be ranked.
+        """
+        self.fee = fee
+        self.window_days = window_days
+        self.min_sales = min_sales
+
+    @staticmethod
+    def sale_statistics(sales_df, window_days=30, now=None):
+        """
+        Aggregates individual sales into per-item statistics.
+        :param sales_df (DataFrame): One row per sale with itemName (the market hash name), price, dateSold and
+            optionally dopplerPhase, e.g. parsed GetNewestSales30Days responses or SQLiteHistory.query().
+        :param window_days (float, optional): Only sales from the last window_days days (before `now`) are counted.
+        :param now (str or datetime, optional): End of the window, defaults to the latest sale.
+        :return (DataFrame): marketHashName, dopplerPhase ('' if none), sales, sales_per_day, median_price,
+            mean_price, min_price, max_price and last_sale, one row per item.
+        """
+        dates = pd.to_datetime(sales_df['dateSold'])
+        end = pd.Timestamp(now) if now is not None else dates.max()
+        recent = (dates > end - pd.Timedelta(days=window_days)) & (dates <= end)
+        df = pd.DataFrame({
+            'marketHashName': sales_df['itemName'].astype(object).to_numpy(),
+            'dopplerPhase': (_phase(sales_df['dopplerPhase']).to_numpy() if 'dopplerPhase' in sales_df.columns
+                             else ''),
+            'price': sales_df['price'].astype('float64').to_numpy(),
+            'dateSold': dates.to_numpy(),
+        })[recent.to_numpy()]
+        stats = df.groupby(['marketHashName', 'dopplerPhase'], sort=False).agg(
+            sales=('price', 'size'), median_price=('price', 'median'), mean_price=('price', 'mean'),
+            min_price=('price', 'min'), max_price=('price', 'max'), last_sale=('dateSold', 'max')).reset_index()
+        stats.insert(3, 'sales_per_day', stats['sales'] / window_days)
+        return stats
+
+    def scan(self, pricelist_df, statistics, top=50, sort_by='score', max_price=None, min_quantity=1):
+        """
+        Ranks the market by the profit of buying at the lowest ask and reselling at the recent median.
+        :param pricelist_df (DataFrame): Parsed GetPriceList with marketHashName, lowestPrice and optionally quantity,
+            dopplerClassName, statTrak, souvenir and url.
+        :param statistics (DataFrame): Output of sale_statistics, or raw sales which are then aggregated here.
+        :param top (int, optional): Number of items returned, None for all.
+        :param sort_by (str, optional): Ranking column, one of SORT_KEYS. 'score' is the expected profit scaled down
+            for items selling less than once a day, so rarely traded items do not top the list.
+        :param max_price (float, optional): Leave out items whose lowest ask is above this budget.
+        :param min_quantity (int, optional): Minimum number of listings of the item.
+        :return (DataFrame): The price list columns plus the statistics, spread (median - lowest ask), spread_pct,
+            expected_profit (median after fees - lowest ask), roi and score, best first.
+        """
+        if sort_by not in self.SORT_KEYS:
+            raise ValueError(f"sort_by must be one of {self.SORT_KEYS}")
+        if 'median_price' not in statistics.columns:
+            statistics = self.sale_statistics(statistics, self.window_days)
+
+        prices = pricelist_df.copy()
+        prices['marketHashName'] = prices['marketHashName'].astype(object)
+        prices['dopplerPhase'] = (_phase(prices['dopplerClassName']) if 'dopplerClassName' in prices.columns
+                                  else '')
+        merged = prices.merge(statistics, on=['marketHashName', 'dopplerPhase'], how='inner')
+
+        ask = merged['lowestPrice'].to_numpy(dtype=np.float64)
+        median = merged['median_price'].to_numpy(dtype=np.float64)
+        sales_per_day = merged['sales_per_day'].to_numpy(dtype=np.float64)
+        keep = (merged['sales'].to_numpy() >= self.min_sales) & (ask > 0)
+        if max_price is not None:
+            keep &= ask <= max_price
+        if 'quantity' in merged.columns and min_quantity:
+            keep &= merged['quantity'].to_numpy(dtype=np.float64, na_value=0) >= min_quantity
+        merged = merged[keep].reset_index(drop=True)
+        ask, median, sales_per_day = ask[keep], median[keep], sales_per_day[keep]
+
+        expected_profit = median * (1 - self.fee) - ask
+        merged['spread'] = median - ask
+        merged['spread_pct'] = merged['spread'].to_numpy() / ask
+        merged['expected_profit'] = expected_profit
+        merged['roi'] = expected_profit / ask
+        merged['score'] = expected_profit * np.minimum(1.0, sales_per_day)
+
+        key = merged[sort_by].to_numpy()
+        if top is not None and top < len(merged):
+            # argpartition finds the top rows in linear time, only those are sorted
+            candidates = np.argpartition(-key, top - 1)[:top]
+        else:
+            candidates = np.arange(len(merged))
+        order = candidates[np.argsort(-key[candidates], kind='stable')]
+        return merged.iloc[order].reset_index(drop=True)
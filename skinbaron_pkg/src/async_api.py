@@ -0,0 +1,140 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from .skinbaron_api import SkinBaronAPI, sales_query
+    from .rate_limit import TokenBucket
+except ImportError:
+    from skinbaron_api import SkinBaronAPI, sales_query
+    from rate_limit import TokenBucket
+
+
+class AsyncSkinBaronAPI:
+    """
+    An asyncio twin of SkinBaronAPI.
+    provides the same four endpoints as coroutines plus gather_newest_sales, which fans GetNewestSales30Days out over
+    a whole watchlist concurrently.
+
+    Requests are sent by a wrapped SkinBaronAPI on a thread pool, so they share its keep-alive connection pool,
+    retry/backoff policy and typed exceptions. A bounded semaphore caps the number of requests in flight and an
+    optional shared TokenBucket caps the request rate across every coroutine using this client.
+
+    Attributes:
+        client (SkinBaronAPI): The wrapped synchronous client doing the actual HTTP work.
+        concurrency (int): Default maximum number of requests in flight.
+        rate_limiter (TokenBucket): Shared limiter every request waits on, None for no rate limit.
+    """
+
+    def __init__(self, api_key, app_id, concurrency=10, rate_limit=None, burst=None, rate_limiter=None,
+                 **client_kwargs):
+        """
+        Initializes the AsyncSkinBaronAPI class
+        :param api_key: API key for the SkinBaron API.
+        :param app_id: Application ID for the SkinBaron account.
+        :param concurrency (int, optional): Maximum number of requests in flight, also the connection pool size.
+        :param rate_limit (float, optional): Maximum requests per second, None for no limit.
+        :param burst (float, optional): Token-bucket capacity, i.e. how many requests may go out back to back.
+        :param rate_limiter (TokenBucket, optional): Existing limiter to share with other clients, overrides rate_limit.
+        :param client_kwargs: Extra keyword arguments passed on to SkinBaronAPI (timeouts, max_retries, base_url, ...).
+        """
+        self.client = SkinBaronAPI(api_key, app_id, pool_size=concurrency, **client_kwargs)
+        self.concurrency = concurrency
+        if rate_limiter is None and rate_limit is not None:
+            rate_limiter = TokenBucket(rate_limit, burst)
+        self.rate_limiter = rate_limiter
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="skinbaron")
+
+    async def close(self):
+        """
+        Shuts down the worker threads and closes the pooled connections. Waiting for the requests still in flight
+        happens on a helper thread, so other tasks keep running meanwhile.
+        """
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown, True)
+        self.client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def _post_request(self, endpoint, data):
+        """
+        Waits for the rate limiter, then sends a POST request on the worker pool.
+        :param endpoint (str): The API endpoint to which the request is sent.
+        :param data (dict): Data to be sent in the request.
+        :return (dict): JSON response from the API.
+        :raises SkinBaronAPIError: Whatever SkinBaronAPI._post_request raises.
+        """
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire_async()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.client._post_request, endpoint, data)
+
+    async def get_price_list(self):
+        """
+        Fetches the price list from the SkinBaron API.
+        :return (dict): JSON response of the price list data.
+        """
+        return await self._post_request("GetPriceList", {})
+
+    async def newest_items(self, size):
+        """
+        Fetches the list of newest items based on the specified size.
+        :param size (int): The number of newest items to retrieve. limit: max 100
+        :return (dict): JSON response of the newest listed items.
+        """
+        return await self._post_request("NewestItems", {"size": size})
+
+    async def best_deals(self, size):
+        """
+        Fetches the list of best deals based on the specified size.
+        :param size (int): The number of best deals to retrieve. limit: max 100
+        :return (dict): JSON response of the best deals listed on market.
+        """
+        return await self._post_request("BestDeals", {"size": size})
+
+    async def newest_sales_30_days(self, item_name, stat_trak, souvenir, doppler_phase=None):
+        """
+        Fetches the sales data for the last 30 days for a specific item.
+        :param item_name (str): Name of the item. (this do not have to be precise)
+        :param stat_trak (bool): whether the item is StatTrak.
+        :param souvenir (bool): whether the item is a souvenir.
+        :param doppler_phase (str, optional): The doppler phase of the item.
+        :return dict: JSON response of the historical trading data for the last 30 days.
+        """
+        data = {
+            "itemName": item_name,
+            "statTrak": stat_trak,
+            "souvenir": souvenir
+        }
+        if doppler_phase:
+            data["dopplerPhase"] = doppler_phase
+        return await self._post_request("GetNewestSales30Days", data)
+
+    async def gather_newest_sales(self, items, concurrency=None, return_exceptions=False):
+        """
+        Fetches the 30-day sales history of many items concurrently.
+
+        At most `concurrency` requests are in flight at once (never more than the client's worker pool) and every
+        request also waits on the shared rate limiter, so a large watchlist neither floods the API nor the local pool.
+
+        :param items (iterable): Watchlist entries, see skinbaron_api.sales_query for the accepted shapes.
+        :param concurrency (int, optional): Maximum number of requests in flight, defaults to the client's concurrency.
+        :param return_exceptions (bool, optional): If True, failed items yield their exception in place of a result
+            instead of cancelling the whole sweep.
+        :return (list): JSON responses in the same order as `items`.
+
+        Example:
+        ```
+        async with AsyncSkinBaronAPI(token, appID, concurrency=16, rate_limit=20) as api:
+            results = await api.gather_newest_sales(['AK-47 | Redline', ('★ Butterfly Knife | Gamma Doppler', False, False)])
+        ```
+        """
+        semaphore = asyncio.Semaphore(concurrency or self.concurrency)
+
+        async def fetch(item):
+            async with semaphore:
+                return await self.newest_sales_30_days(*sales_query(item))
+
+        return await asyncio.gather(*(fetch(item) for item in items), return_exceptions=return_exceptions)
@@ -0,0 +1,327 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheEntry:
+    """
+    One cached API response.
+
+    Attributes:
+        value (dict): The decoded JSON response. ResponseCache hands out copies of it, so it is never mutated.
+        size (int): Size of the response body in bytes, used for the byte counters and the memory budget.
+        stored_at (float): Time the entry was (re)validated.
+        expires_at (float): Time after which the entry is stale and has to be refreshed.
+        validators (dict): 'etag' / 'last_modified' sent back by the server, used for conditional refresh.
+    """
+
+    __slots__ = ('value', 'size', 'stored_at', 'expires_at', 'validators')
+
+    def __init__(self, value, size, stored_at, expires_at, validators=None):
+        self.value = value
+        self.size = size
+        self.stored_at = stored_at
+        self.expires_at = expires_at
+        self.validators = validators or {}
+
+    def is_fresh(self, now):
+        return now < self.expires_at
+
+
+class MemoryCache:
+    """
+    In-memory LRU backend for ResponseCache.
+
+    Attributes:
+        max_entries (int): Maximum number of entries kept, least recently used entries are evicted first.
+        max_bytes (int): Maximum total response size kept, None for no byte budget.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while self._entries and (len(self._entries) > self.max_entries or
+                                     (self.max_bytes is not None and self._bytes > self.max_bytes)):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+
+    def delete(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry.size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DiskCache:
+    """
+    On-disk backend for ResponseCache, one JSON file per entry.
+    Survives process restarts, so short-lived jobs can share a price list downloaded by an earlier run.
+
+    Attributes:
+        directory (str): Directory the entries are written to, created if missing.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if stored.get('key') != key:
+            return None
+        return CacheEntry(stored['value'], stored['size'], stored['stored_at'], stored['expires_at'],
+                          stored.get('validators'))
+
+    def set(self, key, entry):
+        stored = {
+            'key': key,
+            'size': entry.size,
+            'stored_at': entry.stored_at,
+            'expires_at': entry.expires_at,
+            'validators': entry.validators,
+            'value': entry.value,
+        }
+        # write to a temporary file first so readers never see a half-written entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(stored, f)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                os.remove(os.path.join(self.directory, name))
+
+    def __len__(self):
+        return sum(1 for name in os.listdir(self.directory) if name.endswith('.json'))
+
+
+class _InFlight:
+    """
+    A fetch in progress that other callers asking for the same key wait on.
+    """
+
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResponseCache:
+    """
+    A TTL response cache that sits under SkinBaronAPI.
+
+    Fresh entries are answered locally. Stale entries are refreshed with a conditional request (If-None-Match /
+    If-Modified-Since) when the server handed out validators, so an unchanged price list costs a 304 instead of the
+    full payload. Concurrent callers asking for the same request share one in-flight fetch.
+
+    Attributes:
+        DEFAULT_TTLS (dict): Seconds each endpoint's responses stay fresh. Endpoints missing here are not cached.
+        backend (MemoryCache or DiskCache): Where the entries are stored.
+        ttls (dict): Per-endpoint TTLs in effect.
+        hits (int): Requests answered from a fresh entry.
+        misses (int): Requests that downloaded a full response.
+        revalidated (int): Stale entries the server confirmed unchanged (304).
+        coalesced (int): Requests that waited on another caller's in-flight fetch instead of sending their own.
+        bytes_saved (int): Response bytes not downloaded thanks to hits, revalidations and coalescing.
+        bytes_fetched (int): Response bytes actually downloaded.
+        copy_values (bool): Whether callers get their own copy of every response, see __init__.
+
+    Example:
+    ```
+    cache = ResponseCache(DiskCache('~/.cache/skinbaron'), ttls={'GetPriceList': 1800})
+    api = SkinBaronAPI(api_key=token, app_id=appID, cache=cache)
+    api.get_price_list()  # downloads
+    api.get_price_list()  # answered locally
+    print(cache.stats())
+    ```
+    """
+
+    DEFAULT_TTLS = {
+        "GetPriceList": 3600,
+        "GetNewestSales30Days": 900,
+        "NewestItems": 5,
+        "BestDeals": 5,
+    }
+
+    def __init__(self, backend=None, ttls=None, clock=time.time, copy_values=True):
+        """
+        Initializes the ResponseCache class
+        :param backend (MemoryCache or DiskCache, optional): Storage backend, defaults to a MemoryCache.
+        :param ttls (dict, optional): Per-endpoint TTLs in seconds overriding DEFAULT_TTLS, 0 disables caching an endpoint.
+        :param clock (callable, optional): Returns the current time in seconds, replaceable in tests.
+        :param copy_values (bool, optional): Return a copy of the cached response to every caller, so a caller
+            mutating its response does not change it for later hits. Pass False to share the stored object when
+            every caller treats responses as read-only (a copy of a full price list takes tens of milliseconds).
+        """
+        self.backend = backend if backend is not None else MemoryCache()
+        self.ttls = dict(self.DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.clock = clock
+        self.copy_values = copy_values
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.coalesced = 0
+        self.bytes_saved = 0
+        self.bytes_fetched = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _hand_out(self, value):
+        # a pickle round trip copies JSON-like data several times faster than copy.deepcopy
+        return pickle.loads(pickle.dumps(value, pickle.HIGHEST_PROTOCOL)) if self.copy_values else value
+
+    @staticmethod
+    def make_key(endpoint, data):
+        """
+        Builds the cache key of a request.
+        :param endpoint (str): The API endpoint.
+        :param data (dict): The request data, without credentials.
+        :return (str): A key that is identical for identical requests.
+        """
+        return endpoint + ':' + json.dumps(data, sort_keys=True, separators=(',', ':'))
+
+    def fetch(self, endpoint, data, conditional_fetch):
+        """
+        Answers a request from the cache, or fetches it once and stores the result.
+        :param endpoint (str): The API endpoint.
+        :param data (dict): The request data, without credentials.
+        :param conditional_fetch (callable): conditional_fetch(endpoint, data, validators) returning
+            (json, size, validators), or None if the server confirmed the cached copy (304).
+        :return (dict): The JSON response.
+        """
+        ttl = self.ttls.get(endpoint, 0)
+        if ttl <= 0:
+            return conditional_fetch(endpoint, data)[0]
+
+        key = self.make_key(endpoint, data)
+        entry = self.backend.get(key)
+        if entry is not None and entry.is_fresh(self.clock()):
+            with self._lock:
+                self.hits += 1
+                self.bytes_saved += entry.size
+            return self._hand_out(entry.value)
+
+        with self._lock:
+            inflight = self._inflight.get(key)
+            leader = inflight is None
+            if leader:
+                inflight = self._inflight[key] = _InFlight()
+
+        if not leader:
+            inflight.done.wait()
+            if inflight.error is not None:
+                raise inflight.error
+            with self._lock:
+                self.coalesced += 1
+                self.bytes_saved += inflight.value.size
+            return self._hand_out(inflight.value.value)
+
+        try:
+            result = conditional_fetch(endpoint, data, entry.validators if entry is not None else None)
+            now = self.clock()
+            if result is None and entry is not None:
+                entry = CacheEntry(entry.value, entry.size, now, now + ttl, entry.validators)
+                with self._lock:
+                    self.revalidated += 1
+                    self.bytes_saved += entry.size
+            else:
+                if result is None:
+                    # 304 without a cached copy (evicted meanwhile): fetch unconditionally
+                    result = conditional_fetch(endpoint, data)
+                value, size, validators = result
+                entry = CacheEntry(value, size, now, now + ttl, validators)
+                with self._lock:
+                    self.misses += 1
+                    self.bytes_fetched += size
+            self.backend.set(key, entry)
+            inflight.value = entry
+            return self._hand_out(entry.value)
+        except BaseException as e:
+            inflight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            inflight.done.set()
+
+    def invalidate(self, endpoint=None, data=None):
+        """
+        Drops cached entries.
+        :param endpoint (str, optional): Endpoint of the entry to drop; if omitted the whole cache is cleared.
+        :param data (dict, optional): Request data of the entry to drop.
+        """
+        if endpoint is None:
+            self.backend.clear()
+        else:
+            self.backend.delete(self.make_key(endpoint, data or {}))
+
+    def stats(self):
+        """
+        Reports the cache counters.
+        :return (dict): hits, misses, revalidated, coalesced, bytes_saved, bytes_fetched and hit_ratio.
+        """
+        with self._lock:
+            served = self.hits + self.revalidated + self.coalesced
+            total = served + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidated": self.revalidated,
+                "coalesced": self.coalesced,
+                "bytes_saved": self.bytes_saved,
+                "bytes_fetched": self.bytes_fetched,
+                "hit_ratio": served / total if total else 0.0,
+            }
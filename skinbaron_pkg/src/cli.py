@@ -0,0 +1,339 @@
+"""
+Command line interface, installed as the `skinbaron` command.
+
+Every subcommand writes its rows as NDJSON (default), CSV or Parquet, chunk by chunk, to stdout or --output, so the
+output can be piped into other jobs without holding a printed copy of the frame.
+
+Credentials are read from --api-key / --app-id, the SKINBARON_API_KEY / SKINBARON_APP_ID environment variables or
+the [skinbaron] section (api_key, app_id, base_url) of an INI file: --config, SKINBARON_CONFIG or
+~/.config/skinbaron/config.ini, in that order of precedence.
+
+Example:
+```
+export SKINBARON_API_KEY=... SKINBARON_APP_ID=...
+skinbaron pricelist --format parquet --output pricelist.parquet
+skinbaron newest --size 100 | jq .itemPrice
+skinbaron filter --filter 'itemPrice_between=[5, 20]' --filter 'rarityName_in=["Covert"]' --format csv
+skinbaron report 'AK-47 | Redline' --history sales.sqlite
+skinbaron predict '★ Butterfly Knife' --model huber --level 0.9
+```
+"""
+import argparse
+import configparser
+import functools
+import importlib
+import json
+import os
+import sys
+
+try:
+    from .skinbaron_api import SkinBaronAPI, SkinBaronAPIError, SkinBaronResponseError
+except ImportError:
+    from skinbaron_api import SkinBaronAPI, SkinBaronAPIError, SkinBaronResponseError
+
+FORMATS = ('ndjson', 'csv', 'parquet')
+DEFAULT_CONFIG = os.path.join('~', '.config', 'skinbaron', 'config.ini')
+
+
+def load_credentials(api_key=None, app_id=None, base_url=None, config=None, environ=None):
+    """
+    Resolves the API credentials from arguments, environment and config file, in that order.
+    :param config (str, optional): INI file path, defaults to $SKINBARON_CONFIG or ~/.config/skinbaron/config.ini.
+    :param environ (dict, optional): Environment to read, defaults to os.environ.
+    :return (dict): api_key, app_id and base_url (None if not configured).
+    """
+    environ = os.environ if environ is None else environ
+    path = os.path.expanduser(config or environ.get('SKINBARON_CONFIG') or DEFAULT_CONFIG)
+    parser = configparser.ConfigParser()
+    if os.path.exists(path):
+        parser.read(path)
+    elif config:
+        raise FileNotFoundError(f"Config file {path} does not exist")
+    section = parser['skinbaron'] if parser.has_section('skinbaron') else {}
+    return {
+        'api_key': api_key or environ.get('SKINBARON_API_KEY') or section.get('api_key'),
+        'app_id': app_id or environ.get('SKINBARON_APP_ID') or section.get('app_id'),
+        'base_url': base_url or environ.get('SKINBARON_BASE_URL') or section.get('base_url'),
+    }
+
+
+class FrameWriter:
+    """
+    Writes DataFrames chunk by chunk as NDJSON, CSV (one header) or Parquet (one row group per chunk).
+
+    Attributes:
+        fmt (str): One of FORMATS.
+        rows (int): Rows written so far.
+    """
+
+    def __init__(self, fmt, path=None, chunk_size=10000):
+        """
+        Initializes the FrameWriter class
+        :param fmt (str): 'ndjson', 'csv' or 'parquet'.
+        :param path (str, optional): Output file, None or '-' for stdout.
+        :param chunk_size (int, optional): Frames larger than this are written in slices of chunk_size rows.
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"fmt must be one of {FORMATS}")
+        self.fmt = fmt
+        self.chunk_size = chunk_size
+        self.rows = 0
+        self._to_stdout = path in (None, '-')
+        binary = fmt == 'parquet'
+        if self._to_stdout:
+            self._fh = sys.stdout.buffer if binary else sys.stdout
+        else:
+            self._fh = open(path, 'wb' if binary else 'w', newline='' if not binary else None)
+        self._parquet = None
+
+    def write(self, df):
+        """
+        Writes a frame, slicing it into chunks of at most chunk_size rows.
+        """
+        for start in range(0, len(df), self.chunk_size):
+            self._write_chunk(df.iloc[start:start + self.chunk_size])
+
+    def _write_chunk(self, chunk):
+        if self.fmt == 'ndjson':
+            self._fh.write(chunk.to_json(orient='records', lines=True, date_format='iso', default_handler=str))
+        elif self.fmt == 'csv':
+            chunk.to_csv(self._fh, index=False, header=self.rows == 0)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self._fh, table.schema)
+            else:
+                table = table.cast(self._parquet.schema)
+            self._parquet.write_table(table)
+        self.rows += len(chunk)
+        self._fh.flush()
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+        if self._to_stdout:
+            self._fh.flush()
+        else:
+            self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _parse_filter(item):
+    """
+    Turns 'key=value' into a filter_items (keyword, argument) pair, the value is parsed as JSON if possible.
+    """
+    key, sep, value = item.partition('=')
+    if not sep:
+        raise argparse.ArgumentTypeError(f"expected KEY=VALUE, got {item!r}")
+    try:
+        return key.strip(), json.loads(value)
+    except ValueError:
+        return key.strip(), value
+
+
+def _module(name):
+    """
+    Imports a sibling module when a command needs it, so `skinbaron --help` and the plain fetch commands do not load
+    the analysis stack.
+    """
+    return importlib.import_module(f'.{name}', __package__) if __package__ else importlib.import_module(name)
+
+
+def _client(args):
+    return functools.partial(SkinBaronAPI, base_url=args.base_url)
+
+
+def _pricelist(args, api, writer):
+    DataProcessor = _module('dataparsing').DataProcessor
+    for batch in DataProcessor.iter_json_to_dataframes(api(args.api_key, args.app_id).stream_price_list(),
+                                                       batch_size=args.chunk_size):
+        writer.write(batch)
+
+
+def _frame(response, endpoint):
+    """
+    Parses one response, json_to_dataframe gives None for a payload it does not understand.
+    :raises SkinBaronResponseError: If the response could not be parsed, main reports it like any API error.
+    """
+    df = _module('dataparsing').DataProcessor.json_to_dataframe(response)
+    if df is None:
+        raise SkinBaronResponseError(f"unexpected {endpoint} response", endpoint)
+    return df
+
+
+def _listings(endpoint):
+    def command(args, api, writer):
+        client = api(args.api_key, args.app_id)
+        response = client.newest_items(args.size) if endpoint == 'NewestItems' else client.best_deals(args.size)
+        writer.write(_frame(response, endpoint))
+    return command
+
+
+def _sales(args, api, writer):
+    response = api(args.api_key, args.app_id).newest_sales_30_days(args.item, args.stattrak, args.souvenir,
+                                                                    args.phase)
+    writer.write(_frame(response, 'GetNewestSales30Days'))
+
+
+def _filter(args, api, writer):
+    ItemFilter = _module('market_analysis').ItemFilter
+    client = api(args.api_key, args.app_id)
+    newitems_df = _frame(client.newest_items(args.size), 'NewestItems')
+    bestdeals_df = _frame(client.best_deals(args.size), 'BestDeals')
+    writer.write(ItemFilter(newitems_df, bestdeals_df).filter_items(**dict(args.filter or [])))
+
+
+class _NoSales(Exception):
+    """
+    Raised inside the report pipeline when the search matched no sales, there is nothing to merge.
+    """
+
+
+def _merged(args, api):
+    """
+    Runs the report pipeline for the searched item.
+    :return (tuple): (Report_generator, merged DataFrame), the frame is None if the search matched no sales.
+    """
+    Report_generator = _module('data_utils').Report_generator
+    DataProcessor = _module('dataparsing').DataProcessor
+
+    def parse(response):
+        df = DataProcessor.json_to_dataframe(response)
+        if 'newestSales30Days' in response and (df is None or df.empty):
+            raise _NoSales()
+        return df
+
+    history = None
+    if args.history:
+        history_module = _module('history')
+        history = (history_module.SQLiteHistory(args.history) if args.history.endswith(('.sqlite', '.db'))
+                   else history_module.ParquetHistory(args.history))
+    report = Report_generator(args.api_key, args.app_id)
+    try:
+        merged_df = report.newestsales_df_pipeline(
+            api, parse, functools.partial(report.cheapest, verbose=False),
+            report.separate_item_and_condition, args.api_key, args.app_id, args.item, args.stattrak, args.souvenir,
+            args.phase, history=history)
+    except _NoSales:
+        merged_df = None
+    finally:
+        if history is not None and hasattr(history, 'close'):
+            history.close()
+    return report, merged_df
+
+
+def _report(args, api, writer):
+    report, merged_df = _merged(args, api)
+    if merged_df is not None:
+        writer.write(report.summarize(merged_df))
+
+
+def _predict(args, api, writer):
+    prediction = _module('visualization_prediction')
+    MarketTrends, PricePrediction = prediction.MarketTrends, prediction.PricePrediction
+    _, merged_df = _merged(args, api)
+    if merged_df is None:
+        return
+    trend_df = MarketTrends.price_trend(merged_df, plot=False)
+    writer.write(PricePrediction.price_prediction(trend_df, model=args.model, level=args.level))
+
+
+def _common_options(defaults):
+    """
+    Options accepted before and after the subcommand. The subcommands' copies default to SUPPRESS so they do not
+    overwrite a value given before the subcommand.
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+    default = (lambda value: value) if defaults else (lambda value: argparse.SUPPRESS)
+    parser.add_argument('--api-key', default=default(None), help='defaults to $SKINBARON_API_KEY or the config file')
+    parser.add_argument('--app-id', default=default(None), help='defaults to $SKINBARON_APP_ID or the config file')
+    parser.add_argument('--base-url', default=default(None),
+                        help='API base URL, e.g. a local simulator; defaults to $SKINBARON_BASE_URL')
+    parser.add_argument('--config', default=default(None),
+                        help=f'INI file with a [skinbaron] section, defaults to {DEFAULT_CONFIG}')
+    parser.add_argument('--format', '-f', choices=FORMATS, default=default('ndjson'))
+    parser.add_argument('--output', '-o', default=default('-'), help="output file, '-' for stdout")
+    parser.add_argument('--chunk-size', type=int, default=default(10000), help='rows per written chunk')
+    return parser
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='skinbaron', description='Fetches and analyses SkinBaron market data.',
+                                     parents=[_common_options(True)])
+    common = _common_options(False)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('pricelist', parents=[common], help='the whole price list, parsed while it downloads') \
+        .set_defaults(run=_pricelist)
+    for name, endpoint, help_text in (('newest', 'NewestItems', 'newest listings'), ('deals', 'BestDeals', 'best deals')):
+        command = commands.add_parser(name, parents=[common], help=help_text)
+        command.add_argument('--size', type=int, default=100, help='number of listings, max 100')
+        command.set_defaults(run=_listings(endpoint))
+
+    command = commands.add_parser('filter', parents=[common], help='newest listings and best deals matching filters')
+    command.add_argument('--size', type=int, default=100)
+    command.add_argument('--filter', action='append', type=_parse_filter, metavar='KEY=VALUE',
+                         help='ItemFilter.filter_items argument, VALUE parsed as JSON, e.g. itemPrice_between=[5,20]')
+    command.set_defaults(run=_filter)
+
+    for name, run, help_text in (('sales', _sales, 'sales of the last 30 days'),
+                                 ('report', _report, 'sales merged with the current lowest price, with statistics'),
+                                 ('predict', _predict, 'price prediction 7 days ahead')):
+        command = commands.add_parser(name, parents=[common], help=help_text)
+        command.add_argument('item', help='item name, vague searches need at least 3 characters')
+        command.add_argument('--stattrak', action='store_true')
+        command.add_argument('--souvenir', action='store_true')
+        command.add_argument('--phase', help='doppler phase')
+        if name != 'sales':
+            command.add_argument('--history', help='sales history store, *.sqlite / *.db or a Parquet directory')
+        if name == 'predict':
+            command.add_argument('--model', default='linear',
+                                 help='forecasting model: linear, ewma, huber, theil_sen or volume_weighted')
+            command.add_argument('--level', type=float, help='prediction interval level, e.g. 0.9')
+        command.set_defaults(run=run)
+    return parser
+
+
+def main(argv=None, api=None):
+    """
+    Runs the command line interface.
+    :param argv (list, optional): Arguments, defaults to sys.argv[1:].
+    :param api (optional): Client factory called with (api_key, app_id), defaults to SkinBaronAPI.
+    :return (int): Exit status.
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        credentials = load_credentials(args.api_key, args.app_id, args.base_url, args.config)
+    except FileNotFoundError as e:
+        parser.error(str(e))
+    if not credentials['api_key'] or not credentials['app_id']:
+        parser.error('no credentials: pass --api-key/--app-id, set SKINBARON_API_KEY/SKINBARON_APP_ID or add them '
+                     'to the config file')
+    args.api_key, args.app_id, args.base_url = credentials['api_key'], credentials['app_id'], credentials['base_url']
+    if args.format == 'parquet' and args.output in (None, '-') and sys.stdout.isatty():
+        parser.error('refusing to write Parquet to a terminal, pass --output')
+
+    try:
+        with FrameWriter(args.format, args.output, args.chunk_size) as writer:
+            args.run(args, api or _client(args), writer)
+    except SkinBaronAPIError as e:
+        print(f"skinbaron: {e}", file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        # the reader went away (e.g. `| head`), not an error; point stdout at devnull so the flush at exit is quiet
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,22 @@
 # data_utils.py
 import pandas as pd
+import numpy as np
 import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from .instrumentation import instrumented
+    from .skinbaron_api import sales_query
+except ImportError:
+    from instrumentation import instrumented
+    from skinbaron_api import sales_query
+
+# same split as separate_item_and_condition: everything before the trailing parenthesis, and its content
+_HASH_NAME_PATTERN = r"^(?P<itemName>.*) \((?P<exteriorName>[^)]+)\)$"
+_PREFIXES = {'isStar': r"^★ ", 'isStatTrak': r"^(?:★ )?StatTrak™ ", 'isSouvenir': r"^Souvenir "}
+
+
 class Report_generator:
     """
     A class for generating reports and processing item data.
@@ -12,6 +28,10 @@ class Report_generator:
         api_key (str): API key for API.
         app_id (str): Application ID for the SkinBaron account. (Note: each account has its identical app_id)
     """
+    # parsed marketHashName -> itemName / exteriorName / prefix flags, shared by all instances since the set of
+    # hash names on the market rarely changes
+    _name_table = pd.DataFrame(columns=['itemName', 'exteriorName', 'baseName'] + list(_PREFIXES))
+
     def __init__(self, api_key, app_id):
         self.api_key = api_key
         self.app_id = app_id
@@ -48,7 +68,100 @@ class Report_generator:
         else:
             return s, None
 
-    def cheapest(self, pricelist_df, df):
+    @classmethod
+    def _parse_new_names(cls, names):
+        """
+        Parses hash names that are not in the lookup table yet and adds them to it.
+        :param names (Index): Unique hash names missing from the table.
+        """
+        names = pd.Series(names, index=names, dtype=object)
+        parsed = names.str.extract(_HASH_NAME_PATTERN)
+        unmatched = parsed['itemName'].isna()
+        parsed['itemName'] = parsed['itemName'].str.strip().where(~unmatched, names)
+        parsed['exteriorName'] = parsed['exteriorName'].str.strip().astype(object)
+        parsed.loc[unmatched, 'exteriorName'] = None
+
+        base = parsed['itemName']
+        for column, prefix in _PREFIXES.items():
+            parsed[column] = base.str.contains(prefix, regex=True)
+        parsed['baseName'] = base.str.replace(r"^(?:★ |StatTrak™ |Souvenir )+", "", regex=True)
+        cls._name_table = pd.concat([cls._name_table, parsed[cls._name_table.columns]]) if len(cls._name_table) \
+            else parsed[cls._name_table.columns]
+
+    def parse_market_hash_names(self, names):
+        """
+        Vectorized version of separate_item_and_condition for a whole column of hash names.
+
+        Each distinct name is parsed once with a compiled str.extract and memoized in a lookup table shared across
+        calls and instances, so repeated pipeline runs over the same price list only do a table lookup.
+        The StatTrak™, Souvenir and ★ prefixes are also reported as their own boolean columns.
+
+        :param names (Series): marketHashName (or sales itemName) values, e.g. '★ StatTrak™ Karambit | Doppler (Factory New)'.
+        :return DataFrame: Columns itemName, exteriorName (None if there is no condition), baseName (itemName without
+            prefixes), isStar, isStatTrak and isSouvenir, aligned with the index of `names`.
+
+        Example:
+        ```
+        parsed = report_generator.parse_market_hash_names(pricelist_df['marketHashName'])
+        print(parsed[['itemName', 'exteriorName', 'isStatTrak']])
+        ```
+        """
+        codes, uniques = pd.factorize(names)
+        uniques = pd.Index(uniques, dtype=object)
+        missing = uniques.difference(self._name_table.index)
+        if len(missing):
+            self._parse_new_names(missing)
+        table = self._name_table.reindex(uniques)
+        parsed = table.iloc[np.where(codes >= 0, codes, 0)] if len(uniques) else table.iloc[[]]
+        parsed.index = names.index
+        if (codes < 0).any():
+            parsed = parsed.astype(object)
+            parsed.loc[codes < 0, :] = None
+        return parsed
+
+    @classmethod
+    def clear_name_cache(cls):
+        """
+        Drops the memoized hash-name lookup table used by parse_market_hash_names.
+        """
+        cls._name_table = cls._name_table.iloc[0:0]
+
+    def _split_names(self, names, regex_item):
+        """
+        Splits a column of hash names into (itemName, exteriorName) columns, using the vectorized parser when
+        regex_item is separate_item_and_condition and calling regex_item row by row otherwise.
+        """
+        if getattr(regex_item, '__func__', None) is Report_generator.separate_item_and_condition:
+            parsed = self.parse_market_hash_names(names)
+            return parsed['itemName'], parsed['exteriorName']
+        results = names.apply(lambda x: regex_item(x))
+        return results.apply(lambda x: x[0]), results.apply(lambda x: x[1])
+
+    @staticmethod
+    def _merge_sales(pricelist_df, df, keys=()):
+        """
+        Groups the sales into per-item price/date lists and left-joins the current market listing of each item.
+        :param pricelist_df (DataFrame): Parsed price list with itemName, exteriorName and dopplerClassName columns.
+        :param df (DataFrame): Parsed sales with itemName, exteriorName, dopplerPhase, price and dateSold columns.
+        :param keys (tuple, optional): Extra leading group keys kept in the result, e.g. ('query_id',) for batch reports.
+        :return DataFrame: One row per group with 'price' and 'dateSold' lists and the price list columns.
+        """
+        item_keys = ['itemName', 'exteriorName', 'dopplerPhase']
+        # observed=True so categorical keys (see DataProcessor.apply_schema) only yield combinations that occur
+        grouped_df = df.groupby(list(keys) + item_keys, observed=True).agg({'price': list, 'dateSold': list})
+        grouped_df = grouped_df.reset_index()
+        pricelist_df = pricelist_df.rename(columns={'dopplerClassName': 'dopplerPhase'})
+        return pd.merge(grouped_df, pricelist_df, on=item_keys, how='left')
+
+    def _pricelist_frame(self, pricelist, general_pipeline, regex_item):
+        """
+        Parses the GetPriceList response and splits marketHashName into itemName and exteriorName.
+        """
+        pricelist_df = general_pipeline(pricelist)
+        pricelist_df['itemName'], pricelist_df['exteriorName'] = self._split_names(pricelist_df['marketHashName'], regex_item)
+        return pricelist_df[['itemName', 'exteriorName', 'statTrak', 'souvenir', 'lowestPrice', 'quantity', 'url', 'dopplerClassName']]
+
+    def cheapest(self, pricelist_df, df, verbose=True):
 
         """
         Further cleans the data
@@ -60,6 +173,8 @@ class Report_generator:
 
         :param pricelist_df (DataFrame): DataFrame containing current market listing prices.
         :param df (DataFrame): DataFrame containing historical sales data.
+        :param verbose (bool, optional): Print the text report to stdout. Pass False for large searches and use
+            summarize/write_report to render it separately.
         :return: A merged DataFrame with both historical and current market data.
 
         Example:
@@ -69,28 +184,86 @@ class Report_generator:
         ```
         """
 
-        grouped_df = df.groupby(['itemName', 'exteriorName', 'dopplerPhase']).agg({'price': list, 'dateSold': list})
-        grouped_df = grouped_df.reset_index()
-        pricelist_df = pricelist_df.rename(columns={'dopplerClassName': 'dopplerPhase'})
-        merged_df = pd.merge(grouped_df, pricelist_df, on=['itemName', 'exteriorName', 'dopplerPhase'], how='left')
-        lengths_of_price_lists = [len(merged_df['price'].iloc[i]) for i in range(merged_df.shape[0])]
-        most_trade = max(lengths_of_price_lists)
-
-        print(f"Report based on your search:\n"
-              f"There are a total of {merged_df.shape[0]} items matches your search")
-
-        for i in range(merged_df.shape[0]):
-            print(f"======================================================================\n"
-                  f"The {i+1}th item is {merged_df['itemName'].iloc[i]}, its condition is {merged_df['exteriorName'].iloc[i]}, its dopplerphase is {merged_df['dopplerPhase'].iloc[i]}\n"
-                  f"Historical trading info: during the past 30 days, it's been trade for {len(merged_df['price'].iloc[i])} times on {merged_df['dateSold'].iloc[i]} with price of {merged_df['price'].iloc[i]}\n"
-                  f"Current market info: There are currently {merged_df['quantity'].iloc[i]} of them are listed for sale, the lowest price would be {merged_df['lowestPrice'].iloc[i]}, you could access through this link: {merged_df['url'].iloc[i]}")
-            if len(merged_df['price'].iloc[i]) == most_trade:
-                print(f"Note: This is the most frequent traded item during the past 30 days!!")
-        print("=======================end of the report=======================")
-
+        merged_df = self._merge_sales(pricelist_df, df)
+        if verbose:
+            self.write_report(self.summarize(merged_df), sys.stdout, fmt='text')
         return merged_df
 
-    def newestsales_df_pipeline(self, skb, general_pipeline, reportgenerator, regex_item, api_key,appID, itemName, statTrak, souvenir, dopplerPhase = None):
+    @staticmethod
+    def summarize(merged_df):
+        """
+        Adds the report statistics to a merged frame as vectorized columns.
+        :param merged_df (DataFrame): Output of cheapest / newestsales_df_pipeline, with 'price' lists.
+        :return DataFrame: A copy with trade_count, min_price, max_price, median_price and most_traded
+            (True for the items traded most often in the past 30 days) columns.
+        """
+        summary = merged_df.copy()
+        prices = summary['price'].explode()
+        prices = pd.to_numeric(prices, errors='coerce').groupby(level=0)
+        summary['trade_count'] = summary['price'].str.len().fillna(0).astype(int)
+        summary['min_price'] = prices.min()
+        summary['max_price'] = prices.max()
+        summary['median_price'] = prices.median()
+        summary['most_traded'] = summary['trade_count'] == summary['trade_count'].max()
+        return summary
+
+    @staticmethod
+    def _text_lines(chunk, start):
+        """
+        Renders summarized rows as the text report, one string per row.
+        """
+        ordinal = pd.Series(np.arange(start + 1, start + len(chunk) + 1), index=chunk.index).astype(str)
+        lines = ("======================================================================\n"
+                 "The " + ordinal + "th item is " + chunk['itemName'].astype(str)
+                 + ", its condition is " + chunk['exteriorName'].astype(str)
+                 + ", its dopplerphase is " + chunk['dopplerPhase'].astype(str) + "\n"
+                 "Historical trading info: during the past 30 days, it's been trade for " + chunk['trade_count'].astype(str)
+                 + " times on " + chunk['dateSold'].astype(str) + " with price of " + chunk['price'].astype(str) + "\n"
+                 "Current market info: There are currently " + chunk['quantity'].astype(str)
+                 + " of them are listed for sale, the lowest price would be " + chunk['lowestPrice'].astype(str)
+                 + ", you could access through this link: " + chunk['url'].astype(str) + "\n")
+        note = np.where(chunk['most_traded'].to_numpy(dtype=bool),
+                        "Note: This is the most frequent traded item during the past 30 days!!\n", "")
+        return lines + note
+
+    @classmethod
+    def write_report(cls, summary, fh, fmt='text', chunk_size=1000):
+        """
+        Streams a summarized report to a file handle chunk by chunk.
+        :param summary (DataFrame): Output of summarize.
+        :param fh (file): Any writable text file handle (sys.stdout, open(...), io.StringIO()).
+        :param fmt (str, optional): 'text' for the human readable report printed by cheapest,
+            'json' for one JSON object per line, 'csv' for CSV with a header row.
+        :param chunk_size (int, optional): Number of rows rendered and written at a time.
+
+        Example:
+        ```
+        merged_df = report_generator.cheapest(pricelist_df, df, verbose=False)
+        with open('report.csv', 'w') as fh:
+            report_generator.write_report(report_generator.summarize(merged_df), fh, fmt='csv')
+        ```
+        """
+        if fmt not in ('text', 'json', 'csv'):
+            raise ValueError("fmt must be 'text', 'json' or 'csv'")
+        if fmt == 'text':
+            fh.write(f"Report based on your search:\n"
+                     f"There are a total of {summary.shape[0]} items matches your search\n")
+        for start in range(0, len(summary), chunk_size):
+            chunk = summary.iloc[start:start + chunk_size]
+            if fmt == 'text':
+                fh.write(''.join(cls._text_lines(chunk, start)))
+            elif fmt == 'json':
+                text = chunk.to_json(orient='records', lines=True, date_format='iso', force_ascii=False)
+                fh.write(text if text.endswith('\n') else text + '\n')
+            else:
+                chunk.to_csv(fh, header=start == 0, index=False)
+        if fmt == 'text':
+            fh.write("=======================end of the report=======================\n")
+        elif fmt == 'csv' and not len(summary):
+            summary.to_csv(fh, index=False)
+
+    @instrumented('newestsales_df_pipeline')
+    def newestsales_df_pipeline(self, skb, general_pipeline, reportgenerator, regex_item, api_key,appID, itemName, statTrak, souvenir, dopplerPhase = None, cache = None, history = None):
         """
         Processes and merges data from different endpoints to provide structured sales data.
 
@@ -108,6 +281,12 @@ class Report_generator:
         :param statTrak (bool): Whether to filter by StatTrak.
         :param souvenir (bool): Whether to filter by souvenir.
         :param dopplerPhase (str, optional): Specific doppler phase to filter.
+        :param cache (ResponseCache, optional): Response cache shared across calls, so the price list is only downloaded once per TTL.
+        :param history (SQLiteHistory or ParquetHistory, optional): Sales history store. The fetched sales are added to
+            it (only the new ones are stored) and the report covers every stored sale of the fetched items (of
+            dopplerPhase, if given), not just the last 30 days. The stored sales are brought back into the fetched
+            frame's layout: same columns, dtypes and dateSold format. Columns the history does not keep (e.g. wear)
+            are NaN for sales only the history knows.
         :return: A structured DataFrame with detailed sales and market data.
 
         Example:
@@ -126,20 +305,132 @@ class Report_generator:
 
         ```
         """
-        api = skb(api_key=api_key, app_id=appID)
+        if cache is not None:
+            api = skb(api_key=api_key, app_id=appID, cache=cache)
+        else:
+            api = skb(api_key=api_key, app_id=appID)
         pricelist = api.get_price_list()
 
-        pricelist_df = general_pipeline(pricelist)
-        results = pricelist_df['marketHashName'].apply(lambda x: regex_item(x))
-        pricelist_df['itemName'] = results.apply(lambda x: x[0])
-        pricelist_df['exteriorName'] = results.apply(lambda x: x[1])
-        pricelist_df = pricelist_df[['itemName', 'exteriorName', 'statTrak', 'souvenir', 'lowestPrice','quantity','url', 'dopplerClassName']]
-        # pricelist_df = 1
+        pricelist_df = self._pricelist_frame(pricelist, general_pipeline, regex_item)
 
         df = api.newest_sales_30_days(itemName, statTrak, souvenir, dopplerPhase)
         df = general_pipeline(df)
-        results = df['itemName'].apply(lambda x: regex_item(x))
-        df['itemName'] = results.apply(lambda x: x[0])
-        df['exteriorName'] = results.apply(lambda x: x[1])
+        if history is not None and df is not None and not df.empty:
+            history.append(df)
+            stored = history.query(df['itemName'].astype(object).unique().tolist(), doppler_phase=dopplerPhase)
+            df = self._like_live_sales(stored, df)
+        df['itemName'], df['exteriorName'] = self._split_names(df['itemName'], regex_item)
         merged_df = reportgenerator(pricelist_df, df)
-        return merged_df
\ No newline at end of file
+        return merged_df
+
+    @staticmethod
+    def _like_live_sales(stored, live):
+        """
+        Gives sales read from a history store the layout of a freshly parsed GetNewestSales30Days frame.
+        :param stored (DataFrame): HistoryStore.query() result, dateSold as ISO strings.
+        :param live (DataFrame): The parsed sales that were just fetched.
+        :return (DataFrame): stored with live's columns in live's order, dtypes and dateSold representation.
+        """
+        stored = stored.reset_index(drop=True)
+        out = pd.DataFrame(index=stored.index)
+        for column in live.columns:
+            dtype = live[column].dtype
+            if column not in stored.columns:
+                out[column] = pd.Series(np.nan, index=stored.index).astype(object if dtype == bool else dtype)
+                continue
+            values = stored[column]
+            if column == 'dateSold':
+                if pd.api.types.is_datetime64_any_dtype(dtype):
+                    values = pd.to_datetime(values)
+                elif live[column].astype(str).str.len().eq(10).all():
+                    # the API sent plain dates, the store keeps midnight timestamps
+                    values = values.str[:10]
+            if isinstance(dtype, pd.CategoricalDtype):
+                # categories of the live frame do not cover the older sales
+                values = values.astype('category')
+            elif not (column == 'dateSold' and pd.api.types.is_datetime64_any_dtype(dtype)):
+                values = values.astype(dtype)
+            out[column] = values
+        return out
+
+    def newestsales_batch_pipeline(self, skb, general_pipeline, queries, concurrency=8, cache=None, errors='raise',
+                                   rate_limiter=None):
+        """
+        Runs newestsales_df_pipeline for many searches at once.
+
+        The price list is fetched and parsed once for the whole batch, the GetNewestSales30Days requests run
+        concurrently on a thread pool sharing one pooled client, and all sales are parsed and merged in one pass.
+        Nothing is printed.
+
+        :param skb: The API client class (SkinBaronAPI), instantiated once with this generator's credentials.
+        :param general_pipeline: Function to process and structure the data (DataProcessor.json_to_dataframe).
+        :param queries (list): Searches in any shape skinbaron_api.sales_query accepts: item names,
+            (item_name, stat_trak, souvenir[, doppler_phase]) tuples or dicts keyed like newest_sales_30_days.
+        :param concurrency (int, optional): Number of sales requests in flight at once.
+        :param rate_limiter (TokenBucket, optional): Limiter every request takes a token from before it is sent, e.g.
+            the one an AsyncSkinBaronAPI or RequestScheduler uses for the same account; None for no rate limit.
+        :param cache (ResponseCache, optional): Response cache passed on to the client.
+        :param errors (str, optional): 'raise' to propagate the first failed request, 'skip' to leave failed queries out;
+            their exceptions are then kept in self.failed_queries as {query_id: exception}.
+        :return: A DataFrame like newestsales_df_pipeline's, with leading 'query_id' (position in queries) and 'query'
+            (the searched itemName) columns identifying the search each row belongs to.
+
+        Example:
+        ```
+        report_generator = Report_generator(api_key = token, app_id = appID)
+        merged_df = report_generator.newestsales_batch_pipeline(SkinBaronAPI, DataProcessor.json_to_dataframe,
+            [('★ Butterfly Knife | Gamma Doppler', False, False), ('AK-47 | Redline', True, False, None)], concurrency=16)
+        print(merged_df.groupby('query')['lowestPrice'].min())
+        ```
+        """
+        if errors not in ('raise', 'skip'):
+            raise ValueError("errors must be 'raise' or 'skip'")
+        if cache is not None:
+            api = skb(api_key=self.api_key, app_id=self.app_id, pool_size=concurrency, cache=cache)
+        else:
+            api = skb(api_key=self.api_key, app_id=self.app_id, pool_size=concurrency)
+        regex_item = self.separate_item_and_condition
+        queries = [sales_query(query) for query in queries]
+        self.failed_queries = {}
+
+        def limited(method, *args):
+            if rate_limiter is not None:
+                rate_limiter.acquire()
+            return method(*args)
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pricelist_future = executor.submit(limited, api.get_price_list)
+            sales_futures = [executor.submit(limited, api.newest_sales_30_days, *query) for query in queries]
+            pricelist_df = self._pricelist_frame(pricelist_future.result(), general_pipeline, regex_item)
+
+            sales_frames = []
+            for query_id, future in enumerate(sales_futures):
+                try:
+                    sales = future.result()
+                except Exception as e:
+                    if errors == 'raise':
+                        # the executor waits for its futures on exit, drop the queries that have not started
+                        for pending in sales_futures:
+                            pending.cancel()
+                        raise
+                    self.failed_queries[query_id] = e
+                    continue
+                sales_df = general_pipeline(sales)
+                if sales_df is None or sales_df.empty:
+                    continue
+                sales_df['query_id'] = query_id
+                sales_frames.append(sales_df)
+
+        columns = ['query_id', 'query', 'itemName', 'exteriorName', 'dopplerPhase', 'price', 'dateSold',
+                   'statTrak', 'souvenir', 'lowestPrice', 'quantity', 'url']
+        if not sales_frames:
+            return pd.DataFrame(columns=columns)
+        df = pd.concat(sales_frames, ignore_index=True)
+        if 'dopplerPhase' not in df.columns:
+            # the API's placeholder for items without a phase; a None key would be dropped by the groupby
+            df['dopplerPhase'] = '-'
+        df['itemName'], df['exteriorName'] = self._split_names(df['itemName'], regex_item)
+        merged_df = self._merge_sales(pricelist_df, df, keys=('query_id',))
+        query_names = np.array([query[0] for query in queries], dtype=object)
+        merged_df.insert(1, 'query', query_names[merged_df['query_id'].to_numpy()])
+        return merged_df
@@ -1,14 +1,275 @@
+import codecs
+import json as _json
+
+import numpy as np
 import pandas as pd
 
+try:
+    from .instrumentation import instrumented
+except ImportError:
+    from instrumentation import instrumented
+
+try:
+    import pyarrow  # noqa: F401
+    _STRING = 'string[pyarrow]'
+except ImportError:
+    _STRING = 'object'
+
+_WHITESPACE = ' \t\n\r'
+
+# Per-endpoint column dtypes applied by DataProcessor.apply_schema.
+# Low-cardinality labels become 'category', listing prices 'float32' and flags 'bool' (nullable 'boolean' if values are
+# missing). High-cardinality strings (ids, urls) use Arrow-backed strings when pyarrow is installed.
+# wear and sale prices keep float64 since they need more than float32's 7 digits.
+_LISTING_SCHEMA = {
+    'salesId': _STRING,
+    'itemName': 'category',
+    'marketHashName': 'category',
+    'rarityName': 'category',
+    'exteriorName': 'category',
+    'variantTypeName': 'category',
+    'dopplerClassName': 'category',
+    'dopplerPhase': 'category',
+    'isSouvenir': 'bool',
+    'statTrak': 'bool',
+    'souvenir': 'bool',
+    'isWearPrecise': 'bool',
+    'stackable': 'bool',
+    'itemPrice': 'float32',
+    'tradeLockHoursLeft': 'float32',
+    'wear': 'float64',
+    'imageUrl': _STRING,
+    'url': _STRING,
+}
+SCHEMAS = {
+    'GetPriceList': {
+        'marketHashName': _STRING,
+        'lowestPrice': 'float32',
+        'quantity': 'int32',
+        'statTrak': 'bool',
+        'souvenir': 'bool',
+        'dopplerClassName': 'category',
+        'exteriorName': 'category',
+        'url': _STRING,
+    },
+    'NewestItems': _LISTING_SCHEMA,
+    'BestDeals': _LISTING_SCHEMA,
+    'GetNewestSales30Days': {
+        'itemName': 'category',
+        'exteriorName': 'category',
+        'dopplerPhase': 'category',
+        'statTrak': 'bool',
+        'souvenir': 'bool',
+        # sale prices feed report means and regressions; dateSold stays as sent
+        'price': 'float64',
+        'wear': 'float64',
+    },
+}
+# top-level key of each endpoint's response, used to recognize the endpoint from a raw response
+RESPONSE_KEYS = {
+    'map': 'GetPriceList',
+    'newestItems': 'NewestItems',
+    'bestDeals': 'BestDeals',
+    'newestSales30Days': 'GetNewestSales30Days',
+}
+_NULLABLE = {'bool': 'boolean', 'int32': 'Int32', 'int64': 'Int64'}
+
+
+class _RecordStream:
+    """
+    Incrementally walks a JSON document of the form {"key": [{...}, {...}, ...], ...} and yields the array's records
+    one at a time. Each record is decoded by the C JSON scanner as soon as its closing brace has arrived, so at most one
+    chunk plus one record is buffered.
+    """
+
+    def __init__(self, source, key=None, chunk_size=65536):
+        if hasattr(source, 'read'):
+            read = source.read
+            source = iter(lambda: read(chunk_size), type(read(0))())
+        self._chunks = iter(source)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._raw = _json.JSONDecoder()
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+        self._key = key
+
+    def _fill(self):
+        """
+        Appends the next chunk to the buffer, dropping the consumed prefix.
+        :return (bool): False once the source is exhausted.
+        """
+        if self._eof:
+            return False
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self._eof = True
+            chunk = b''
+        if isinstance(chunk, bytes):
+            chunk = self._decoder.decode(chunk, final=self._eof)
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _skip(self, chars=_WHITESPACE):
+        while True:
+            buf, pos = self._buf, self._pos
+            while pos < len(buf) and buf[pos] in chars:
+                pos += 1
+            self._pos = pos
+            if pos < len(buf) or not self._fill():
+                return
+
+    def _peek(self):
+        self._skip()
+        if self._pos >= len(self._buf):
+            raise ValueError("Unexpected end of JSON input")
+        return self._buf[self._pos]
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self._pos}, found {self._buf[self._pos]!r}")
+        self._pos += 1
+
+    def _value(self):
+        """
+        Decodes the next complete JSON value, reading more chunks while it is still truncated.
+        """
+        self._skip()
+        while True:
+            try:
+                value, end = self._raw.raw_decode(self._buf, self._pos)
+            except _json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # a number at the end of the buffer may continue in the next chunk
+            if end == len(self._buf) and not self._eof and not isinstance(value, (dict, list, str)):
+                self._fill()
+                continue
+            self._pos = end
+            return value
+
+    def __iter__(self):
+        self._expect('{')
+        while True:
+            key = self._value()
+            self._expect(':')
+            if self._key is None or key == self._key:
+                break
+            self._value()
+            if self._peek() == '}':
+                raise KeyError(self._key)
+            self._expect(',')
+        if self._peek() == 'n':
+            self._value()
+            return
+        self._expect('[')
+        if self._peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self._value()
+            separator = self._peek()
+            self._pos += 1
+            if separator == ']':
+                return
+            if separator != ',':
+                raise ValueError(f"Expected ',' or ']' at offset {self._pos - 1}, found {separator!r}")
+
+
+def _flatten_into(record, row, columns, prefix=''):
+    """
+    Appends the values of one record to the column lists, flattening nested dicts the way pd.json_normalize does
+    ('a': {'b': 1} becomes column 'a.b'). Columns seen for the first time are back-filled with None.
+    """
+    for name, value in record.items():
+        name = prefix + name
+        if isinstance(value, dict) and value:
+            _flatten_into(value, row, columns, name + '.')
+            continue
+        column = columns.get(name)
+        if column is None:
+            column = columns[name] = [None] * row
+        column.append(value)
+
+
+class StickerTable:
+    """
+    The stickers of a listings frame, stored as one flat array of interned name codes instead of a Python list of
+    dicts per row. Each row keeps only a `sticker_start` offset and a `sticker_count` into `codes`, so the frame
+    can be filtered or reordered freely while the table stays valid.
+    Only the stickers' localizedName is kept.
+
+    Attributes:
+        codes (ndarray): int32 code of every sticker of every row, rows laid out back to back.
+        names (list): Interned sticker names, names[code] is the localizedName.
+        name_codes (dict): Reverse lookup from localizedName to code.
+    """
+
+    def __init__(self, codes, names):
+        self.codes = codes
+        self.names = names
+        self.name_codes = {name: code for code, name in enumerate(names)}
+
+    @classmethod
+    def from_series(cls, stickers):
+        """
+        Builds the table from a column of sticker lists.
+        :param stickers (Series): Lists of sticker dicts (with 'localizedName'), None/NaN for items without stickers.
+        :return (tuple): (StickerTable, starts int32 ndarray, counts int16 ndarray), one start/count per row.
+        """
+        names = []
+        name_codes = {}
+        codes = []
+        starts = np.empty(len(stickers), dtype=np.int32)
+        counts = np.zeros(len(stickers), dtype=np.int16)
+        for row, value in enumerate(stickers):
+            starts[row] = len(codes)
+            if not isinstance(value, list):
+                continue
+            for sticker in value:
+                name = sticker['localizedName'] if isinstance(sticker, dict) else sticker
+                code = name_codes.get(name)
+                if code is None:
+                    code = name_codes[name] = len(names)
+                    names.append(name)
+                codes.append(code)
+            counts[row] = len(value)
+        table = cls(np.asarray(codes, dtype=np.int32), names)
+        return table, starts, counts
+
+    def names_for(self, start, count):
+        """
+        :param start (int): The row's sticker_start.
+        :param count (int): The row's sticker_count.
+        :return (list): localizedNames of the row's stickers.
+        """
+        return [self.names[code] for code in self.codes[start:start + count]]
+
+    def to_lists(self, starts, counts):
+        """
+        Expands rows back into lists of names, None for rows without stickers (like ItemFilter's sticker_list).
+        :param starts (array-like): sticker_start of each row.
+        :param counts (array-like): sticker_count of each row.
+        :return (list): One list of names (or None) per row.
+        """
+        return [self.names_for(start, count) if count else None for start, count in zip(starts, counts)]
+
+
 class DataProcessor:
     """
     class for parsing JSON data obtained from skinbaron api to DataFrame.
     """
     @staticmethod
-    def json_to_dataframe(json):
+    @instrumented('json_to_dataframe')
+    def json_to_dataframe(json, endpoint=None):
         """
         Converts JSON object into DataFrame.
         :param json (dict): The JSON object needs to be converted.
+        :param endpoint (str, optional): Endpoint the JSON came from ('GetPriceList', 'NewestItems', ...) or 'auto'
+            to recognize it from the response key. If given, the endpoint's schema is applied, see apply_schema.
         :return DataFrame: DataFrame converted from the JSON input.
         :raises Exception: If the JSON data cannot converted into DataFrame.
         """
@@ -23,10 +284,122 @@ class DataProcessor:
 
         try:
             new_df = pd.json_normalize(json_data, record_path=['data'])
+            if endpoint is not None:
+                new_df = DataProcessor.apply_schema(new_df, DataProcessor._resolve_endpoint(endpoint, json))
             return new_df
         except Exception as e:
             print(f"Error in processing JSON data: {e} for {json}")
 
+    @staticmethod
+    def _resolve_endpoint(endpoint, json):
+        if endpoint == 'auto':
+            return RESPONSE_KEYS.get(next(iter(json), None))
+        return endpoint
+
+    @staticmethod
+    def apply_schema(df, endpoint):
+        """
+        Casts a parsed frame to the compact dtypes of its endpoint (see SCHEMAS).
+
+        Labels such as exteriorName, rarityName or dopplerClassName become categories, listing prices float32 and flags
+        bool, which shrinks the frame several-fold and speeds up groupby/merge on those columns.
+        Columns missing from the frame or from the schema are left untouched; int and bool columns with missing
+        values get the matching nullable dtype.
+
+        :param df (DataFrame): Frame returned by json_to_dataframe.
+        :param endpoint (str): Name of the endpoint the frame came from, unknown endpoints leave the frame as is.
+        :return DataFrame: The same frame with its columns cast.
+        """
+        schema = SCHEMAS.get(endpoint)
+        if not schema:
+            return df
+        casts = {}
+        for column, dtype in schema.items():
+            if column not in df.columns or df[column].dtype == dtype:
+                continue
+            if dtype in _NULLABLE and df[column].isna().any():
+                dtype = _NULLABLE[dtype]
+            casts[column] = dtype
+        return df.astype(casts) if casts else df
+
+    @staticmethod
+    def compact_stickers(df, column='stickers'):
+        """
+        Replaces the column of sticker lists by sticker_start/sticker_count offsets into a shared StickerTable.
+        :param df (DataFrame): Listings frame (NewestItems / BestDeals).
+        :param column (str, optional): Name of the sticker column.
+        :return (tuple): (frame without the sticker column but with sticker_start and sticker_count, StickerTable)
+
+        Example:
+        ```
+        newitems_df, stickers = DataProcessor.compact_stickers(DataProcessor.json_to_dataframe(newitems, 'NewestItems'))
+        row = newitems_df.iloc[0]
+        print(stickers.names_for(row['sticker_start'], row['sticker_count']))
+        ```
+        """
+        table, starts, counts = StickerTable.from_series(df[column])
+        df = df.drop(columns=[column])
+        df['sticker_start'] = starts
+        df['sticker_count'] = counts
+        return df, table
+
+    @staticmethod
+    def iter_json_to_dataframes(source, batch_size=10000, key=None, endpoint=None):
+        """
+        Parses a JSON response body incrementally and yields it as DataFrames of at most batch_size rows.
+
+        Unlike json_to_dataframe, the response never has to be decoded as a whole: records are decoded one at a time
+        straight into per-column lists, so peak memory is bounded by batch_size instead of the size of the market.
+        Nested dicts are flattened to 'a.b' columns like pd.json_normalize does.
+
+        :param source (iterable or file): bytes/str chunks (e.g. SkinBaronAPI.stream_price_list()) or a file object.
+        :param batch_size (int, optional): Maximum number of rows per yielded DataFrame.
+        :param key (str, optional): Top-level key holding the records, defaults to the first key like json_to_dataframe.
+        :param endpoint (str, optional): If given, each batch is cast with the endpoint's schema, see apply_schema.
+        :return (generator): DataFrames of consecutive records.
+        :raises ValueError: If the body is not of the form {"key": [{...}, ...]}.
+
+        Example:
+        ```
+        api = SkinBaronAPI(api_key, app_id)
+        for batch in DataProcessor.iter_json_to_dataframes(api.stream_price_list(), batch_size=5000):
+            print(batch.shape)
+        ```
+        """
+        columns = {}
+        row = 0
+        for record in _RecordStream(source, key):
+            _flatten_into(record, row, columns)
+            row += 1
+            for column in columns.values():
+                if len(column) < row:
+                    column.append(None)
+            if row == batch_size:
+                yield DataProcessor.apply_schema(pd.DataFrame(columns), endpoint)
+                columns = {name: [] for name in columns}
+                row = 0
+        if row or not columns:
+            yield DataProcessor.apply_schema(pd.DataFrame(columns), endpoint)
+
+    @staticmethod
+    def stream_to_dataframe(source, batch_size=10000, key=None, endpoint=None):
+        """
+        Parses a JSON response body incrementally into one DataFrame, see iter_json_to_dataframes.
+        :param source (iterable or file): bytes/str chunks or a file object.
+        :param batch_size (int, optional): Number of rows decoded before they are packed into columns.
+        :param key (str, optional): Top-level key holding the records, defaults to the first key.
+        :param endpoint (str, optional): If given, the endpoint's schema is applied to the result, see apply_schema.
+        :return DataFrame: DataFrame of all records.
+        """
+        batches = list(DataProcessor.iter_json_to_dataframes(source, batch_size, key))
+        if len(batches) == 1:
+            return DataProcessor.apply_schema(batches[0], endpoint)
+        columns = batches[-1].columns
+        # columns that are entirely missing in a batch must not decide the concatenated dtype
+        batches = [batch.dropna(axis=1, how='all') for batch in batches]
+        # the schema is applied once at the end so all batches share the same categories
+        return DataProcessor.apply_schema(pd.concat(batches, ignore_index=True).reindex(columns=columns), endpoint)
+
 # Example Usage
 if __name__ == "__main__":
     from skinbaron_api import SkinBaronAPI
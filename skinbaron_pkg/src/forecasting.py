@@ -0,0 +1,449 @@
+import time
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+
+def parse_list(value, cast):
+    """
+    Turns a stringified list such as "['2023-01-01', '2023-01-02']" (e.g. after a CSV round trip) back into a list.
+    """
+    if isinstance(value, str):
+        return [cast(item.strip().strip("'")) for item in value.strip('[]').split(', ')]
+    return list(value)
+
+
+def to_datetime64(values):
+    """
+    Parses many dates with one pd.to_datetime call.
+    :param values (list): Date strings, datetimes or Timestamps.
+    :return (ndarray): datetime64[ns] array.
+    """
+    try:
+        return pd.to_datetime(pd.Series(values, dtype=object)).to_numpy(dtype='datetime64[ns]')
+    except (ValueError, TypeError):
+        # mixed formats: fall back to parsing each date on its own
+        return np.array([pd.to_datetime(value).to_datetime64() for value in values], dtype='datetime64[ns]')
+
+
+def _grouped_median(values, item_of_row, counts):
+    """
+    Median of `values` within each item of a packed series, NaN for items without rows.
+    """
+    order = np.lexsort((values, item_of_row))
+    ordered = values[order]
+    starts = np.cumsum(counts) - counts
+    present = counts > 0
+    medians = np.full(len(counts), np.nan)
+    low = starts[present] + (counts[present] - 1) // 2
+    high = starts[present] + counts[present] // 2
+    medians[present] = (ordered[low] + ordered[high]) / 2
+    return medians
+
+
+class SalesSeries:
+    """
+    The sale histories of many items packed back to back into flat NumPy arrays, so models can fit all of them in one
+    vectorized pass instead of looping over rows.
+
+    Attributes:
+        days (ndarray): Whole days since the item's first sale (floored, like Timedelta.days), one value per sale.
+        prices (ndarray): Sale prices aligned with days.
+        counts (ndarray): Number of sales per item; item k occupies rows [starts[k], starts[k] + counts[k]).
+        starts (ndarray): Offset of each item's first row.
+        first_dates (ndarray): Date of each item's first sale (datetime64), days are counted from it.
+        item_of_row (ndarray): Item index of every row.
+    """
+
+    def __init__(self, days, prices, counts, first_dates):
+        self.days = np.asarray(days, dtype=np.float64)
+        self.prices = np.asarray(prices, dtype=np.float64)
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.first_dates = np.asarray(first_dates, dtype='datetime64[ns]')
+        self.starts = np.cumsum(self.counts) - self.counts
+        self.item_of_row = np.repeat(np.arange(len(self.counts)), self.counts)
+
+    def __len__(self):
+        return len(self.counts)
+
+    @classmethod
+    def from_columns(cls, dates_column, prices_column):
+        """
+        Packs ragged per-item date/price lists, e.g. the dateSold and price columns of MarketTrends.price_trend.
+        All dates are parsed by one pd.to_datetime call instead of one call per element.
+        :param dates_column (Series): Lists of sale dates (or their string representation), one list per item.
+        :param prices_column (Series): Lists of sale prices, aligned with dates_column.
+        :return (SalesSeries): The packed series, in the order of the columns.
+        """
+        date_lists = [parse_list(value, str) for value in dates_column]
+        price_lists = [parse_list(value, float) for value in prices_column]
+        counts = np.fromiter((len(dates) for dates in date_lists), dtype=np.int64, count=len(date_lists))
+        if (counts != np.fromiter((len(prices) for prices in price_lists), dtype=np.int64,
+                                  count=len(price_lists))).any():
+            raise ValueError("Every item needs as many prices as sale dates")
+
+        flat_dates = to_datetime64([date for dates in date_lists for date in dates])
+        prices = np.fromiter((price for prices in price_lists for price in prices), dtype=np.float64,
+                             count=len(flat_dates))
+
+        starts = np.cumsum(counts) - counts
+        first_dates = np.full(len(counts), np.datetime64('NaT'), dtype='datetime64[ns]')
+        first_dates[counts > 0] = flat_dates[starts[counts > 0]]
+        days = np.floor_divide(flat_dates - np.repeat(first_dates, counts), np.timedelta64(1, 'D'))
+        return cls(days, prices, counts, first_dates)
+
+    def days_until(self, date):
+        """
+        :param date (str or datetime): A calendar date.
+        :return (ndarray): For every item, the whole number of days from its first sale to `date`.
+        """
+        with np.errstate(invalid='ignore'):
+            return np.floor_divide(np.datetime64(pd.to_datetime(date), 'ns') - self.first_dates,
+                                   np.timedelta64(1, 'D')).astype(np.float64)
+
+    def select(self, mask):
+        """
+        Keeps the rows where `mask` is True, keeping every item (possibly with no rows) and its day origin.
+        :param mask (ndarray): Boolean mask over the rows.
+        :return (SalesSeries): The filtered series.
+        """
+        counts = np.bincount(self.item_of_row[mask], minlength=len(self.counts))
+        return SalesSeries(self.days[mask], self.prices[mask], counts, self.first_dates)
+
+    def last_days(self):
+        """
+        :return (ndarray): Day of each item's most recent sale, NaN for items without sales.
+        """
+        last = np.full(len(self.counts), -np.inf)
+        np.maximum.at(last, self.item_of_row, self.days)
+        last[self.counts == 0] = np.nan
+        return last
+
+
+class LineFit:
+    """
+    Per-item straight lines fitted by a ForecastModel, with what is needed for prediction intervals.
+
+    Attributes:
+        slope (ndarray): Price change per day.
+        intercept (ndarray): Price at day 0, i.e. at the item's first sale.
+        scale (ndarray): Residual standard deviation (a robust estimate for the robust models), NaN if undefined.
+        n (ndarray): Number of points the line was fitted on.
+        x_mean (ndarray): (Weighted) mean day of the points.
+        sxx (ndarray): (Weighted) sum of squared day deviations, drives how fast intervals widen away from the data.
+        r2 (ndarray): (Weighted) coefficient of determination.
+    """
+
+    __slots__ = ('slope', 'intercept', 'scale', 'n', 'x_mean', 'sxx', 'r2')
+
+    def __init__(self, slope, intercept, scale, n, x_mean, sxx, r2):
+        self.slope = slope
+        self.intercept = intercept
+        self.scale = scale
+        self.n = n
+        self.x_mean = x_mean
+        self.sxx = sxx
+        self.r2 = r2
+
+    def predict(self, days):
+        """
+        :param days (ndarray or float): Day to predict for each item, counted from the item's first sale.
+        :return (ndarray): Predicted prices.
+        """
+        return self.intercept + self.slope * days
+
+    def interval(self, days, level=0.9):
+        """
+        Normal-approximation prediction interval around predict(days).
+        :param days (ndarray or float): Day to predict for each item.
+        :param level (float, optional): Coverage probability of the interval.
+        :return (tuple): (lower, upper) arrays, NaN where fewer than three points were fitted.
+        """
+        z = NormalDist().inv_cdf(0.5 + level / 2)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            leverage = np.where(self.sxx > 0, (days - self.x_mean) ** 2 / np.where(self.sxx > 0, self.sxx, 1), 0.0)
+            half_width = z * self.scale * np.sqrt(1 + 1 / self.n + leverage)
+        point = self.predict(days)
+        return point - half_width, point + half_width
+
+    def take(self, items):
+        """
+        :param items (ndarray): Item indices, may repeat.
+        :return (LineFit): The lines of the given items, e.g. one per sale to evaluate a whole packed series at once.
+        """
+        return LineFit(*(getattr(self, name)[items] for name in self.__slots__))
+
+
+def _weighted_line(series, weights=None):
+    """
+    Weighted least-squares line per item over a packed series.
+    Items with a single distinct day get slope 0 and the (weighted) mean price as intercept, like LinearRegression.
+    :param series (SalesSeries): The packed sales.
+    :param weights (ndarray, optional): Non-negative weight per row, None for ordinary least squares.
+    :return (LineFit): The fitted lines.
+    """
+    rows = series.item_of_row
+    size = len(series)
+    counts = series.counts
+    if weights is None:
+        weights = np.ones(len(series.days))
+    # normalize so every item's weights sum to its number of points, keeping the usual n - 2 degrees of freedom
+    totals = np.bincount(rows, weights, minlength=size)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        weights = weights * (counts / np.where(totals > 0, totals, 1))[rows]
+        safe_counts = np.maximum(counts, 1)
+        x_mean = np.bincount(rows, weights * series.days, minlength=size) / safe_counts
+        y_mean = np.bincount(rows, weights * series.prices, minlength=size) / safe_counts
+        dx = series.days - x_mean[rows]
+        dy = series.prices - y_mean[rows]
+        sxx = np.bincount(rows, weights * dx * dx, minlength=size)
+        sxy = np.bincount(rows, weights * dx * dy, minlength=size)
+        syy = np.bincount(rows, weights * dy * dy, minlength=size)
+
+        slope = np.where(sxx > 0, sxy / np.where(sxx > 0, sxx, 1), 0.0)
+        intercept = y_mean - slope * x_mean
+        residuals = series.prices - (intercept[rows] + slope[rows] * series.days)
+        ss_res = np.bincount(rows, weights * residuals * residuals, minlength=size)
+        # a perfect fit of a constant series scores 1, like sklearn's r2_score
+        r2 = np.where(syy > 0, 1 - ss_res / np.where(syy > 0, syy, 1), np.where(ss_res > 0, 0.0, 1.0))
+        scale = np.where(counts > 2, np.sqrt(ss_res / np.maximum(counts - 2, 1)), np.nan)
+    empty = counts == 0
+    slope[empty] = intercept[empty] = r2[empty] = np.nan
+    return LineFit(slope, intercept, scale, counts, x_mean, sxx, r2)
+
+
+def _robust_scale(series, fit):
+    """
+    Median absolute deviation of the residuals, scaled to match a standard deviation under normal noise.
+    """
+    residuals = series.prices - fit.take(series.item_of_row).predict(series.days)
+    scale = 1.4826 * _grouped_median(np.abs(residuals), series.item_of_row, series.counts)
+    scale[series.counts <= 2] = np.nan
+    return scale
+
+
+class ForecastModel:
+    """
+    Interface shared by every forecasting model.
+
+    A model fits one straight line per item over a SalesSeries in a single vectorized pass and returns a LineFit,
+    which predicts prices and prediction intervals for any day. Subclasses only implement fit.
+
+    Attributes:
+        name (str): Short name used in backtest results.
+    """
+
+    name = None
+
+    def fit(self, series):
+        """
+        Fits every item of the series.
+        :param series (SalesSeries): The packed sales.
+        :return (LineFit): The fitted lines, one per item.
+        """
+        raise NotImplementedError
+
+    def forecast(self, series, days, level=0.9):
+        """
+        Fits the series and predicts each item's price on the given day.
+        :param series (SalesSeries): The packed sales.
+        :param days (ndarray or float): Day to predict for each item, counted from the item's first sale.
+        :param level (float, optional): Coverage probability of the prediction interval.
+        :return (DataFrame): forecast, lower and upper columns, one row per item.
+        """
+        fit = self.fit(series)
+        lower, upper = fit.interval(days, level)
+        return pd.DataFrame({'forecast': fit.predict(days), 'lower': lower, 'upper': upper})
+
+
+class LinearTrend(ForecastModel):
+    """
+    Ordinary least squares over days since the first sale, the same line PricePrediction always used.
+    """
+
+    name = 'linear'
+
+    def fit(self, series):
+        return _weighted_line(series)
+
+
+class EWMATrend(ForecastModel):
+    """
+    Exponentially weighted trend: least squares where a sale's weight halves every `halflife` days before the item's
+    most recent sale, so the line follows the latest prices.
+
+    Attributes:
+        halflife (float): Days after which a sale counts half as much.
+    """
+
+    name = 'ewma'
+
+    def __init__(self, halflife=7.0):
+        self.halflife = halflife
+
+    def fit(self, series):
+        age = series.last_days()[series.item_of_row] - series.days
+        return _weighted_line(series, np.power(0.5, age / self.halflife))
+
+
+class HuberTrend(ForecastModel):
+    """
+    Huber regression by iteratively reweighted least squares: residuals larger than `epsilon` robust standard
+    deviations are down-weighted, so a few mispriced sales barely move the line.
+
+    Attributes:
+        epsilon (float): Residual size, in robust standard deviations, from which sales are down-weighted.
+        iterations (int): Number of reweighting steps.
+    """
+
+    name = 'huber'
+
+    def __init__(self, epsilon=1.345, iterations=10):
+        self.epsilon = epsilon
+        self.iterations = iterations
+
+    def fit(self, series):
+        fit = _weighted_line(series)
+        for _ in range(self.iterations):
+            scale = _robust_scale(series, fit)[series.item_of_row]
+            residuals = np.abs(series.prices - fit.take(series.item_of_row).predict(series.days))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                weights = np.minimum(1.0, self.epsilon * scale / residuals)
+            # items with too few points or a perfect fit keep their ordinary weights
+            weights[~np.isfinite(weights)] = 1.0
+            fit = _weighted_line(series, weights)
+        fit.scale = _robust_scale(series, fit)
+        return fit
+
+
+class TheilSenTrend(ForecastModel):
+    """
+    Theil-Sen estimator: the slope is the median of the slopes between every pair of sales on different days and the
+    intercept the median of the remaining offsets. Ignores up to ~29% of arbitrarily bad prices.
+
+    The pairs are evaluated for all items with the same number of sales at once. The cost grows with the square of
+    the number of sales, so only each item's last `max_points` sales are used.
+
+    Attributes:
+        max_points (int): Maximum number of sales per item taken into account.
+    """
+
+    name = 'theil_sen'
+
+    def __init__(self, max_points=100):
+        self.max_points = max_points
+
+    def fit(self, series):
+        position = np.arange(len(series.days)) - series.starts[series.item_of_row]
+        series = series.select(position >= series.counts[series.item_of_row] - self.max_points)
+        slope = np.zeros(len(series))
+        for n in np.unique(series.counts[series.counts >= 2]):
+            items = np.flatnonzero(series.counts == n)
+            index = series.starts[items][:, None] + np.arange(n)
+            x, y = series.days[index], series.prices[index]
+            i, j = np.triu_indices(n, k=1)
+            dx = x[:, j] - x[:, i]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                pair_slopes = np.where(dx != 0, (y[:, j] - y[:, i]) / dx, np.nan)
+            has_pairs = (dx != 0).any(axis=1)
+            slope[items[has_pairs]] = np.nanmedian(pair_slopes[has_pairs], axis=1)
+        intercept = _grouped_median(series.prices - slope[series.item_of_row] * series.days,
+                                    series.item_of_row, series.counts)
+        base = _weighted_line(series)
+        fit = LineFit(slope, intercept, np.full(len(series), np.nan), series.counts, base.x_mean, base.sxx, base.r2)
+        fit.slope[series.counts == 0] = np.nan
+        fit.scale = _robust_scale(series, fit)
+        return fit
+
+
+class VolumeWeightedTrend(ForecastModel):
+    """
+    Volume-weighted regression: each item's sales are collapsed into one average price per day and the daily averages
+    are regressed on the day, weighting each day by its number of sales raised to `power`.
+
+    power=1 gives the ordinary line over individual sales, power=0 counts every trading day equally; values in between
+    trust busy days more without letting a single busy day dominate.
+
+    Attributes:
+        power (float): Exponent applied to the daily sales count.
+    """
+
+    name = 'volume_weighted'
+
+    def __init__(self, power=0.5):
+        self.power = power
+
+    def fit(self, series):
+        rows = series.item_of_row
+        if not len(rows):
+            return _weighted_line(series)
+        # one group per (item, day); rows are sorted so the groups come out item by item
+        keys, group = np.unique(np.stack([rows, series.days]), axis=1, return_inverse=True)
+        group = group.ravel()
+        volume = np.bincount(group)
+        daily = SalesSeries(keys[1], np.bincount(group, series.prices) / volume,
+                            np.bincount(keys[0].astype(np.int64), minlength=len(series)), series.first_dates)
+        return _weighted_line(daily, volume ** float(self.power))
+
+
+MODELS = {model.name: model for model in (LinearTrend, EWMATrend, HuberTrend, TheilSenTrend, VolumeWeightedTrend)}
+
+
+def backtest(models, series, holdout_days=7, level=0.9):
+    """
+    Scores forecasting models on held-out days.
+
+    Each item's sales from its last `holdout_days` days are hidden, every model is fitted on the rest and predicts the
+    hidden sales. Items without at least two training sales or one hidden sale are left out.
+
+    :param models (iterable): ForecastModel instances (or names from MODELS) to compare.
+    :param series (SalesSeries or DataFrame): The sales, a DataFrame needs dateSold and price list columns.
+    :param holdout_days (int, optional): Number of trailing days held out per item.
+    :param level (float, optional): Coverage probability of the prediction intervals.
+    :return (DataFrame): One row per model, indexed by name and sorted by mae, with mae, rmse, mape (%), coverage
+        (share of hidden sales inside the interval), items, points and fit_seconds (CPU cost of the fit).
+
+    Example:
+    ```
+    scores = backtest([LinearTrend(), TheilSenTrend(), EWMATrend(halflife=3)], MarketTrends.price_trend(df))
+    print(scores)
+    ```
+    """
+    if isinstance(series, pd.DataFrame):
+        series = SalesSeries.from_columns(series['dateSold'], series['price'])
+    cutoff = series.last_days() - holdout_days
+    held_out = series.days > cutoff[series.item_of_row]
+    train = series.select(~held_out)
+    usable = (train.counts >= 2) & (series.counts > train.counts)
+    test_mask = held_out & usable[series.item_of_row]
+    test_items = series.item_of_row[test_mask]
+    test_days = series.days[test_mask]
+    actual = series.prices[test_mask]
+
+    results = []
+    for model in models:
+        if isinstance(model, str):
+            model = MODELS[model]()
+        started = time.perf_counter()
+        fit = model.fit(train)
+        elapsed = time.perf_counter() - started
+
+        fit = fit.take(test_items)
+        predicted = fit.predict(test_days)
+        lower, upper = fit.interval(test_days, level)
+        errors = predicted - actual
+        with_interval = np.isfinite(lower)
+        covered = (actual >= lower) & (actual <= upper)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            results.append({
+                'model': model.name,
+                'mae': np.mean(np.abs(errors)) if len(errors) else np.nan,
+                'rmse': np.sqrt(np.mean(errors ** 2)) if len(errors) else np.nan,
+                'mape': 100 * np.mean(np.abs(errors[actual != 0] / actual[actual != 0])) if len(errors) else np.nan,
+                'coverage': covered[with_interval].mean() if with_interval.any() else np.nan,
+                'items': int(usable.sum()),
+                'points': len(actual),
+                'fit_seconds': elapsed,
+            })
+    return pd.DataFrame(results).set_index('model').sort_values('mae')
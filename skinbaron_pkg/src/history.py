@@ -0,0 +1,242 @@
+import glob
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from datetime import date, datetime
+
+import pandas as pd
+
+# a sale is identified by these columns; 'occurrence' numbers identical sales (same item, date and price) within one
+# fetch, so genuinely repeated sales are kept while re-fetching an overlapping window adds nothing
+KEY_COLUMNS = ['itemName', 'dopplerPhase', 'dateSold', 'price', 'occurrence']
+COLUMNS = KEY_COLUMNS + ['fetchedAt']
+
+
+def normalize_sales(sales_df, fetched_at=None):
+    """
+    Brings parsed GetNewestSales30Days rows into the stored layout.
+    :param sales_df (DataFrame): Parsed sales (DataProcessor.json_to_dataframe) with itemName, price, dateSold and
+        optionally dopplerPhase columns. itemName is the full market hash name, e.g. 'AK-47 | Redline (Field-Tested)'.
+    :param fetched_at (str or datetime, optional): When the rows were downloaded, defaults to now.
+    :return (DataFrame): The KEY_COLUMNS plus fetchedAt; dateSold as sortable ISO strings, a missing dopplerPhase as ''.
+    """
+    if sales_df is None or sales_df.empty:
+        return pd.DataFrame({column: pd.Series(dtype=object) for column in COLUMNS})
+    df = pd.DataFrame({
+        'itemName': sales_df['itemName'].astype(object).to_numpy(),
+        'dopplerPhase': (sales_df['dopplerPhase'].astype(object).where(sales_df['dopplerPhase'].notna(), '').to_numpy()
+                         if 'dopplerPhase' in sales_df.columns else ''),
+        'dateSold': pd.to_datetime(sales_df['dateSold']).dt.strftime('%Y-%m-%dT%H:%M:%S').to_numpy(),
+        'price': sales_df['price'].astype('float64').to_numpy(),
+    })
+    df['occurrence'] = df.groupby(['itemName', 'dopplerPhase', 'dateSold', 'price'], sort=False).cumcount()
+    df['fetchedAt'] = pd.Timestamp(fetched_at if fetched_at is not None else pd.Timestamp.now()).strftime(
+        '%Y-%m-%dT%H:%M:%S')
+    return df
+
+
+def _bound(value):
+    return None if value is None else pd.Timestamp(value).strftime('%Y-%m-%dT%H:%M:%S')
+
+
+def _end_bound(value):
+    """
+    Upper dateSold bound of a query as (operator, ISO string). A date without a time of day ('2023-03-31', a date
+    object) covers that whole day, i.e. everything before the next midnight; a timestamp is an inclusive bound.
+    """
+    if isinstance(value, date) and not isinstance(value, datetime) or \
+            isinstance(value, str) and re.fullmatch(r'\s*\d{4}-\d{2}-\d{2}\s*', value):
+        return '<', (pd.Timestamp(value) + pd.Timedelta(days=1)).strftime('%Y-%m-%dT%H:%M:%S')
+    return '<=', _bound(value)
+
+
+class SQLiteHistory:
+    """
+    Sales history in an indexed SQLite database, kept beyond the API's 30-day window.
+
+    Sales are de-duplicated by a unique index over KEY_COLUMNS, so appending an overlapping fetch only stores the sales
+    that are new. A second index over (itemName, dateSold) serves range queries.
+
+    Attributes:
+        path (str): Database file, ':memory:' for a throwaway in-memory database.
+
+    Example:
+    ```
+    history = SQLiteHistory('sales.sqlite')
+    history.append(DataProcessor.json_to_dataframe(api.newest_sales_30_days('AK-47 | Redline', False, False)))
+    df = history.query('AK-47 | Redline (Field-Tested)', start='2023-06-01')
+    ```
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sales (itemName TEXT NOT NULL, dopplerPhase TEXT NOT NULL, "
+                "dateSold TEXT NOT NULL, price REAL NOT NULL, occurrence INTEGER NOT NULL, fetchedAt TEXT)")
+            self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS sales_key ON sales "
+                               "(itemName, dopplerPhase, dateSold, price, occurrence)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS sales_item_date ON sales (itemName, dateSold)")
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def append(self, sales_df, fetched_at=None):
+        """
+        Stores the sales not seen before.
+        :param sales_df (DataFrame): Parsed sales, see normalize_sales.
+        :param fetched_at (str or datetime, optional): When the rows were downloaded, defaults to now.
+        :return (int): Number of new sales stored.
+        """
+        df = normalize_sales(sales_df, fetched_at)
+        rows = list(zip(*(df[column].tolist() for column in COLUMNS)))
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO sales (%s) VALUES (%s)" % (', '.join(COLUMNS), ', '.join('?' * len(COLUMNS))),
+                rows)
+            return self._conn.total_changes - before
+
+    def query(self, item_name=None, start=None, end=None, doppler_phase=None):
+        """
+        Reads stored sales, oldest first.
+        :param item_name (str or list, optional): Market hash name(s) to read, defaults to all items.
+        :param start (str or datetime, optional): Earliest dateSold included.
+        :param end (str or datetime, optional): Latest dateSold included; a date without a time includes that whole day.
+        :param doppler_phase (str, optional): Only sales of this doppler phase.
+        :return (DataFrame): itemName, dopplerPhase (None if missing), dateSold, price and fetchedAt columns.
+        """
+        clauses, params = [], []
+        if item_name is not None:
+            names = [item_name] if isinstance(item_name, str) else list(item_name)
+            clauses.append("itemName IN (%s)" % ', '.join('?' * len(names)))
+            params += names
+        if start is not None:
+            clauses.append("dateSold >= ?")
+            params.append(_bound(start))
+        if end is not None:
+            op, bound = _end_bound(end)
+            clauses.append(f"dateSold {op} ?")
+            params.append(bound)
+        if doppler_phase is not None:
+            clauses.append("dopplerPhase = ?")
+            params.append(doppler_phase)
+        sql = "SELECT itemName, dopplerPhase, dateSold, price, fetchedAt FROM sales"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY itemName, dateSold, price"
+        with self._lock:
+            df = pd.read_sql_query(sql, self._conn, params=params)
+        df['dopplerPhase'] = df['dopplerPhase'].replace('', None)
+        return df
+
+    def items(self):
+        """
+        :return (DataFrame): itemName, dopplerPhase, sales, first and last dateSold of every stored item.
+        """
+        with self._lock:
+            df = pd.read_sql_query(
+                "SELECT itemName, dopplerPhase, COUNT(*) AS sales, MIN(dateSold) AS first, MAX(dateSold) AS last "
+                "FROM sales GROUP BY itemName, dopplerPhase ORDER BY itemName", self._conn)
+        df['dopplerPhase'] = df['dopplerPhase'].replace('', None)
+        return df
+
+
+class ParquetHistory:
+    """
+    Sales history in Parquet files partitioned by month of sale (directory/month=YYYY-MM/part-*.parquet).
+
+    Appending reads only the key columns of the months the new sales fall into, drops the sales already stored and
+    writes the rest as one new part file per month. Range queries only open the months in range.
+    Needs pyarrow, which is imported when the class is used.
+
+    Attributes:
+        directory (str): Root directory of the partitions, created if missing.
+
+    Example:
+    ```
+    history = ParquetHistory('history/')
+    history.append(sales_df)
+    df = history.query(['AK-47 | Redline (Field-Tested)'], start='2023-01-01', end='2023-03-31')
+    ```
+    """
+
+    def __init__(self, directory):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise ImportError("ParquetHistory needs pyarrow, install it with `pip install pyarrow` "
+                              "or use SQLiteHistory") from e
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _months(self, start=None, end=None):
+        months = sorted(os.path.basename(path)[len('month='):]
+                        for path in glob.glob(os.path.join(self.directory, 'month=*')))
+        start, end = _bound(start), _bound(end)
+        return [month for month in months
+                if (start is None or month >= start[:7]) and (end is None or month <= end[:7])]
+
+    def _read(self, month, columns=None, filters=None):
+        parts = sorted(glob.glob(os.path.join(self.directory, 'month=' + month, '*.parquet')))
+        frames = [pd.read_parquet(part, columns=columns, filters=filters) for part in parts]
+        frames = [frame for frame in frames if len(frame)]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns or COLUMNS)
+
+    def append(self, sales_df, fetched_at=None):
+        """
+        Stores the sales not seen before.
+        :param sales_df (DataFrame): Parsed sales, see normalize_sales.
+        :param fetched_at (str or datetime, optional): When the rows were downloaded, defaults to now.
+        :return (int): Number of new sales stored.
+        """
+        df = normalize_sales(sales_df, fetched_at)
+        added = 0
+        with self._lock:
+            for month, rows in df.groupby(df['dateSold'].str[:7], sort=True):
+                stored = self._read(month, columns=KEY_COLUMNS)
+                if len(stored):
+                    stored = stored.astype({'price': 'float64', 'occurrence': 'int64'})
+                    seen = pd.MultiIndex.from_frame(stored[KEY_COLUMNS])
+                    rows = rows[~pd.MultiIndex.from_frame(rows[KEY_COLUMNS]).isin(seen)]
+                if not len(rows):
+                    continue
+                partition = os.path.join(self.directory, 'month=' + month)
+                os.makedirs(partition, exist_ok=True)
+                tmp_path = os.path.join(partition, '.%s.tmp' % uuid.uuid4().hex)
+                rows.to_parquet(tmp_path, index=False)
+                os.replace(tmp_path, os.path.join(partition, 'part-%s.parquet' % uuid.uuid4().hex))
+                added += len(rows)
+        return added
+
+    def query(self, item_name=None, start=None, end=None, doppler_phase=None):
+        """
+        Reads stored sales, oldest first. Same arguments and result as SQLiteHistory.query.
+        """
+        filters = []
+        if item_name is not None:
+            filters.append(('itemName', 'in', [item_name] if isinstance(item_name, str) else list(item_name)))
+        if start is not None:
+            filters.append(('dateSold', '>=', _bound(start)))
+        if end is not None:
+            filters.append(('dateSold',) + _end_bound(end))
+        if doppler_phase is not None:
+            filters.append(('dopplerPhase', '==', doppler_phase))
+        frames = [self._read(month, filters=filters or None) for month in self._months(start, end)]
+        frames = [frame for frame in frames if len(frame)]
+        if not frames:
+            return pd.DataFrame(columns=['itemName', 'dopplerPhase', 'dateSold', 'price', 'fetchedAt'])
+        df = pd.concat(frames, ignore_index=True).sort_values(['itemName', 'dateSold', 'price'], ignore_index=True)
+        df['dopplerPhase'] = df['dopplerPhase'].replace('', None)
+        return df[['itemName', 'dopplerPhase', 'dateSold', 'price', 'fetchedAt']]
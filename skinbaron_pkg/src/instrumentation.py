@@ -0,0 +1,336 @@
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+
+# upper bucket bounds, Prometheus style: a value v is counted in every bucket with bound >= v
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = tuple(1024 * 4 ** k for k in range(11))  # 1 KiB .. 1 GiB
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+_DESCRIPTIONS = {
+    'skinbaron_request_seconds': ('histogram', 'Latency of SkinBaron API HTTP requests, every retry counted.'),
+    'skinbaron_response_bytes': ('histogram', 'Size of SkinBaron API response bodies.'),
+    'skinbaron_responses_total': ('counter', 'SkinBaron API responses by status code, "error" for connection errors.'),
+    'skinbaron_stage_seconds': ('histogram', 'Wall time of instrumented pipeline stages.'),
+    'skinbaron_stage_errors_total': ('counter', 'Pipeline stage calls that raised.'),
+    'skinbaron_stage_peak_bytes': ('gauge', 'Largest traced memory peak of a pipeline stage call.'),
+    'skinbaron_scheduler_wait_seconds': ('histogram', 'Time calls spent queued in a RequestScheduler.'),
+}
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram.
+
+    Attributes:
+        bounds (tuple): Upper bounds of the buckets, an implicit +Inf bucket follows.
+        counts (list): Observations per bucket (not cumulative), the last entry is the +Inf bucket.
+        sum (float): Sum of all observations.
+        count (int): Number of observations.
+    """
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count', 'min', 'max')
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.min = value if self.min is None or value < self.min else self.min
+        self.max = value if self.max is None or value > self.max else self.max
+
+    def quantile(self, q):
+        """
+        Estimates a quantile by linear interpolation inside the bucket it falls in.
+        :param q (float): Quantile between 0 and 1.
+        :return (float): The estimate, None without observations.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                low = self.bounds[i - 1] if i else min(self.min, self.bounds[0])
+                high = self.bounds[i] if i < len(self.bounds) else self.max
+                low, high = max(low, self.min), min(high, self.max)
+                return low + (high - low) * (rank - seen) / count
+            seen += count
+        return self.max
+
+    def to_dict(self):
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(list(self.bounds) + ['+Inf'], self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {'count': self.count, 'sum': self.sum, 'min': self.min, 'max': self.max,
+                'p50': self.quantile(0.5), 'p95': self.quantile(0.95), 'p99': self.quantile(0.99), 'buckets': buckets}
+
+
+class _NoOp:
+    """
+    Shared context manager returned by Metrics.stage while disabled.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NOOP = _NoOp()
+
+
+class _Stage:
+    __slots__ = ('metrics', 'name', 'start', 'memory')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+        self.memory = metrics.memory
+
+    def __enter__(self):
+        if self.memory:
+            self.metrics._memory_enter()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        seconds = time.perf_counter() - self.start
+        peak = self.metrics._memory_exit() if self.memory else None
+        self.metrics.record_stage(self.name, seconds, peak, failed=exc_type is not None)
+        return False
+
+
+class Metrics:
+    """
+    Collects request and pipeline-stage measurements and exports them as Prometheus text or JSON.
+
+    SkinBaronAPI records latency, body size and status of every HTTP request per endpoint. json_to_dataframe,
+    filter_items, newestsales_df_pipeline, price_trend and price_prediction are wrapped with `instrumented`, which
+    records their wall time and, with memory capture on, the tracemalloc peak of each call. Nested stages (the
+    pipeline parses JSON) get their own peaks.
+
+    While disabled every hook is a single attribute check, so the package runs at full speed; the shared METRICS
+    instance starts disabled unless the SKINBARON_METRICS environment variable is set ('1', or 'memory' to capture
+    memory as well).
+
+    Attributes:
+        enabled (bool): Whether measurements are recorded.
+        memory (bool): Whether stages also trace their peak memory. Tracing slows allocations down noticeably and is
+            process-wide, so it is meant for profiling runs.
+
+    Example:
+    ```
+    from skinbaron_pkg.src.instrumentation import METRICS
+    METRICS.enable(memory=True)
+    merged_df = report_generator.newestsales_df_pipeline(...)
+    print(METRICS.to_prometheus())
+    with open('metrics.json', 'w') as fh:
+        fh.write(METRICS.to_json())
+    ```
+    """
+
+    def __init__(self, enabled=False, memory=False):
+        """
+        Initializes the Metrics class
+        :param enabled (bool, optional): Record measurements from the start.
+        :param memory (bool, optional): Capture the peak memory of stages with tracemalloc.
+        """
+        self.enabled = enabled
+        self.memory = memory
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._tracing_owner = False
+        self.reset()
+
+    def enable(self, memory=False):
+        """
+        Starts recording.
+        :param memory (bool, optional): Capture the peak memory of stages too.
+        """
+        self.memory = memory
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        self.memory = False
+
+    def reset(self):
+        """
+        Drops everything recorded so far.
+        """
+        with self._lock:
+            self.histograms = {}
+            self.counters = {}
+            self.gauges = {}
+
+    def observe(self, name, labels, value, buckets):
+        """
+        Adds an observation to the histogram of (name, labels).
+        :param labels (tuple): (label, value) pairs.
+        """
+        with self._lock:
+            histogram = self.histograms.get((name, labels))
+            if histogram is None:
+                histogram = self.histograms[(name, labels)] = Histogram(buckets)
+            histogram.observe(value)
+
+    def increment(self, name, labels, amount=1):
+        with self._lock:
+            self.counters[(name, labels)] = self.counters.get((name, labels), 0) + amount
+
+    def record_request(self, endpoint, seconds, status, size=None):
+        """
+        Records one HTTP request, called by SkinBaronAPI.
+        :param endpoint (str): The API endpoint.
+        :param seconds (float): Time until the response headers arrived (the whole body unless streaming).
+        :param status (int or str): HTTP status code, 'error' if no response came back.
+        :param size (int, optional): Body size in bytes.
+        """
+        labels = (('endpoint', endpoint),)
+        self.observe('skinbaron_request_seconds', labels, seconds, LATENCY_BUCKETS)
+        if size is not None:
+            self.observe('skinbaron_response_bytes', labels, size, SIZE_BUCKETS)
+        self.increment('skinbaron_responses_total', labels + (('status', str(status)),))
+
+    def record_stage(self, name, seconds, peak=None, failed=False):
+        """
+        Records one call of a pipeline stage.
+        :param peak (int, optional): Traced memory peak of the call in bytes.
+        """
+        labels = (('stage', name),)
+        self.observe('skinbaron_stage_seconds', labels, seconds, STAGE_BUCKETS)
+        if failed:
+            self.increment('skinbaron_stage_errors_total', labels)
+        if peak is not None:
+            with self._lock:
+                self.gauges[('skinbaron_stage_peak_bytes', labels)] = max(
+                    peak, self.gauges.get(('skinbaron_stage_peak_bytes', labels), 0))
+
+    def stage(self, name):
+        """
+        Times a block of code as a pipeline stage.
+        :param name (str): Stage name used as label.
+        :return: Context manager, a shared no-op while disabled.
+        """
+        if not self.enabled:
+            return _NOOP
+        return _Stage(self, name)
+
+    def _memory_enter(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing_owner = True
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            # the enclosing stage keeps the peak reached so far, the counter is reset for this one
+            stack[-1][1] = max(stack[-1][1], peak)
+        tracemalloc.reset_peak()
+        stack.append([current, current])
+
+    def _memory_exit(self):
+        stack = self._local.stack
+        start, peak_so_far = stack.pop()
+        if not tracemalloc.is_tracing():
+            return None
+        peak = max(peak_so_far, tracemalloc.get_traced_memory()[1])
+        if stack:
+            stack[-1][1] = max(stack[-1][1], peak)
+        elif self._tracing_owner:
+            tracemalloc.stop()
+            self._tracing_owner = False
+        return peak - start
+
+    def to_dict(self):
+        """
+        :return (dict): {'histograms': [...], 'counters': [...], 'gauges': [...]}, every entry with name, labels and
+            values; histograms include count, sum, min, max, estimated p50 / p95 / p99 and cumulative buckets.
+        """
+        with self._lock:
+            return {
+                'histograms': [{'name': name, 'labels': dict(labels), **histogram.to_dict()}
+                               for (name, labels), histogram in self.histograms.items()],
+                'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                             for (name, labels), value in self.counters.items()],
+                'gauges': [{'name': name, 'labels': dict(labels), 'value': value}
+                           for (name, labels), value in self.gauges.items()],
+            }
+
+    def to_json(self, indent=None):
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def to_prometheus(self):
+        """
+        :return (str): Everything recorded in the Prometheus text exposition format.
+        """
+        with self._lock:
+            series = {}
+            for (name, labels), histogram in self.histograms.items():
+                cumulative = 0
+                lines = series.setdefault(name, [])
+                for bound, count in zip(list(histogram.bounds) + ['+Inf'], histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', _number(bound)),))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(histogram.sum)}")
+                lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+            for store in (self.counters, self.gauges):
+                for (name, labels), value in store.items():
+                    series.setdefault(name, []).append(f"{name}{_labels(labels)} {_number(value)}")
+        out = []
+        for name, lines in series.items():
+            kind, description = _DESCRIPTIONS.get(name, ('untyped', name))
+            out.append(f"# HELP {name} {description}")
+            out.append(f"# TYPE {name} {kind}")
+            out.extend(lines)
+        return '\n'.join(out) + '\n' if out else ''
+
+
+def _number(value):
+    if isinstance(value, str):
+        return value
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+
+_ENV = os.environ.get('SKINBARON_METRICS', '').lower()
+METRICS = Metrics(enabled=_ENV not in ('', '0', 'false'), memory=_ENV == 'memory')
+
+
+def instrumented(stage):
+    """
+    Decorator recording every call of a function as a pipeline stage in METRICS. While METRICS is disabled the
+    function is called directly.
+    :param stage (str): Stage name.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not METRICS.enabled:
+                return func(*args, **kwargs)
+            with METRICS.stage(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
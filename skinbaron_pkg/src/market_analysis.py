@@ -2,12 +2,21 @@
 import pandas as pd
 import numpy as np
 
+try:
+    from .instrumentation import instrumented
+except ImportError:
+    from instrumentation import instrumented
+
 
 class ItemFilter:
     """
     A class to filter and merge data from two pandas DataFrames: 'newitems_df' and 'bestdeals_df'.
     merge the data and then filter the merged data based on various item attributes like name, rarity, exterior condition, and more.
 
+    The merged frame, the per-row sticker counts/names and an inverted index from sticker name to row positions are
+    built once on first use and shared by every filter_items call. Sorted per-column indexes are added lazily the first
+    time a column is filtered on, so a call only touches the rows its most selective filter lets through.
+
     Attributes:
         newitems_df (DataFrame): DataFrame of new items.
         bestdeals_df (DataFrame): DataFrame of best deals.
@@ -16,10 +25,256 @@ class ItemFilter:
     def __init__(self, newitems_df, bestdeals_df):
         self.newitems_df = newitems_df
         self.bestdeals_df = bestdeals_df
+        self._merged_df = None
+        self._sticker_index = None
+        self._arrays = {}
+        self._uniques = {}
+        self._indexes = {}
+
+    @property
+    def merged_df(self):
+        """
+        The outer merge of newitems_df and bestdeals_df on salesId, with sticker_count and sticker_list columns.
+        Built on first access; treat it as read-only since every filter_items call is answered from it.
+        """
+        if self._merged_df is None:
+            self._build()
+        return self._merged_df
+
+    def _build(self):
+        """
+        Merges both frames and precomputes the sticker columns and the sticker index.
+        """
+        outer_merged_df = pd.merge(self.newitems_df, self.bestdeals_df, on=['salesId'], how='outer')
+        common_columns = [column for column in self.newitems_df.columns.intersection(self.bestdeals_df.columns)
+                          if column != 'salesId']
+        for column in common_columns:
+            outer_merged_df[column] = outer_merged_df[column + '_x'].combine_first(outer_merged_df[column + '_y'])
+            # flags turn into object columns once the outer merge introduces NaN, keep them as nullable booleans
+            if pd.api.types.is_bool_dtype(self.newitems_df[column]) and pd.api.types.is_bool_dtype(self.bestdeals_df[column]):
+                outer_merged_df[column] = outer_merged_df[column].astype('boolean')
+        outer_merged_df = outer_merged_df.drop(columns=[column + suffix for column in common_columns
+                                                        for suffix in ('_x', '_y')])
+
+        stickers = outer_merged_df['stickers'].tolist() if 'stickers' in outer_merged_df.columns \
+            else [None] * len(outer_merged_df)
+        sticker_count_lst = np.zeros(len(stickers), dtype=np.int64)
+        localized_names = [None] * len(stickers)
+        postings = {}
+        for row, value in enumerate(stickers):
+            if not isinstance(value, list):
+                continue
+            names = [sticker['localizedName'] for sticker in value]
+            sticker_count_lst[row] = len(names)
+            localized_names[row] = names
+            for name in set(names):
+                postings.setdefault(name, []).append(row)
+        outer_merged_df['sticker_count'] = sticker_count_lst
+        outer_merged_df['sticker_list'] = localized_names
+
+        self._sticker_index = {name: np.asarray(rows, dtype=np.int64) for name, rows in postings.items()}
+        self._merged_df = outer_merged_df
+
+    def sticker_rows(self, sticker_list):
+        """
+        Looks up the rows carrying all of the given stickers in the inverted sticker index.
+        :param sticker_list (list): Sticker localizedNames that must all be present.
+        :return (ndarray): Sorted row positions in merged_df.
+        """
+        if self._merged_df is None:
+            self._build()
+        rows = None
+        # intersect the shortest posting lists first so the intermediate result stays small
+        for postings in sorted((self._sticker_index.get(name, np.empty(0, dtype=np.int64)) for name in set(sticker_list)),
+                               key=len):
+            rows = postings if rows is None else np.intersect1d(rows, postings, assume_unique=True)
+            if not len(rows):
+                break
+        if rows is None:
+            rows = np.flatnonzero(self._merged_df['sticker_list'].notna().to_numpy())
+        return rows
+
+    def _array(self, column):
+        """
+        The merged column as a plain NumPy array, cached: category codes for categorical columns,
+        factorized codes for other non-numeric columns, 0/1/-1 codes for (nullable) flags and float values otherwise.
+        Missing values become code -1 or NaN.
+        """
+        array = self._arrays.get(column)
+        if array is None:
+            series = self.merged_df[column]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                array = series.cat.codes.to_numpy()
+            elif pd.api.types.is_bool_dtype(series.dtype):
+                array = series.astype('Int8').to_numpy(dtype=np.int8, na_value=-1)
+            elif pd.api.types.is_numeric_dtype(series.dtype):
+                # float32 prices stay float32 so that filter values are rounded to the same precision as the data
+                dtype = np.float32 if series.dtype == np.float32 else np.float64
+                array = series.to_numpy(dtype=dtype, na_value=np.nan)
+            else:
+                array, uniques = pd.factorize(series)
+                self._uniques[column] = {value: code for code, value in enumerate(uniques)}
+            self._arrays[column] = array
+        return array
+
+    def _sorted_index(self, column):
+        """
+        Cached (order, keys) of a column: row positions sorted by their array value, and the sorted values.
+        Missing values (NaN / code -1) are excluded, so keys can be binary-searched.
+        """
+        index = self._indexes.get(column)
+        if index is None:
+            array = self._array(column)
+            valid = np.flatnonzero(~np.isnan(array)) if array.dtype.kind == 'f' else np.flatnonzero(array >= 0)
+            order = valid[np.argsort(array[valid], kind='stable')]
+            index = self._indexes[column] = (order, array[order])
+        return index
+
+    def _key(self, column, value):
+        """
+        Translates a filter value into the key stored in _array(column), None if no row can have that value.
+        """
+        dtype = self.merged_df[column].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            return dtype.categories.get_loc(value) if value in dtype.categories else None
+        if pd.api.types.is_bool_dtype(dtype):
+            return int(bool(value))
+        if pd.api.types.is_numeric_dtype(dtype):
+            return self._array(column).dtype.type(value)
+        self._array(column)
+        return self._uniques[column].get(value)
 
+    def _is_ordered(self, column):
+        return pd.api.types.is_numeric_dtype(self.merged_df[column].dtype) and \
+            not pd.api.types.is_bool_dtype(self.merged_df[column].dtype)
+
+    def _ranges(self, column, op, value):
+        """
+        Translates a predicate into [start, stop) slices of the column's sorted index.
+        """
+        order, keys = self._sorted_index(column)
+        if op in ('==', 'in'):
+            # repeated values (or values with the same key) would select the same rows twice
+            item_keys = {self._key(column, item) for item in (value if op == 'in' else [value])}
+            item_keys.discard(None)
+            return [(np.searchsorted(keys, key, 'left'), np.searchsorted(keys, key, 'right')) for key in item_keys]
+        if not self._is_ordered(column):
+            raise ValueError(f"Range predicate {op!r} needs a numeric column, {column!r} is {self.merged_df[column].dtype}")
+        if op == 'between':
+            low, high = (self._key(column, bound) for bound in value)
+            start = np.searchsorted(keys, low, 'left')
+            # low > high matches nothing
+            return [(start, max(start, np.searchsorted(keys, high, 'right')))]
+        if op == 'round==':
+            return [(np.searchsorted(keys, value - 0.5, 'left'), np.searchsorted(keys, value + 0.5, 'right'))]
+        value = self._key(column, value)
+        bounds = {
+            '<': (0, np.searchsorted(keys, value, 'left')),
+            '<=': (0, np.searchsorted(keys, value, 'right')),
+            '>': (np.searchsorted(keys, value, 'right'), len(keys)),
+            '>=': (np.searchsorted(keys, value, 'left'), len(keys)),
+        }
+        if op not in bounds:
+            raise ValueError(f"Unknown predicate operator {op!r}")
+        return [bounds[op]]
+
+    def _residual_mask(self, predicate, rows):
+        """
+        Evaluates one predicate on the given row positions only.
+        """
+        column, op, value = predicate
+        if column == 'sticker_list':
+            return np.isin(rows, self.sticker_rows(value), assume_unique=True)
+        values = self._array(column)[rows]
+        if op == 'round==':
+            return np.around(values, decimals=0) == value
+        if op == 'between':
+            return (values >= self._key(column, value[0])) & (values <= self._key(column, value[1]))
+        if op in ('<', '<=', '>', '>='):
+            comparison = {'<': np.less, '<=': np.less_equal, '>': np.greater, '>=': np.greater_equal}[op]
+            return comparison(values, self._key(column, value))
+        keys = [self._key(column, item) for item in (value if op == 'in' else [value])]
+        keys = [key for key in keys if key is not None]
+        if not keys:
+            return np.zeros(len(rows), dtype=bool)
+        return np.isin(values, keys)
+
+    def plan(self, predicates):
+        """
+        Orders predicates by the number of rows they match, counted exactly on the sorted per-column indexes
+        (category codes for categorical columns, the inverted index for stickers).
+        :param predicates (list): (column, op, value) tuples, op one of '==', 'in', 'between', '<', '<=', '>', '>='
+            and 'round==' (equality after rounding to a whole number).
+        :return (list): (predicate, matching row count) tuples, most selective first.
+        """
+        estimates = []
+        for predicate in predicates:
+            column, op, value = predicate
+            if column == 'sticker_list':
+                count = len(self.sticker_rows(value))
+            else:
+                count = sum(stop - start for start, stop in self._ranges(column, op, value))
+            estimates.append((predicate, int(count)))
+        return sorted(estimates, key=lambda estimate: estimate[1])
+
+    def _execute(self, predicates):
+        """
+        Runs the plan: the most selective predicate produces candidate rows from its index,
+        the others are checked on those candidates only.
+        :return (ndarray): Sorted row positions matching every predicate.
+        """
+        if not predicates:
+            return np.arange(len(self.merged_df))
+        plan = self.plan(predicates)
+        (column, op, value), count = plan[0]
+        if column == 'sticker_list':
+            rows = self.sticker_rows(value)
+        else:
+            order = self._sorted_index(column)[0]
+            rows = np.sort(np.concatenate([order[start:stop] for start, stop in self._ranges(column, op, value)]
+                                          or [np.empty(0, dtype=np.int64)]))
+            if op == 'round==':
+                rows = rows[self._residual_mask(plan[0][0], rows)]
+        for predicate, count in plan[1:]:
+            if not len(rows):
+                break
+            rows = rows[self._residual_mask(predicate, rows)]
+        return rows
+
+    @staticmethod
+    def predicates(itemName=None, rarityName=None, exteriorName=None, variantTypeName=None, isSouvenir=None,
+                   itemPrice=None, wear=None, isWearPrecise=None, stackable=None, tradeLockHoursLeft=None,
+                   sticker_count=None, sticker_list=None, itemPrice_between=None, wear_below=None,
+                   tradeLockHoursLeft_max=None, rarityName_in=None, exteriorName_in=None, variantTypeName_in=None,
+                   where=None):
+        """
+        Translates filter_items arguments into (column, op, value) predicates, see filter_items for their meaning.
+        :return (list): The predicates, all of which a row has to satisfy.
+        """
+        predicates = [(column, '==', value) for column, value in (
+            ('itemName', itemName), ('rarityName', rarityName), ('exteriorName', exteriorName),
+            ('variantTypeName', variantTypeName), ('isSouvenir', isSouvenir), ('itemPrice', itemPrice),
+            ('isWearPrecise', isWearPrecise), ('stackable', stackable), ('sticker_count', sticker_count),
+        ) if value is not None]
+        # wear and trade lock are matched after rounding to whole numbers, without touching the merged frame
+        predicates += [(column, 'round==', value) for column, value in (
+            ('wear', wear), ('tradeLockHoursLeft', tradeLockHoursLeft)) if value is not None]
+        predicates += [(column, op, value) for column, op, value in (
+            ('itemPrice', 'between', itemPrice_between), ('wear', '<', wear_below),
+            ('tradeLockHoursLeft', '<=', tradeLockHoursLeft_max), ('rarityName', 'in', rarityName_in),
+            ('exteriorName', 'in', exteriorName_in), ('variantTypeName', 'in', variantTypeName_in),
+        ) if value is not None]
+        if sticker_list is not None:
+            predicates.append(('sticker_list', 'contains', sticker_list))
+        predicates += list(where or [])
+        return predicates
+
+    @instrumented('filter_items')
     def filter_items(self, itemName=None, rarityName=None, exteriorName=None, variantTypeName=None, isSouvenir=None,
                      itemPrice=None, wear=None, isWearPrecise=None, stackable=None, tradeLockHoursLeft=None,
-                     sticker_count=None, sticker_list=None):
+                     sticker_count=None, sticker_list=None, itemPrice_between=None, wear_below=None,
+                     tradeLockHoursLeft_max=None, rarityName_in=None, exteriorName_in=None, variantTypeName_in=None,
+                     where=None):
         """
             Filters and merges two datasets, 'newitems_df' and 'bestdeals_df', based on various item attributes.
 
@@ -39,7 +294,18 @@ class ItemFilter:
             :param tradeLockHoursLeft (int, optional): Remaining trade lock hours on the item.
             :param sticker_count (int, optional): Number of stickers on the item.
             :param sticker_list (list, optional): List of specific stickers on the item.
+            :param itemPrice_between (tuple, optional): (low, high) inclusive price range.
+            :param wear_below (float, optional): Only items whose (unrounded) wear is strictly below this value.
+            :param tradeLockHoursLeft_max (float, optional): Only items with at most this many trade lock hours left.
+            :param rarityName_in (list, optional): Rarities to accept.
+            :param exteriorName_in (list, optional): Exteriors/conditions to accept.
+            :param variantTypeName_in (list, optional): Item variant types to accept.
+            :param where (list, optional): Extra (column, op, value) predicates on any merged column,
+                op one of '==', 'in', 'between', '<', '<=', '>', '>='.
             :return: A DataFrame after applying the specified filters.
+
+            All filters are combined with AND. The most selective one (counted on per-column sorted indexes) picks
+            the candidate rows and the others are only checked on those candidates, see plan().
             Example:
             ```
             item_filter = ItemFilter(newitems_df, bestdeals_df)
@@ -60,64 +326,22 @@ class ItemFilter:
             item_filter.filter_items(itemName = 'SG 553 | Bleached', rarityName= 'Consumer Grade', exteriorName= 'Factory New',
             variantTypeName='Rifle', isSouvenir=True, itemPrice=0.04, wear=5, isWearPrecise=True, stackable=False,
             tradeLockHoursLeft=6, sticker_count= 4, sticker_list= [' Dust II (Gold)', 'IEM (Gold) | Rio 2022'])
+
+            5. deal sniping with range and multi-value filters:
+            item_filter.filter_items(itemPrice_between=(5, 20), wear_below=0.07, tradeLockHoursLeft_max=0,
+            rarityName_in=['Covert', 'Classified'], where=[('tradeLockHoursLeft', '<=', 24)])
             ```
             """
 
-        outer_merged_df = pd.merge(self.newitems_df, self.bestdeals_df, on=['salesId'], how='outer')
-        common_columns = list(self.newitems_df.columns.intersection(self.bestdeals_df.columns))[1:]
-        modified_list_x = [item + '_x' for item in common_columns]
-        modified_list_y = [item + '_y' for item in common_columns]
-        # for i in range(len(common_columns)):
-        #     outer_merged_df[common_columns[i]] = outer_merged_df[modified_list_x[i]].combine_first(modified_list_y[i])
-        #     outer_merged_df.drop(columns=[modified_list_x[i], modified_list_y[i]], inplace=True)
-        for i in range(len(common_columns)):
-            outer_merged_df[common_columns[i]] = outer_merged_df[modified_list_x[i]].combine_first(
-                outer_merged_df[modified_list_y[i]])
-            outer_merged_df.drop(columns=[modified_list_x[i], modified_list_y[i]], inplace=True)
-
-        sticker_count_lst = list()
-        localized_names = list()
-        for i in range(outer_merged_df.shape[0]):
-            try:
-                sticker_count_lst.append(len(outer_merged_df.iloc[i]['stickers']))
-                localized_names.append([sticker['localizedName'] for sticker in outer_merged_df.iloc[i]['stickers']])
-
-            except Exception as e:
-                sticker_count_lst.append(0)
-                localized_names.append(None)
-        outer_merged_df['sticker_count'] = sticker_count_lst
-        outer_merged_df['sticker_list'] = localized_names
-
-        if itemName != None:
-            outer_merged_df = outer_merged_df[outer_merged_df['itemName'] == itemName]
-        if rarityName != None:
-            outer_merged_df = outer_merged_df[outer_merged_df['rarityName'] == rarityName]
-        if exteriorName != None:
-            outer_merged_df = outer_merged_df[outer_merged_df['exteriorName'] == exteriorName]
-        if variantTypeName != None:
-            outer_merged_df = outer_merged_df[outer_merged_df['variantTypeName'] == variantTypeName]
-        if isSouvenir != None:
-            outer_merged_df = outer_merged_df[outer_merged_df['isSouvenir'] == isSouvenir]
-        if itemPrice != None:
-            outer_merged_df = outer_merged_df[outer_merged_df['itemPrice'] == itemPrice]
-        if wear != None:
-            outer_merged_df['wear'] = np.around(outer_merged_df['wear'], decimals=0)
-            outer_merged_df = outer_merged_df[outer_merged_df['wear'] == wear]
-        if isWearPrecise != None:
-            outer_merged_df = outer_merged_df[outer_merged_df['isWearPrecise'] == isWearPrecise]
-        if stackable != None:
-            outer_merged_df = outer_merged_df[outer_merged_df['stackable'] == stackable]
-        if tradeLockHoursLeft != None:
-            outer_merged_df['tradeLockHoursLeft'] = np.around(outer_merged_df['tradeLockHoursLeft'], decimals=0)
-            outer_merged_df = outer_merged_df[outer_merged_df['tradeLockHoursLeft'] == tradeLockHoursLeft]
-        if sticker_count != None:
-            outer_merged_df = outer_merged_df[outer_merged_df['sticker_count'] == sticker_count]
-        if sticker_list != None:
-            outer_merged_df = outer_merged_df.dropna(subset=['sticker_list'])
-            indices_to_drop = [i for i in range(outer_merged_df.shape[0]) if
-                               not set(sticker_list).issubset(set(outer_merged_df.iloc[i]['sticker_list']))]
-            outer_merged_df.drop(outer_merged_df.index[[indices_to_drop]], inplace=True)
-
-        return outer_merged_df
-
-
+        predicates = self.predicates(itemName=itemName, rarityName=rarityName, exteriorName=exteriorName,
+                                     variantTypeName=variantTypeName, isSouvenir=isSouvenir, itemPrice=itemPrice,
+                                     wear=wear, isWearPrecise=isWearPrecise, stackable=stackable,
+                                     tradeLockHoursLeft=tradeLockHoursLeft, sticker_count=sticker_count,
+                                     sticker_list=sticker_list, itemPrice_between=itemPrice_between,
+                                     wear_below=wear_below, tradeLockHoursLeft_max=tradeLockHoursLeft_max,
+                                     rarityName_in=rarityName_in, exteriorName_in=exteriorName_in,
+                                     variantTypeName_in=variantTypeName_in, where=where)
+        rows = self._execute(predicates)
+        if len(rows) == len(self.merged_df):
+            return self.merged_df.copy()
+        return self.merged_df.iloc[rows]
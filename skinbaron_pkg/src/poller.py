@@ -0,0 +1,240 @@
+import asyncio
+import inspect
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+try:
+    from .dataparsing import DataProcessor
+    from .market_analysis import ItemFilter
+    from .skinbaron_api import SkinBaronAPIError
+except ImportError:
+    from dataparsing import DataProcessor
+    from market_analysis import ItemFilter
+    from skinbaron_api import SkinBaronAPIError
+
+
+class SeenSet:
+    """
+    A set of the most recently seen ids with a fixed capacity; once full, the oldest ids are forgotten first.
+
+    Attributes:
+        capacity (int): Maximum number of ids kept.
+    """
+
+    def __init__(self, capacity=10000):
+        self.capacity = capacity
+        self._ids = OrderedDict()
+
+    def add(self, value):
+        """
+        :param value: An id.
+        :return (bool): True if the id was not in the set (it is added), False if it was already seen.
+        """
+        if value in self._ids:
+            self._ids.move_to_end(value)
+            return False
+        self._ids[value] = None
+        if len(self._ids) > self.capacity:
+            self._ids.popitem(last=False)
+        return True
+
+    def __contains__(self, value):
+        return value in self._ids
+
+    def __len__(self):
+        return len(self._ids)
+
+
+class NewestItemsPoller:
+    """
+    A change feed over the NewestItems endpoint that only emits listings it has not seen before.
+
+    Every poll fetches the newest `size` listings and drops the ones whose salesId is already in a bounded seen-set,
+    before anything is turned into a DataFrame. The wait between polls follows the observed arrival rate: it aims to
+    poll when about `fill_target` of the window is new, snaps to min_interval when a whole window was new (listings
+    may have been missed) and backs off towards max_interval while nothing arrives or the API errors.
+
+    Attributes:
+        api (SkinBaronAPI or AsyncSkinBaronAPI): Client used to fetch the listings.
+        size (int): Listings fetched per poll, max 100.
+        min_interval (float): Shortest wait between polls in seconds.
+        max_interval (float): Longest wait between polls in seconds.
+        fill_target (float): Share of the window expected to be new when the next poll is due.
+        filters (dict): ItemFilter.filter_items arguments new listings must match to be emitted, None to emit all.
+        seen (SeenSet): salesIds already seen.
+        interval (float): Current wait between polls.
+        rate (float): Smoothed arrival rate of new listings per second, None before the second poll.
+        polls, new_items, emitted, errors, overflows (int): Counters; overflows counts polls where every listing was new.
+
+    Example:
+    ```
+    poller = NewestItemsPoller(SkinBaronAPI(api_key=token, app_id=appID),
+                               filters={'itemPrice_between': (0, 50), 'rarityName_in': ['Covert']})
+    for listings in poller:
+        print(listings[['itemName', 'itemPrice']])
+    ```
+    """
+
+    def __init__(self, api, size=100, min_interval=1.0, max_interval=60.0, fill_target=0.5, seen_capacity=10000,
+                 filters=None, smoothing=0.3, clock=time.monotonic, sleep=time.sleep):
+        """
+        Initializes the NewestItemsPoller class
+        :param api (SkinBaronAPI or AsyncSkinBaronAPI): Client used to fetch the listings.
+        :param size (int, optional): Listings fetched per poll, max 100.
+        :param min_interval (float, optional): Shortest wait between polls in seconds.
+        :param max_interval (float, optional): Longest wait between polls in seconds.
+        :param fill_target (float, optional): Share of the window expected to be new when the next poll is due.
+        :param seen_capacity (int, optional): Number of salesIds remembered.
+        :param filters (dict, optional): ItemFilter.filter_items arguments new listings must match to be emitted.
+        :param smoothing (float, optional): Weight of the latest poll in the smoothed arrival rate.
+        :param clock (callable, optional): Monotonic time in seconds, replaceable in tests.
+        :param sleep (callable, optional): Blocking sleep used between synchronous polls, replaceable in tests.
+        """
+        self.api = api
+        self.size = size
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.fill_target = fill_target
+        self.filters = filters
+        self.smoothing = smoothing
+        self.clock = clock
+        self.sleep = sleep
+        self.seen = SeenSet(seen_capacity)
+        self.interval = min_interval
+        self.rate = None
+        self.polls = 0
+        self.new_items = 0
+        self.emitted = 0
+        self.errors = 0
+        self.overflows = 0
+        self._last_poll = None
+
+    def _update_interval(self, new_count, total):
+        """
+        Updates the arrival rate estimate and the wait before the next poll.
+        """
+        now = self.clock()
+        first = self._last_poll is None
+        if not first and now > self._last_poll:
+            rate = new_count / (now - self._last_poll)
+            self.rate = rate if self.rate is None else self.smoothing * rate + (1 - self.smoothing) * self.rate
+        self._last_poll = now
+
+        if first:
+            interval = self.min_interval
+        elif total and new_count >= total:
+            # the whole window was new: listings may have slipped through, poll again as soon as allowed
+            self.overflows += 1
+            interval = self.min_interval
+        elif new_count and self.rate:
+            interval = self.fill_target * self.size / self.rate
+        else:
+            interval = self.interval * 2
+        self.interval = min(self.max_interval, max(self.min_interval, interval))
+
+    def process(self, response):
+        """
+        Picks the unseen listings out of one NewestItems response and updates the polling interval.
+        :param response (dict): A NewestItems JSON response.
+        :return (DataFrame): The new listings matching `filters`, possibly empty.
+        """
+        self.polls += 1
+        items = response.get('newestItems') or []
+        new, ids = [], {}
+        for item in items:
+            sales_id = item.get('salesId')
+            if sales_id not in self.seen and sales_id not in ids:
+                ids[sales_id] = None
+                new.append(item)
+        self._update_interval(len(new), len(items))
+        if not new:
+            return pd.DataFrame()
+
+        df = DataProcessor.json_to_dataframe({'newestItems': new}, endpoint='NewestItems')
+        if df is None:
+            # json_to_dataframe reports parse and schema errors by returning None; the listings are not marked as
+            # seen, so the next poll picks them up again
+            return self._failed()
+        for sales_id in ids:
+            self.seen.add(sales_id)
+        self.new_items += len(new)
+        if self.filters:
+            no_deals = pd.DataFrame({'salesId': pd.Series(dtype=df['salesId'].dtype)})
+            df = ItemFilter(df, no_deals).filter_items(**self.filters)
+        self.emitted += len(df)
+        return df
+
+    def _failed(self):
+        self.errors += 1
+        self.interval = min(self.max_interval, self.interval * 2)
+        return pd.DataFrame()
+
+    def poll_once(self):
+        """
+        Fetches the newest listings once with a synchronous client.
+        :return (DataFrame): The new listings matching `filters`, empty if there are none or the request failed.
+        """
+        try:
+            response = self.api.newest_items(self.size)
+        except SkinBaronAPIError:
+            return self._failed()
+        return self.process(response)
+
+    async def poll_once_async(self):
+        """
+        Fetches the newest listings once without blocking the event loop. Async clients are awaited, synchronous
+        clients are run in a worker thread.
+        :return (DataFrame): The new listings matching `filters`, empty if there are none or the request failed.
+        """
+        try:
+            if inspect.iscoroutinefunction(self.api.newest_items):
+                response = await self.api.newest_items(self.size)
+            else:
+                response = await asyncio.to_thread(self.api.newest_items, self.size)
+        except SkinBaronAPIError:
+            return self._failed()
+        return self.process(response)
+
+    def listings(self, max_polls=None):
+        """
+        Polls until stopped, yielding every non-empty batch of new listings.
+        :param max_polls (int, optional): Stop after this many polls, None to poll forever.
+        :return (generator): DataFrames of new listings.
+        """
+        polls = 0
+        while max_polls is None or polls < max_polls:
+            df = self.poll_once()
+            polls += 1
+            if len(df):
+                yield df
+            if max_polls is None or polls < max_polls:
+                self.sleep(self.interval)
+
+    async def alistings(self, max_polls=None):
+        """
+        Async version of listings.
+        :param max_polls (int, optional): Stop after this many polls, None to poll forever.
+        :return (async generator): DataFrames of new listings.
+
+        Example:
+        ```
+        async for listings in NewestItemsPoller(AsyncSkinBaronAPI(token, appID)):
+            print(listings)
+        ```
+        """
+        polls = 0
+        while max_polls is None or polls < max_polls:
+            df = await self.poll_once_async()
+            polls += 1
+            if len(df):
+                yield df
+            if max_polls is None or polls < max_polls:
+                await asyncio.sleep(self.interval)
+
+    def __iter__(self):
+        return self.listings()
+
+    def __aiter__(self):
+        return self.alistings()
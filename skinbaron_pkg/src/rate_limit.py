@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    A thread-safe token-bucket rate limiter.
+
+    The bucket holds up to `capacity` tokens and refills at `rate` tokens per second. Every request takes one token;
+    when the bucket is empty the caller reserves a future token and waits for it, so callers are served in the order
+    they asked and the long-run request rate never exceeds `rate`.
+    One bucket can be shared between threads and asyncio tasks.
+
+    Attributes:
+        rate (float): Tokens added per second.
+        capacity (float): Maximum number of tokens, i.e. the largest allowed burst.
+    """
+
+    def __init__(self, rate, capacity=None):
+        """
+        Initializes the TokenBucket class
+        :param rate (float): Tokens added per second, must be positive.
+        :param capacity (float, optional): Maximum burst size, defaults to one second worth of tokens (at least 1).
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity is not None else max(self.rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        """
+        Takes `tokens` from the bucket, going into debt if needed.
+        :param tokens (float, optional): Number of tokens to take.
+        :return (float): Seconds the caller has to wait before its reservation is honored, 0 if it may proceed now.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def try_acquire(self, tokens=1):
+        """
+        Takes `tokens` from the bucket only if they are available right now.
+        :param tokens (float, optional): Number of tokens to take.
+        :return (float): 0 if the tokens were taken, otherwise the seconds until they will be available (nothing is
+            taken in that case).
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens=1):
+        """
+        Blocks the current thread until `tokens` are available.
+        :param tokens (float, optional): Number of tokens to take.
+        :return (float): Seconds spent waiting.
+        """
+        wait = self.reserve(tokens)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens=1):
+        """
+        Suspends the current task until `tokens` are available without blocking the event loop.
+        :param tokens (float, optional): Number of tokens to take.
+        :return (float): Seconds spent waiting.
+        """
+        wait = self.reserve(tokens)
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
@@ -0,0 +1,274 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+
+try:
+    from .instrumentation import Histogram, LATENCY_BUCKETS, METRICS
+    from .rate_limit import TokenBucket
+    from .skinbaron_api import SkinBaronAPI
+except ImportError:
+    from instrumentation import Histogram, LATENCY_BUCKETS, METRICS
+    from rate_limit import TokenBucket
+    from skinbaron_api import SkinBaronAPI
+
+# priority classes, most urgent first
+PRIORITIES = ('interactive', 'normal', 'bulk')
+METHODS = ('get_price_list', 'newest_items', 'best_deals', 'newest_sales_30_days')
+
+
+class _Job:
+    __slots__ = ('priority', 'method', 'args', 'kwargs', 'future', 'submitted')
+
+    def __init__(self, priority, method, args, kwargs):
+        self.priority = priority
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.submitted = time.monotonic()
+
+
+class RequestScheduler:
+    """
+    A priority queue in front of one SkinBaronAPI client per account.
+
+    Calls are submitted with a priority class and queued; worker threads always take the most urgent queued call
+    (first come first served within a class) and send it through the next account whose token bucket has a token
+    right now, round robin. When every account is out of tokens the workers wait for the earliest refill, so no
+    account is sent more than its rate, and an interactive call submitted meanwhile goes out before all queued bulk
+    work. Calls already on the wire are not interrupted.
+
+    Attributes:
+        clients (list): One SkinBaronAPI (or compatible) client per account.
+        limiters (list): The TokenBucket of each account.
+        workers (int): Number of calls that may be in flight at once, over all accounts.
+
+    Example:
+    ```
+    accounts = [(token_a, app_a), (token_b, app_b)]
+    with RequestScheduler(accounts, rate_limit=1) as scheduler:
+        sweeps = [scheduler.submit('newest_sales_30_days', name, False, False, priority='bulk') for name in names]
+        listings = scheduler.submit('newest_items', 20, priority='interactive').result()  # ahead of the sweep
+        alerts_api = scheduler.client('interactive')
+        deals = alerts_api.best_deals(50)
+        print(scheduler.queue_stats())
+    ```
+    """
+
+    def __init__(self, accounts, rate_limit=1.0, burst=None, workers=None, client_factory=SkinBaronAPI,
+                 limiters=None, metrics=None):
+        """
+        Initializes the RequestScheduler class
+        :param accounts (list): (api_key, app_id) pairs, one per account.
+        :param rate_limit (float, optional): Requests per second allowed for each account.
+        :param burst (float, optional): Token bucket size of each account, defaults to one second worth of requests.
+        :param workers (int, optional): Worker threads, i.e. calls in flight at once, defaults to 4 per account.
+        :param client_factory (callable, optional): Called with (api_key, app_id) to build each account's client,
+            e.g. functools.partial(SkinBaronAPI, base_url=...).
+        :param limiters (list, optional): Existing TokenBuckets, one per account, used instead of new ones, e.g. to
+            share an account's quota with an AsyncSkinBaronAPI.
+        :param metrics (Metrics, optional): Where queue wait times are recorded while it is enabled, defaults to the
+            shared instrumentation.METRICS.
+        """
+        if not accounts:
+            raise ValueError("at least one account is needed")
+        if limiters is not None and len(limiters) != len(accounts):
+            raise ValueError("one limiter per account is needed")
+        self.clients = [client_factory(api_key, app_id) for api_key, app_id in accounts]
+        self.limiters = list(limiters) if limiters is not None else [TokenBucket(rate_limit, burst) for _ in accounts]
+        self.workers = workers or 4 * len(accounts)
+        self.metrics = metrics if metrics is not None else METRICS
+
+        self._queue = []
+        self._sequence = itertools.count()
+        self._next_account = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._queued = [0] * len(PRIORITIES)
+        self._max_queued = [0] * len(PRIORITIES)
+        self._submitted = [0] * len(PRIORITIES)
+        self._completed = [0] * len(PRIORITIES)
+        self._failed = [0] * len(PRIORITIES)
+        self._waits = [Histogram(LATENCY_BUCKETS) for _ in PRIORITIES]
+        self._dispatched = [0] * len(accounts)
+        self._in_flight = [0] * len(accounts)
+        self._threads = [threading.Thread(target=self._work, daemon=True, name=f'skinbaron-scheduler-{i}')
+                         for i in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    @staticmethod
+    def _priority(priority):
+        if isinstance(priority, int) and 0 <= priority < len(PRIORITIES):
+            return priority
+        try:
+            return PRIORITIES.index(priority)
+        except ValueError:
+            raise ValueError(f"priority must be one of {PRIORITIES}") from None
+
+    def submit(self, method, *args, priority='normal', **kwargs):
+        """
+        Queues one client call.
+        :param method (str): A SkinBaronAPI method name, one of METHODS.
+        :param priority (str or int, optional): 'interactive', 'normal' or 'bulk' (or its index in PRIORITIES).
+        :return (Future): Resolves to the call's result, or raises its SkinBaronAPIError.
+        """
+        if method not in METHODS:
+            raise ValueError(f"method must be one of {METHODS}")
+        job = _Job(self._priority(priority), method, args, kwargs)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("cannot submit to a scheduler that was shut down")
+            heapq.heappush(self._queue, (job.priority, next(self._sequence), job))
+            self._submitted[job.priority] += 1
+            self._queued[job.priority] += 1
+            self._max_queued[job.priority] = max(self._max_queued[job.priority], self._queued[job.priority])
+            self._condition.notify()
+        return job.future
+
+    def client(self, priority='normal'):
+        """
+        A blocking client whose calls go through this scheduler with one priority, a drop-in for SkinBaronAPI where
+        only the METHODS are used (e.g. `lambda api_key, app_id: scheduler.client('bulk')` as the
+        newestsales_df_pipeline endpoint factory).
+        :param priority (str or int, optional): Priority class of every call.
+        :return (ScheduledClient): The client.
+        """
+        return ScheduledClient(self, self._priority(priority))
+
+    def _take_token(self):
+        """
+        Finds the next account, round robin, with a token available now. Called with the condition held.
+        :return (tuple): (account index, 0) or (None, seconds until the earliest account has a token).
+        """
+        count = len(self.limiters)
+        wait = None
+        for offset in range(count):
+            account = (self._next_account + offset) % count
+            account_wait = self.limiters[account].try_acquire()
+            if not account_wait:
+                self._next_account = (account + 1) % count
+                return account, 0.0
+            wait = account_wait if wait is None else min(wait, account_wait)
+        return None, wait
+
+    def _next_job(self):
+        """
+        Blocks until the most urgent job can be sent.
+        :return (tuple): (job, account index), or (None, None) once shut down and drained.
+        """
+        with self._condition:
+            while True:
+                if not self._queue:
+                    if self._closed:
+                        return None, None
+                    self._condition.wait()
+                    continue
+                if self._queue[0][2].future.cancelled():
+                    self._queued[heapq.heappop(self._queue)[0]] -= 1
+                    continue
+                account, wait = self._take_token()
+                if account is None:
+                    # woken early by a new submission, which may be more urgent than the current head
+                    self._condition.wait(wait)
+                    continue
+                _, _, job = heapq.heappop(self._queue)
+                self._queued[job.priority] -= 1
+                if not job.future.set_running_or_notify_cancel():
+                    # cancelled after the check above, its token is spent
+                    continue
+                self._dispatched[account] += 1
+                self._in_flight[account] += 1
+                wait = time.monotonic() - job.submitted
+                self._waits[job.priority].observe(wait)
+                if self.metrics.enabled:
+                    self.metrics.observe('skinbaron_scheduler_wait_seconds', (('priority', PRIORITIES[job.priority]),),
+                                         wait, LATENCY_BUCKETS)
+                return job, account
+
+    def _work(self):
+        while True:
+            job, account = self._next_job()
+            if job is None:
+                return
+            try:
+                result = getattr(self.clients[account], job.method)(*job.args, **job.kwargs)
+            except BaseException as e:
+                job.future.set_exception(e)
+                succeeded = False
+            else:
+                job.future.set_result(result)
+                succeeded = True
+            with self._condition:
+                self._in_flight[account] -= 1
+                if succeeded:
+                    self._completed[job.priority] += 1
+                else:
+                    self._failed[job.priority] += 1
+
+    def queue_stats(self):
+        """
+        Reports queue depth and wait times per priority class and the load of every account.
+        :return (dict): {'priorities': {name: {'queued', 'max_queued', 'submitted', 'completed', 'failed', 'wait'}},
+            'accounts': [{'app_id', 'dispatched', 'in_flight'}]}, where 'wait' summarizes the seconds calls spent queued
+            (count, sum, min, max, p50, p95, p99 and cumulative buckets).
+        """
+        with self._condition:
+            return {
+                'priorities': {name: {'queued': self._queued[i], 'max_queued': self._max_queued[i],
+                                      'submitted': self._submitted[i], 'completed': self._completed[i],
+                                      'failed': self._failed[i], 'wait': self._waits[i].to_dict()}
+                               for i, name in enumerate(PRIORITIES)},
+                'accounts': [{'app_id': getattr(client, 'app_id', None), 'dispatched': dispatched,
+                              'in_flight': in_flight}
+                             for client, dispatched, in_flight in zip(self.clients, self._dispatched, self._in_flight)],
+            }
+
+    def shutdown(self, wait=True, cancel_pending=False):
+        """
+        Stops accepting calls. Queued calls are still sent unless cancel_pending is set.
+        :param wait (bool, optional): Block until the workers are done.
+        :param cancel_pending (bool, optional): Cancel every call that is still queued.
+        """
+        with self._condition:
+            self._closed = True
+            if cancel_pending:
+                for priority, _, job in self._queue:
+                    job.future.cancel()
+                    self._queued[priority] -= 1
+                self._queue.clear()
+            self._condition.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+
+class ScheduledClient:
+    """
+    Blocking SkinBaronAPI stand-in that sends every call through a RequestScheduler with a fixed priority.
+    """
+
+    def __init__(self, scheduler, priority):
+        self.scheduler = scheduler
+        self.priority = priority
+
+    def get_price_list(self):
+        return self.scheduler.submit('get_price_list', priority=self.priority).result()
+
+    def newest_items(self, size):
+        return self.scheduler.submit('newest_items', size, priority=self.priority).result()
+
+    def best_deals(self, size):
+        return self.scheduler.submit('best_deals', size, priority=self.priority).result()
+
+    def newest_sales_30_days(self, item_name, stat_trak, souvenir, doppler_phase=None):
+        return self.scheduler.submit('newest_sales_30_days', item_name, stat_trak, souvenir, doppler_phase,
+                                     priority=self.priority).result()
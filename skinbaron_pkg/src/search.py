@@ -0,0 +1,318 @@
+import heapq
+import pickle
+import re
+from bisect import bisect_left, insort
+
+_SEPARATORS = re.compile(r'[^0-9a-z]+')
+_SYMBOLS = str.maketrans({'★': ' ', '™': ' '})
+# the usual exterior abbreviations are indexed as extra words
+ALIASES = {'factory new': 'fn', 'minimal wear': 'mw', 'field tested': 'ft', 'well worn': 'ww', 'battle scarred': 'bs'}
+
+
+def normalize(name):
+    """
+    Lower-cases a market hash name and turns everything but letters and digits into single spaces, so
+    '★ StatTrak™ Karambit | Doppler (Factory New)' becomes 'stattrak karambit doppler factory new'.
+    """
+    return _SEPARATORS.sub(' ', name.translate(_SYMBOLS).casefold()).strip()
+
+
+def _words(name):
+    """
+    Words a name is indexed under: its normalized words, hyphenated words also written together ('ak47', 'm4a1s')
+    and the exterior abbreviation.
+    """
+    key = normalize(name)
+    words = set(key.split())
+    words.update(_SEPARATORS.sub('', part) for part in name.translate(_SYMBOLS).casefold().split() if '-' in part)
+    words.update(alias for phrase, alias in ALIASES.items() if phrase in key)
+    words.discard('')
+    return words
+
+
+def _grams(word, n):
+    padded = f'^{word}$'
+    return {padded[i:i + n] for i in range(max(len(padded) - n + 1, 1))}
+
+
+def _distance(a, b, limit):
+    """
+    Optimal string alignment distance (Levenshtein plus adjacent transpositions), or limit + 1 once it is certain to
+    exceed `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class ItemIndex:
+    """
+    Local search index over market hash names, e.g. the marketHashName column of GetPriceList, that resolves vague or
+    misspelled queries to exact names without a request.
+
+    Names are split into normalized words (see _words). Every word keeps a posting set of the names containing it, the sorted word
+    list serves prefix lookups (a flattened prefix trie: all words with a prefix form one bisect range) and an n-gram
+    inverted index over the words finds candidates for misspelled query words, which are then confirmed with a
+    bounded edit distance. A query matches the names containing, for every query word, the word itself, a word it is a
+    prefix of, or a word within the allowed number of typos. Results are ranked by the total cost of those matches,
+    then by name length.
+
+    The index is plain dicts, sets and lists, so it pickles (save / load) and can be shared with worker processes;
+    refresh() applies only the names added to or removed from the price list since the last call.
+
+    Attributes:
+        n (int): Length of the n-grams used to find typo candidates.
+        version (int): Incremented by every refresh that changed the index.
+
+    Example:
+    ```
+    index = ItemIndex.from_price_list(api.get_price_list())
+    index.search('ak redlnie ft')       # ['AK-47 | Redline (Field-Tested)', 'StatTrak™ AK-47 | Redline (Field-Tested)']
+    index.resolve('karambit dopler fn')  # '★ Karambit | Doppler (Factory New)'
+    index.refresh(api.get_price_list())  # later, with the refreshed price list
+    index.save('items.idx')
+    ```
+    """
+
+    PREFIX_COST = 0.5
+    TYPO_COST = 1.0
+
+    def __init__(self, names=(), n=2):
+        """
+        Initializes the ItemIndex class
+        :param names (iterable, optional): Market hash names to index.
+        :param n (int, optional): N-gram length for typo candidates, 2 suits the short words of item names.
+        """
+        self.n = n
+        self.version = 0
+        self._names = []
+        self._ids = {}
+        self._free = []
+        self._exact = {}
+        self._postings = {}
+        self._words = []
+        self._grams = {}
+        for name in names:
+            self.add(name)
+
+    @classmethod
+    def from_price_list(cls, price_list, n=2):
+        """
+        Builds an index from a price list.
+        :param price_list (dict or DataFrame): A GetPriceList response or a frame with a marketHashName column.
+        :return (ItemIndex): The index.
+        """
+        return cls(cls._price_list_names(price_list), n=n)
+
+    @staticmethod
+    def _price_list_names(price_list):
+        if isinstance(price_list, dict):
+            return {item['marketHashName'] for item in price_list.get('map') or [] if item.get('marketHashName')}
+        return set(price_list['marketHashName'].dropna().astype(str))
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, name):
+        return name in self._ids
+
+    @property
+    def names(self):
+        return list(self._ids)
+
+    @staticmethod
+    def _max_typos(word):
+        return 0 if len(word) < 4 else 1 if len(word) < 8 else 2
+
+    def add(self, name):
+        """
+        Indexes one name, names already indexed are ignored.
+        :return (bool): True if the name was added.
+        """
+        if name in self._ids:
+            return False
+        item_id = self._free.pop() if self._free else len(self._names)
+        if item_id == len(self._names):
+            self._names.append(name)
+        else:
+            self._names[item_id] = name
+        self._ids[name] = item_id
+        key = normalize(name)
+        self._exact.setdefault(key, set()).add(item_id)
+        for word in _words(name):
+            posting = self._postings.get(word)
+            if posting is None:
+                posting = self._postings[word] = set()
+                insort(self._words, word)
+                for gram in _grams(word, self.n):
+                    self._grams.setdefault(gram, set()).add(word)
+            posting.add(item_id)
+        return True
+
+    def remove(self, name):
+        """
+        Drops one name from the index.
+        :return (bool): True if the name was indexed.
+        """
+        item_id = self._ids.pop(name, None)
+        if item_id is None:
+            return False
+        self._names[item_id] = None
+        self._free.append(item_id)
+        key = normalize(name)
+        self._exact[key].discard(item_id)
+        if not self._exact[key]:
+            del self._exact[key]
+        for word in _words(name):
+            posting = self._postings[word]
+            posting.discard(item_id)
+            if not posting:
+                del self._postings[word]
+                del self._words[bisect_left(self._words, word)]
+                for gram in _grams(word, self.n):
+                    self._grams[gram].discard(word)
+                    if not self._grams[gram]:
+                        del self._grams[gram]
+        return True
+
+    def refresh(self, price_list):
+        """
+        Brings the index in line with a newer price list, touching only the names that appeared or disappeared.
+        :param price_list (dict, DataFrame or iterable): A GetPriceList response, a frame with a marketHashName column
+            or the names themselves.
+        :return (tuple): (added, removed) number of names.
+        """
+        if isinstance(price_list, dict) or hasattr(price_list, 'columns'):
+            names = self._price_list_names(price_list)
+        else:
+            names = set(price_list)
+        removed = [name for name in self._ids if name not in names]
+        added = [name for name in names if name not in self._ids]
+        for name in removed:
+            self.remove(name)
+        for name in added:
+            self.add(name)
+        if added or removed:
+            self.version += 1
+        return len(added), len(removed)
+
+    def _word_matches(self, word, prefix):
+        """
+        Index words a query word may stand for.
+        :param prefix (bool): Also match the words starting with `word`.
+        :return (dict): word -> cost (0 exact, PREFIX_COST for a prefix, TYPO_COST per typo).
+        """
+        matches = {}
+        if word in self._postings:
+            matches[word] = 0.0
+        if prefix:
+            start = bisect_left(self._words, word)
+            for candidate in self._words[start:]:
+                if not candidate.startswith(word):
+                    break
+                matches.setdefault(candidate, self.PREFIX_COST)
+        limit = self._max_typos(word)
+        if limit:
+            grams = _grams(word, self.n)
+            shared = {}
+            for gram in grams:
+                for candidate in self._grams.get(gram, ()):
+                    shared[candidate] = shared.get(candidate, 0) + 1
+            # an edit changes at most n grams (a transposition n + 1), candidates sharing fewer are too far off
+            needed = max(len(grams) - (self.n + 1) * limit, 1)
+            for candidate, count in shared.items():
+                if count >= needed and candidate not in matches:
+                    distance = _distance(word, candidate, limit)
+                    if distance <= limit:
+                        matches[candidate] = self.TYPO_COST * distance
+        return matches
+
+    def search(self, query, limit=10, prefix=True):
+        """
+        Finds the names matching every word of a query, tolerating typos.
+        :param query (str): Free text such as 'ak redline ft' or 'karambit dopler'.
+        :param limit (int, optional): Maximum number of names returned, None for all.
+        :param prefix (bool, optional): Let query words match words they are a prefix of.
+        :return (list): Matching market hash names, best first.
+        """
+        key = normalize(query)
+        words = key.split()
+        if not words:
+            return []
+        # per query word the names it matches, grouped into tiers of equal cost; all set operations, so even words
+        # in thousands of names ('stattrak', 'ft') stay cheap
+        candidates = None
+        word_tiers = []
+        # longer words are usually rarer, starting with them keeps the intersections small
+        for word in sorted(set(words), key=len, reverse=True):
+            by_cost = {}
+            for match, cost in self._word_matches(word, prefix).items():
+                by_cost.setdefault(cost, []).append(self._postings[match])
+            tiers = [(cost, postings[0] if len(postings) == 1 else set().union(*postings))
+                     for cost, postings in sorted(by_cost.items())]
+            matched = tiers[0][1] if len(tiers) == 1 else set().union(*(ids for _, ids in tiers))
+            candidates = matched if candidates is None else candidates & matched
+            if not candidates:
+                return []
+            word_tiers.append(tiers)
+
+        costs = dict.fromkeys(candidates, 0.0)
+        for tiers in word_tiers:
+            remaining = set(candidates)
+            for cost, ids in tiers:
+                hit = remaining & ids
+                if cost:
+                    for item_id in hit:
+                        costs[item_id] += cost
+                remaining -= hit
+                if not remaining:
+                    break
+        for item_id in self._exact.get(key, ()):
+            costs[item_id] = -1.0
+
+        def rank(item_id):
+            return costs[item_id], len(self._names[item_id]), self._names[item_id]
+
+        ranked = sorted(costs, key=rank) if limit is None else heapq.nsmallest(limit, costs, key=rank)
+        return [self._names[item_id] for item_id in ranked]
+
+    def resolve(self, query):
+        """
+        :param query (str): Free text.
+        :return (str): The best matching market hash name, None if nothing matches.
+        """
+        if query in self._ids:
+            return query
+        found = self.search(query, limit=1)
+        return found[0] if found else None
+
+    def save(self, path):
+        """
+        Pickles the index to a file.
+        """
+        with open(path, 'wb') as fh:
+            pickle.dump(self, fh, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path):
+        """
+        Loads an index written by save. Only load files you trust, they are unpickled.
+        :return (ItemIndex): The index.
+        """
+        with open(path, 'rb') as fh:
+            index = pickle.load(fh)
+        if not isinstance(index, ItemIndex):
+            raise TypeError(f"{path} does not contain an ItemIndex")
+        return index
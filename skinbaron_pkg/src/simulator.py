@@ -0,0 +1,499 @@
+import json
+import sys
+import threading
+import time
+import zlib
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .rate_limit import TokenBucket
+except ImportError:
+    from rate_limit import TokenBucket
+
+WEAPONS = ['AK-47', 'M4A4', 'M4A1-S', 'AWP', 'Desert Eagle', 'USP-S', 'Glock-18', 'P250', 'MP9', 'FAMAS',
+           '★ Karambit', '★ Butterfly Knife', '★ M9 Bayonet']
+SKINS = ['Redline', 'Asiimov', 'Hyper Beast', 'Fade', 'Doppler', 'Case Hardened', 'Slaughter', 'Vulcan',
+         'Printstream', 'Neo-Noir', 'Bloodsport', 'Fire Serpent', 'Howl', 'Dragon Lore', 'Gamma Doppler']
+EXTERIORS = ['Factory New', 'Minimal Wear', 'Field-Tested', 'Well-Worn', 'Battle-Scarred']
+RARITIES = ['Consumer Grade', 'Industrial Grade', 'Mil-Spec Grade', 'Restricted', 'Classified', 'Covert']
+VARIANTS = ['Rifle', 'Sniper Rifle', 'Pistol', 'SMG', 'Knife']
+PHASES = ['Phase 1', 'Phase 2', 'Phase 3', 'Phase 4', 'Ruby', 'Sapphire']
+STICKERS = ['Dust II (Gold)', 'Crown (Foil)', 'Howling Dawn', 'iBUYPOWER (Holo)', 'Titan (Holo)',
+            'IEM (Gold) | Rio 2022', 'Natus Vincere (Foil)', 'Team Liquid (Holo)']
+# exterior -> wear range, as on the Steam market
+WEAR_RANGES = [(0.0, 0.07), (0.07, 0.15), (0.15, 0.38), (0.38, 0.45), (0.45, 1.0)]
+
+_MASK64 = (1 << 64) - 1
+
+
+def market_hash_names(n):
+    """
+    Builds a catalog of distinct market hash names.
+    :param n (int): Number of names.
+    :return (list): n names such as 'StatTrak™ AK-47 | Redline (Field-Tested)'; past the 975 combinations of
+        WEAPONS, SKINS and EXTERIORS the skin gets a collection number.
+    """
+    names = []
+    for i in range(n):
+        weapon = WEAPONS[i % len(WEAPONS)]
+        skin = SKINS[(i // len(WEAPONS)) % len(SKINS)]
+        exterior = EXTERIORS[(i // (len(WEAPONS) * len(SKINS))) % len(EXTERIORS)]
+        collection = i // (len(WEAPONS) * len(SKINS) * len(EXTERIORS))
+        if collection:
+            skin = f'{skin} {collection}'
+        if i % 7 == 3:
+            weapon = f'★ StatTrak™ {weapon[2:]}' if weapon.startswith('★') else f'StatTrak™ {weapon}'
+        names.append(f'{weapon} | {skin} ({exterior})')
+    return names
+
+
+def _uniform(ids, seed, salt):
+    """
+    Uniform [0, 1) numbers that are a pure function of (seed, salt, id), using the SplitMix64 finalizer, so a
+    listing or sale looks the same whichever response it is part of.
+    """
+    x = np.asarray(ids, dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        x = x * np.uint64(0x9E3779B97F4A7C15) + np.uint64((seed * 1000003 + salt * 7919 + 1) & _MASK64)
+        x ^= x >> np.uint64(30)
+        x *= np.uint64(0xBF58476D1CE4E5B9)
+        x ^= x >> np.uint64(27)
+        x *= np.uint64(0x94D049BB133111EB)
+        x ^= x >> np.uint64(31)
+    return (x >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+class SyntheticMarket:
+    """
+    Deterministic generated CS:GO market answering the four SkinBaron endpoints with realistically shaped data:
+    lognormal prices, StatTrak™ and knife (★) items, doppler phases on Doppler skins, wear inside the exterior's range
+    and stickers on some listings.
+
+    Every listing and sale is derived from its id and the seed only, so equal requests get equal answers and a
+    listing keeps its attributes across NewestItems polls. The market can be used in place of a SkinBaronAPI
+    instance (same method names) or served over HTTP with SimulatorServer.
+
+    Attributes:
+        names (list): Market hash names of the items.
+        base_prices (ndarray): Typical price of every item.
+        phases (list): Doppler phase of every item, None for items without phases.
+        sales_per_item (int): Sales of every item in the last 30 days.
+        end (Timestamp): Date of the most recent sales.
+        listed (int): Number of listings so far, advanced by tick.
+
+    Example:
+    ```
+    market = SyntheticMarket(items=10000, seed=1)
+    pricelist_df = DataProcessor.json_to_dataframe(market.get_price_list())
+    sales = market.newest_sales_30_days('Doppler', False, False)
+    ```
+    """
+
+    def __init__(self, items=1000, sales_per_item=10, seed=0, end=None, listed=1000):
+        """
+        Initializes the SyntheticMarket class
+        :param items (int, optional): Number of distinct items, i.e. the size of the price list.
+        :param sales_per_item (int, optional): Sales of every item in the 30-day window.
+        :param seed (int, optional): Seed of all generated values.
+        :param end (str or datetime, optional): Date of the most recent sales, defaults to today.
+        :param listed (int, optional): Number of listings on the market at the start.
+        """
+        self.seed = seed
+        self.names = market_hash_names(items)
+        rng = np.random.default_rng(seed)
+        self.base_prices = np.maximum(np.round(rng.lognormal(2.5, 1.5, items), 2), 0.03)
+        self.quantities = rng.integers(1, 41, items)
+        self.phases = [PHASES[i % len(PHASES)] if 'Doppler' in name else None for i, name in enumerate(self.names)]
+        self.sales_per_item = sales_per_item
+        self.end = pd.Timestamp(end if end is not None else pd.Timestamp.now()).normalize()
+        self.listed = listed
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.names)
+
+    def tick(self, new_listings=1):
+        """
+        Lists new items on the market, they show up first in NewestItems.
+        :param new_listings (int, optional): Number of new listings.
+        :return (int): Total number of listings.
+        """
+        with self._lock:
+            self.listed += new_listings
+            return self.listed
+
+    def reprice(self, share=0.1):
+        """
+        Moves the lowest price of a share of the items, so the next GetPriceList differs (and gets a new ETag).
+        :param share (float, optional): Share of the items repriced.
+        """
+        with self._lock:
+            self.version += 1
+            ids = np.arange(len(self.names))
+            changed = _uniform(ids, self.seed, 100 + self.version) < share
+            factors = 0.9 + 0.2 * _uniform(ids, self.seed, 200 + self.version)
+            self.base_prices = np.where(changed, np.round(self.base_prices * factors, 2), self.base_prices)
+
+    def price_list(self):
+        """
+        :return (dict): GetPriceList response covering every item.
+        """
+        lowest = np.round(self.base_prices * (0.85 + 0.15 * _uniform(np.arange(len(self)), self.seed, 3)), 2)
+        return {'map': [
+            {'marketHashName': name, 'lowestPrice': float(lowest[i]), 'quantity': int(self.quantities[i]),
+             'statTrak': 'StatTrak™' in name, 'souvenir': False, 'dopplerClassName': self.phases[i],
+             'url': f'https://skinbaron.de/offers/show?appId=730&search={i}'}
+            for i, name in enumerate(self.names)]}
+
+    def listings(self, size, key='newestItems', newest=None):
+        """
+        Builds a page of listings.
+        :param size (int): Number of listings.
+        :param key (str, optional): 'newestItems' or 'bestDeals'. Best deals are priced 20-50% under the item's
+            typical price, the newest listings around it.
+        :param newest (int, optional): Id after the newest listing returned, defaults to the number of listings so
+            far. Listings are returned newest first.
+        :return (dict): NewestItems / BestDeals response.
+        """
+        newest = self.listed if newest is None else newest
+        salt = 10 if key == 'newestItems' else 20
+        ids = np.arange(newest - 1, max(newest - size, 0) - 1, -1)
+        items = (_uniform(ids, self.seed, salt) * len(self)).astype(np.int64)
+        price_factor = (0.9 + 0.4 * _uniform(ids, self.seed, salt + 1) if key == 'newestItems'
+                        else 0.5 + 0.3 * _uniform(ids, self.seed, salt + 1))
+        prices = np.maximum(np.round(self.base_prices[items] * price_factor, 2), 0.02)
+        position = _uniform(ids, self.seed, salt + 2)
+        sticker_counts = (_uniform(ids, self.seed, salt + 3) ** 3 * 5).astype(np.int64)
+        prefix = 'n' if key == 'newestItems' else 'b'
+        records = []
+        for k, sale_id in enumerate(ids.tolist()):
+            item = int(items[k])
+            name = self.names[item]
+            base_name, exterior = name[:-1].rsplit(' (', 1)
+            low, high = WEAR_RANGES[EXTERIORS.index(exterior)]
+            stickers = [{'localizedName': STICKERS[(sale_id + s) % len(STICKERS)]} for s in range(sticker_counts[k])]
+            records.append({
+                'salesId': f'{prefix}{self.seed}-{sale_id}',
+                'itemName': base_name,
+                'marketHashName': name,
+                'itemPrice': float(prices[k]),
+                'rarityName': 'Covert' if name.startswith('★') else RARITIES[item % len(RARITIES)],
+                'exteriorName': exterior,
+                'variantTypeName': 'Knife' if name.startswith('★') else VARIANTS[item % (len(VARIANTS) - 1)],
+                'dopplerClassName': self.phases[item],
+                'isSouvenir': False,
+                'statTrak': 'StatTrak™' in name,
+                'wear': round(low + (high - low) * float(position[k]), 8),
+                'isWearPrecise': True,
+                'stackable': False,
+                'tradeLockHoursLeft': int(sale_id % 8) * 24,
+                'stickers': stickers or None,
+            })
+        return {key: records}
+
+    def matching_items(self, item_name=None, stat_trak=None, souvenir=None, doppler_phase=None):
+        """
+        Items a GetNewestSales30Days query matches: every name containing item_name (case-insensitive), so vague
+        searches return many items as on the real API.
+        :param stat_trak (bool, optional): Only StatTrak™ items if True, none if False, None for either.
+        :param souvenir (bool, optional): Only Souvenir items if True, none if False, None for either.
+        :return (ndarray): Item positions.
+        """
+        needle = (item_name or '').lower()
+        return np.array([i for i, name in enumerate(self.names)
+                         if needle in name.lower()
+                         and (stat_trak is None or bool(stat_trak) == ('StatTrak™' in name))
+                         and (souvenir is None or bool(souvenir) == name.startswith('Souvenir'))
+                         and (not doppler_phase or self.phases[i] == doppler_phase)], dtype=np.int64)
+
+    def sales(self, items):
+        """
+        Builds the 30-day sales of some items.
+        :param items (array-like): Item positions, e.g. from matching_items.
+        :return (dict): GetNewestSales30Days response, most recent sales first.
+        """
+        items = np.asarray(items, dtype=np.int64)
+        per_item = self.sales_per_item
+        ids = (items[:, None] * per_item + np.arange(per_item)).ravel()
+        item_of_sale = np.repeat(items, per_item)
+        prices = np.maximum(np.round(self.base_prices[item_of_sale] * (0.85 + 0.3 * _uniform(ids, self.seed, 30)), 2),
+                            0.02)
+        days = (_uniform(ids, self.seed, 31) * 30).astype(np.int64)
+        order = np.argsort(days, kind='stable')
+        dates = (self.end - pd.to_timedelta(days, unit='D')).strftime('%Y-%m-%d')
+        wear = _uniform(ids, self.seed, 32)
+        return {'newestSales30Days': [
+            {'itemName': self.names[item_of_sale[k]], 'price': float(prices[k]), 'dateSold': dates[k],
+             'dopplerPhase': self.phases[item_of_sale[k]] or '-', 'wear': round(float(wear[k]), 8)}
+            for k in order.tolist()]}
+
+    # the SkinBaronAPI interface, so a market can stand in for a client
+
+    def get_price_list(self):
+        return self.price_list()
+
+    def newest_items(self, size):
+        return self.listings(size, 'newestItems')
+
+    def best_deals(self, size):
+        return self.listings(size, 'bestDeals')
+
+    def newest_sales_30_days(self, item_name, stat_trak, souvenir, doppler_phase=None):
+        return self.sales(self.matching_items(item_name, stat_trak, souvenir, doppler_phase))
+
+
+class SimulatorServer:
+    """
+    Local HTTP server implementing the SkinBaron API endpoints SkinBaronAPI uses (GetPriceList, NewestItems,
+    BestDeals and GetNewestSales30Days) on top of a SyntheticMarket, for integration and load tests without network
+    access or production quota.
+
+    Latency, error rate, per-API-key rate limiting (429 with Retry-After) and the page size limit are configurable
+    and can be changed while the server runs. GetPriceList answers carry an ETag and honour If-None-Match, so the
+    ResponseCache revalidation path is exercised too. Point a client at it with base_url=server.url (or by setting
+    SkinBaronAPI.BASE_URL).
+
+    Attributes:
+        market (SyntheticMarket): The served market.
+        latency (float): Seconds every answer is delayed.
+        jitter (float): Extra random delay of up to this many seconds.
+        error_rate (float): Share of requests answered with a 503.
+        max_size (int): Largest NewestItems / BestDeals page, like the API's limit of 100.
+        new_listings (int): Listings added to the market before every NewestItems answer.
+        stats (dict): Request counters per endpoint and status code.
+
+    Example:
+    ```
+    with SimulatorServer(SyntheticMarket(items=20000), latency=0.05, error_rate=0.02, rate_limit=5) as server:
+        api = SkinBaronAPI('key', 'app', base_url=server.url)
+        print(len(api.get_price_list()['map']))
+        print(server.stats)
+    ```
+    """
+
+    ENDPOINTS = ('GetPriceList', 'NewestItems', 'BestDeals', 'GetNewestSales30Days')
+
+    def __init__(self, market=None, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+                 rate_limit=None, burst=None, retry_after=1, max_size=100, new_listings=5, seed=0):
+        """
+        Initializes the SimulatorServer class
+        :param market (SyntheticMarket, optional): Served market, defaults to SyntheticMarket(seed=seed).
+        :param host (str, optional): Interface the server binds to.
+        :param port (int, optional): Port, 0 picks a free one (see url).
+        :param latency (float, optional): Seconds every answer is delayed.
+        :param jitter (float, optional): Extra uniformly random delay of up to this many seconds.
+        :param error_rate (float, optional): Share of requests answered with 503 Service Unavailable.
+        :param rate_limit (float, optional): Requests per second allowed per API key, None for no limit. Requests
+            over the limit get a 429.
+        :param burst (float, optional): Bucket size of the rate limit, defaults to one second worth of requests.
+        :param retry_after (int, optional): Retry-After seconds sent with 429 and 503 answers, None to leave it out.
+        :param max_size (int, optional): Largest NewestItems / BestDeals page.
+        :param new_listings (int, optional): Listings added before every NewestItems answer, so pollers see new ones.
+        :param seed (int, optional): Seed of the market (if none is given) and of the latency / error draws.
+        """
+        self.market = market if market is not None else SyntheticMarket(seed=seed)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.retry_after = retry_after
+        self.max_size = max_size
+        self.new_listings = new_listings
+        self.stats = {'requests': 0, 'endpoints': {}, 'statuses': {}}
+        self._random = np.random.default_rng(seed)
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._price_list = None
+        self._server = _QuietServer((host, port), _SimulatorHandler)
+        self._server.daemon_threads = True
+        self._server.simulator = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """
+        Serves requests on a background thread.
+        :return (SimulatorServer): self
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops serving and releases the port.
+        """
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def serve_forever(self):
+        """
+        Serves requests on the calling thread until interrupted.
+        """
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def _draw(self):
+        with self._lock:
+            return self._random.random(2)
+
+    def _throttled(self, api_key):
+        """
+        :return (float): 0 if the request is within the key's rate limit, otherwise seconds until it would be.
+        """
+        if self.rate_limit is None:
+            return 0.0
+        with self._lock:
+            bucket = self._buckets.get(api_key)
+            if bucket is None:
+                bucket = self._buckets[api_key] = TokenBucket(self.rate_limit, self.burst)
+        return bucket.try_acquire()
+
+    def _price_list_body(self):
+        """
+        Encoded price list with its ETag, re-encoded only when the market was repriced.
+        """
+        with self._lock:
+            if self._price_list is None or self._price_list[0] != self.market.version:
+                body = json.dumps(self.market.price_list()).encode()
+                etag = '"%d-%08x"' % (self.market.version, zlib.crc32(body))
+                self._price_list = (self.market.version, body, etag, formatdate(usegmt=True))
+            return self._price_list[1:]
+
+    def answer(self, endpoint, request, headers):
+        """
+        Computes the answer to one request.
+        :param endpoint (str): Path of the request, e.g. 'NewestItems'.
+        :param request (dict): Decoded JSON body.
+        :param headers (Message): Request headers.
+        :return (tuple): (status, headers dict, body bytes)
+        """
+        delay_draw, error_draw = self._draw()
+        delay = self.latency + self.jitter * delay_draw
+        if delay:
+            time.sleep(delay)
+        retry_headers = {'Retry-After': str(self.retry_after)} if self.retry_after is not None else {}
+
+        if endpoint not in self.ENDPOINTS:
+            return 404, {}, json.dumps({'message': f'Unknown endpoint {endpoint}'}).encode()
+        if not request.get('apikey'):
+            return 403, {}, json.dumps({'message': 'apikey missing'}).encode()
+        wait = self._throttled(request['apikey'])
+        if wait:
+            return 429, retry_headers, json.dumps({'message': 'Too many requests'}).encode()
+        if error_draw < self.error_rate:
+            return 503, retry_headers, json.dumps({'message': 'Service unavailable'}).encode()
+
+        if endpoint == 'GetPriceList':
+            body, etag, last_modified = self._price_list_body()
+            validators = {'ETag': etag, 'Last-Modified': last_modified}
+            if headers.get('If-None-Match') == etag:
+                return 304, validators, b''
+            return 200, validators, body
+        if endpoint == 'GetNewestSales30Days':
+            answer = self.market.newest_sales_30_days(request.get('itemName'), request.get('statTrak'),
+                                                      request.get('souvenir'), request.get('dopplerPhase'))
+        else:
+            size = request.get('size')
+            if not isinstance(size, int) or not 0 < size <= self.max_size:
+                return 400, {}, json.dumps({'message': f'size must be between 1 and {self.max_size}'}).encode()
+            if endpoint == 'NewestItems':
+                self.market.tick(self.new_listings)
+                answer = self.market.listings(size, 'newestItems')
+            else:
+                answer = self.market.listings(size, 'bestDeals')
+        return 200, {}, json.dumps(answer).encode()
+
+    def _record(self, endpoint, status):
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats['endpoints'][endpoint] = self.stats['endpoints'].get(endpoint, 0) + 1
+            self.stats['statuses'][status] = self.stats['statuses'].get(status, 0) + 1
+
+
+class _QuietServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # clients closing pooled keep-alive connections are not errors
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class _SimulatorHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        simulator = self.server.simulator
+        endpoint = self.path.strip('/')
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            request = None
+        if not isinstance(request, dict):
+            status, headers, body = 400, {}, json.dumps({'message': 'Invalid JSON body'}).encode()
+        else:
+            status, headers, body = simulator.answer(endpoint, request, self.headers)
+        simulator._record(endpoint, status)
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Serves a simulated SkinBaron API.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--items', type=int, default=10000, help='number of items on the market')
+    parser.add_argument('--sales-per-item', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds every answer is delayed')
+    parser.add_argument('--jitter', type=float, default=0.0, help='extra random delay, in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests answered with 503')
+    parser.add_argument('--rate-limit', type=float, help='requests per second per API key')
+    parser.add_argument('--burst', type=float)
+    parser.add_argument('--max-size', type=int, default=100)
+    args = parser.parse_args(argv)
+
+    market = SyntheticMarket(items=args.items, sales_per_item=args.sales_per_item, seed=args.seed)
+    server = SimulatorServer(market, args.host, args.port, args.latency, args.jitter, args.error_rate,
+                             args.rate_limit, args.burst, max_size=args.max_size, seed=args.seed)
+    print(f"Serving a market of {len(market)} items on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,85 @@
+import random
+import time
+from email.utils import parsedate_to_datetime
+
 import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from .instrumentation import METRICS
+except ImportError:
+    from instrumentation import METRICS
+
+
+def sales_query(query):
+    """
+    Normalizes one sales search into SkinBaronAPI.newest_sales_30_days arguments. Shared by every batch helper
+    (Report_generator.newestsales_batch_pipeline, AsyncSkinBaronAPI.gather_newest_sales) so they accept the same shapes.
+    :param query (str, tuple or dict): An item name, an (item_name, stat_trak, souvenir[, doppler_phase]) tuple,
+        or a dict keyed like the newest_sales_30_days parameters.
+    :return (tuple): (item_name, stat_trak, souvenir, doppler_phase)
+    """
+    if isinstance(query, str):
+        return query, False, False, None
+    if isinstance(query, dict):
+        return (query['item_name'], query.get('stat_trak', False), query.get('souvenir', False),
+                query.get('doppler_phase'))
+    item_name, stat_trak, souvenir, *rest = query
+    return item_name, stat_trak, souvenir, rest[0] if rest else None
+
+
+class SkinBaronAPIError(Exception):
+    """
+    Base class for all errors raised by SkinBaronAPI.
+
+    Attributes:
+        endpoint (str): The API endpoint the failed request was sent to.
+    """
+
+    def __init__(self, message, endpoint=None):
+        super().__init__(message)
+        self.endpoint = endpoint
+
+
+class SkinBaronConnectionError(SkinBaronAPIError):
+    """
+    Raised when the API could not be reached (DNS, connection refused, timeout) after all retries.
+    """
+
+
+class SkinBaronHTTPError(SkinBaronAPIError):
+    """
+    Raised when the API answers with a non-2xx status code.
+
+    Attributes:
+        status_code (int): HTTP status code returned by the API.
+        response (Response): The final response object.
+    """
+
+    def __init__(self, message, endpoint=None, status_code=None, response=None):
+        super().__init__(message, endpoint)
+        self.status_code = status_code
+        self.response = response
+
+
+class SkinBaronRateLimitError(SkinBaronHTTPError):
+    """
+    Raised when the API keeps answering 429 after all retries.
+
+    Attributes:
+        retry_after (float): Seconds the server asked us to wait, None if it did not say.
+    """
+
+    def __init__(self, message, endpoint=None, status_code=429, response=None, retry_after=None):
+        super().__init__(message, endpoint, status_code, response)
+        self.retry_after = retry_after
+
+
+class SkinBaronResponseError(SkinBaronAPIError):
+    """
+    Raised when the API answers 2xx but the body is not valid JSON, or not the payload the endpoint should return.
+    """
+
 
 class SkinBaronAPI:
 
@@ -6,11 +87,21 @@ class SkinBaronAPI:
     A class to interact with the SkinBaron API.
     provides methods to fetch different data from the SkinBaron API, such as price lists, newest items, best deals, and sales data over the last 30 days.
 
+    All requests go through one pooled keep-alive requests.Session, so consecutive calls reuse the same TCP/TLS connection.
+    429 and 5xx answers as well as connection errors are retried with jittered exponential backoff (honoring Retry-After),
+    and failures are raised as SkinBaronAPIError subclasses instead of being returned as None.
+
     Attributes:
         BASE_URL (str): base URL for the SkinBaron API.
         HEADERS (dict): Default headers for API requests.
+        DEFAULT_TIMEOUT (tuple): (connect, read) timeout in seconds used for endpoints not listed in ENDPOINT_TIMEOUTS.
+        ENDPOINT_TIMEOUTS (dict): Per-endpoint (connect, read) timeouts, GetPriceList gets a longer read timeout since it covers the whole market.
+        RETRY_STATUSES (frozenset): HTTP status codes that are retried.
         api_key (str): API key for the SkinBaron API.
         app_id (str): Application ID for the SkinBaron account.(Note: each account has its identical app_id)
+        session (Session): The pooled session used for every request.
+        cache (ResponseCache): Optional response cache, see the cache module.
+        metrics (Metrics): Where request latency, size and status are recorded while it is enabled.
     """
 
     BASE_URL = "https://api.skinbaron.de"
@@ -18,33 +109,243 @@ class SkinBaronAPI:
         'Content-Type': 'application/json',
         'x-requested-with': 'XMLHttpRequest'
     }
+    DEFAULT_TIMEOUT = (3.05, 30)
+    ENDPOINT_TIMEOUTS = {
+        "GetPriceList": (3.05, 120),
+        "NewestItems": (3.05, 15),
+        "BestDeals": (3.05, 15),
+        "GetNewestSales30Days": (3.05, 30),
+    }
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
 
-    def __init__(self, api_key, app_id):
+    def __init__(self, api_key, app_id, pool_size=10, timeouts=None, max_retries=3, backoff_factor=0.5,
+                 backoff_max=30.0, base_url=None, session=None, cache=None, metrics=None):
         """
         Initializes the SkinBaronAPI class
         :param api_key: API key for the SkinBaron API.
         :param app_id: Application ID for the SkinBaron account.
+        :param pool_size (int, optional): Maximum number of keep-alive connections kept open to the API host.
+        :param timeouts (dict, optional): Per-endpoint (connect, read) timeouts overriding ENDPOINT_TIMEOUTS.
+        :param max_retries (int, optional): How many times a retryable failure is retried before raising.
+        :param backoff_factor (float, optional): Base delay in seconds, the n-th retry waits up to backoff_factor * 2**n.
+        :param backoff_max (float, optional): Upper bound in seconds for a single backoff delay. A Retry-After longer
+            than this is not waited for, the request fails right away instead.
+        :param base_url (str, optional): Overrides BASE_URL, e.g. to point the client at a local stub server.
+        :param session (Session, optional): Session to use instead of creating a new pooled one.
+        :param cache (ResponseCache, optional): Response cache consulted before every request, None to always hit the API.
+        :param metrics (Metrics, optional): Request metrics collector, defaults to the shared instrumentation.METRICS.
         """
         self.api_key = api_key
         self.app_id = app_id
+        if base_url is not None:
+            self.BASE_URL = base_url.rstrip('/')
+        self.timeouts = dict(self.ENDPOINT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.retries = 0
+        self.cache = cache
+        self.metrics = metrics if metrics is not None else METRICS
 
-    def _post_request(self, endpoint, data):
+        if session is None:
+            session = requests.Session()
+            # retries are handled in _post_request, the adapter only provides the connection pool
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        session.headers.update(self.HEADERS)
+        self.session = session
+
+    def close(self):
+        """
+        Closes the underlying session and all pooled connections.
         """
-        Sends a POST request to a specified endpoint of the SkinBaron API.
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def connection_stats(self):
+        """
+        Reports how many requests were served over a reused keep-alive connection versus a newly opened one.
+        :return (dict): 'requests', 'new_connections', 'reused_connections' and 'retries' counters.
+        """
+        requests_sent = 0
+        new_connections = 0
+        for adapter in set(self.session.adapters.values()):
+            poolmanager = getattr(adapter, 'poolmanager', None)
+            if poolmanager is None:
+                continue
+            for key in list(poolmanager.pools.keys()):
+                pool = poolmanager.pools.get(key)
+                if pool is None:
+                    continue
+                requests_sent += pool.num_requests
+                new_connections += pool.num_connections
+        return {
+            "requests": requests_sent,
+            "new_connections": new_connections,
+            "reused_connections": max(requests_sent - new_connections, 0),
+            "retries": self.retries,
+        }
+
+    @staticmethod
+    def _parse_retry_after(value):
+        """
+        Parses a Retry-After header, given either in seconds or as an HTTP date.
+        :param value (str): The raw header value.
+        :return (float): Seconds to wait, or None if the header is missing or unreadable.
+        """
+        if not value:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(retry_at.timestamp() - time.time(), 0.0)
+
+    def _backoff_delay(self, attempt, retry_after=None):
+        """
+        Computes how long to wait before the next retry using full-jitter exponential backoff.
+        :param attempt (int): Zero-based number of the retry about to happen.
+        :param retry_after (float, optional): Delay requested by the server, never undercut. _send does not retry
+            when it exceeds backoff_max, so the result stays within backoff_max.
+        :return (float): Seconds to sleep.
+        """
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_factor * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def _send(self, endpoint, data, headers=None, stream=False):
+        """
+        Sends a POST request to a specified endpoint, retrying 429/5xx answers and connection errors.
         :param endpoint (str): The API endpoint to which the request is sent.
-        :param data (dict): Data to be sent in the request.
-        :return (dict): JSON response from the API.
-        :raises Exception: If the post request failed.
+        :param data (dict): Data to be sent in the request, credentials are added here.
+        :param headers (dict, optional): Extra headers for this request, e.g. conditional request validators.
+        :param stream (bool, optional): If True the body is not downloaded up front, the caller reads and closes it.
+        :return (Response): The successful (2xx or 304) response.
+        :raises SkinBaronRateLimitError: If the API still answers 429 after all retries, or asks to wait longer than
+            backoff_max.
+        :raises SkinBaronHTTPError: If the API answers with any other error status.
+        :raises SkinBaronConnectionError: If the API could not be reached after all retries.
         """
         url = f"{self.BASE_URL}/{endpoint}"
-        data.update({"apikey": self.api_key, "appId": self.app_id})
+        payload = dict(data, apikey=self.api_key, appId=self.app_id)
+        timeout = self.timeouts.get(endpoint, self.DEFAULT_TIMEOUT)
+
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = self.session.post(url, json=payload, headers=headers, timeout=timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if self.metrics.enabled:
+                    self.metrics.record_request(endpoint, time.perf_counter() - start, 'error')
+                if attempt >= self.max_retries:
+                    raise SkinBaronConnectionError(f"Could not reach {url}: {e}", endpoint) from e
+                time.sleep(self._backoff_delay(attempt))
+                attempt += 1
+                self.retries += 1
+                continue
+            except requests.RequestException as e:
+                raise SkinBaronAPIError(f"Request to {url} failed: {e}", endpoint) from e
+            if self.metrics.enabled:
+                self._record(endpoint, response, time.perf_counter() - start, stream)
+
+            if response.status_code in self.RETRY_STATUSES:
+                retry_after = self._parse_retry_after(response.headers.get('Retry-After'))
+                too_long = retry_after is not None and retry_after > self.backoff_max
+                if attempt >= self.max_retries or too_long:
+                    message = f"{response.status_code} from {url} after {attempt + 1} attempts"
+                    if too_long:
+                        message += f", Retry-After of {retry_after:g}s exceeds backoff_max"
+                    if response.status_code == 429:
+                        raise SkinBaronRateLimitError(message, endpoint, response=response, retry_after=retry_after)
+                    raise SkinBaronHTTPError(message, endpoint, response.status_code, response)
+                response.close()
+                time.sleep(self._backoff_delay(attempt, retry_after))
+                attempt += 1
+                self.retries += 1
+                continue
+
+            if not response.ok:
+                raise SkinBaronHTTPError(f"{response.status_code} {response.reason} from {url}", endpoint,
+                                         response.status_code, response)
+            return response
+
+    def _record(self, endpoint, response, seconds, stream):
+        """
+        Records a response in the metrics. Streamed bodies are not read here, their size is taken from Content-Length.
+        """
+        if stream:
+            length = response.headers.get('Content-Length')
+            size = int(length) if length and length.isdigit() else None
+        else:
+            size = len(response.content)
+        self.metrics.record_request(endpoint, seconds, response.status_code, size)
+
+    @staticmethod
+    def _decode(response, endpoint):
+        """
+        Decodes the JSON body of a response.
+        :param response (Response): The response to decode.
+        :param endpoint (str): The endpoint the response came from, used for the error message.
+        :return (dict): The decoded JSON body.
+        :raises SkinBaronResponseError: If the response body is not valid JSON.
+        """
         try:
-            response = requests.post(url, json=data, headers=self.HEADERS)
-            response.raise_for_status()
             return response.json()
-        except requests.RequestException as e:
-            print(f"Error: {e}")
+        except ValueError as e:
+            raise SkinBaronResponseError(f"Invalid JSON from {response.url}: {e}", endpoint) from e
+
+    def _conditional_fetch(self, endpoint, data, validators=None):
+        """
+        Fetches an endpoint on behalf of the response cache, revalidating a stale entry when possible.
+        :param endpoint (str): The API endpoint to which the request is sent.
+        :param data (dict): Data to be sent in the request.
+        :param validators (dict, optional): 'etag' and/or 'last_modified' of the cached copy.
+        :return (tuple): (json, size in bytes, validators) for a fresh body, or None if the server answered 304.
+        """
+        headers = {}
+        if validators:
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+        response = self._send(endpoint, data, headers or None)
+        if response.status_code == 304:
             return None
+        new_validators = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+        }
+        return self._decode(response, endpoint), len(response.content), new_validators
+
+    def _post_request(self, endpoint, data):
+        """
+        Sends a POST request to a specified endpoint of the SkinBaron API, answering from the response cache if one is set.
+        :param endpoint (str): The API endpoint to which the request is sent.
+        :param data (dict): Data to be sent in the request.
+        :return (dict): JSON response from the API.
+        :raises SkinBaronRateLimitError: If the API still answers 429 after all retries, or asks to wait longer than
+            backoff_max.
+        :raises SkinBaronHTTPError: If the API answers with any other error status.
+        :raises SkinBaronConnectionError: If the API could not be reached after all retries.
+        :raises SkinBaronResponseError: If the response body is not valid JSON.
+        """
+        if self.cache is not None:
+            return self.cache.fetch(endpoint, data, self._conditional_fetch)
+        return self._decode(self._send(endpoint, data), endpoint)
 
     def get_price_list(self):
         """
@@ -53,6 +354,19 @@ class SkinBaronAPI:
         """
         return self._post_request("GetPriceList", {})
 
+    def stream_price_list(self, chunk_size=65536):
+        """
+        Streams the raw GetPriceList response body instead of decoding it in one go.
+        Meant for DataProcessor.iter_json_to_dataframes, which parses the chunks incrementally. Bypasses the response cache.
+        :param chunk_size (int, optional): Size in bytes of the chunks read from the socket.
+        :return (generator): bytes chunks of the JSON response body.
+        """
+        response = self._send("GetPriceList", {}, stream=True)
+        try:
+            yield from response.iter_content(chunk_size)
+        finally:
+            response.close()
+
     def newest_items(self, size):
         """
         Fetches the list of newest items based on the specified size.
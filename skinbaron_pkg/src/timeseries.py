@@ -0,0 +1,295 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .forecasting import SalesSeries, LinearTrend, parse_list, to_datetime64
+except ImportError:
+    from forecasting import SalesSeries, LinearTrend, parse_list, to_datetime64
+
+
+_DEFAULT_MODEL = LinearTrend()
+
+
+def _key_part(value):
+    """
+    Normalizes a missing key part (None, NaN, pd.NA) to None so equal items share one key.
+    """
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    return value
+
+
+class _Series:
+    """
+    One item's sales: timestamps and prices kept sorted in contiguous, over-allocated buffers so appends are amortized
+    O(new points) instead of rebuilding the whole series.
+    """
+
+    __slots__ = ('timestamps', 'prices', 'size', 'version')
+
+    def __init__(self):
+        self.timestamps = np.empty(0, dtype='datetime64[ns]')
+        self.prices = np.empty(0, dtype=np.float64)
+        self.size = 0
+        self.version = 0
+
+    def values(self):
+        timestamps = self.timestamps[:self.size]
+        prices = self.prices[:self.size]
+        timestamps.flags.writeable = False
+        prices.flags.writeable = False
+        return timestamps, prices
+
+    def _reserve(self, size):
+        if size > len(self.timestamps):
+            capacity = max(size, 2 * len(self.timestamps), 16)
+            timestamps = np.empty(capacity, dtype='datetime64[ns]')
+            prices = np.empty(capacity, dtype=np.float64)
+            timestamps[:self.size] = self.timestamps[:self.size]
+            prices[:self.size] = self.prices[:self.size]
+            self.timestamps, self.prices = timestamps, prices
+
+    def extend(self, timestamps, prices):
+        """
+        Adds points, keeping the series sorted by (timestamp, price).
+        """
+        if not len(timestamps):
+            return
+        order = np.lexsort((prices, timestamps))
+        timestamps, prices = timestamps[order], prices[order]
+        end = self.size + len(timestamps)
+        self._reserve(end)
+        if self.size and (timestamps[0], prices[0]) < (self.timestamps[self.size - 1], self.prices[self.size - 1]):
+            # out-of-order points: merge with the existing ones
+            timestamps = np.concatenate((self.timestamps[:self.size], timestamps))
+            prices = np.concatenate((self.prices[:self.size], prices))
+            order = np.lexsort((prices, timestamps))
+            self.timestamps[:end] = timestamps[order]
+            self.prices[:end] = prices[order]
+        else:
+            self.timestamps[self.size:end] = timestamps
+            self.prices[self.size:end] = prices
+        self.size = end
+        self.version += 1
+
+    def replace_window(self, timestamps, prices):
+        """
+        Replaces every point from the first timestamp of a fetched window onwards with the window.
+        :return (bool): Whether the series changed.
+        """
+        if not len(timestamps):
+            return False
+        order = np.lexsort((prices, timestamps))
+        timestamps, prices = timestamps[order], prices[order]
+        keep = int(np.searchsorted(self.timestamps[:self.size], timestamps[0], side='left'))
+        if (self.size - keep == len(timestamps) and np.array_equal(self.timestamps[keep:self.size], timestamps)
+                and np.array_equal(self.prices[keep:self.size], prices)):
+            return False
+        self.size = keep
+        self.extend(timestamps, prices)
+        return True
+
+
+class TimeSeriesStore:
+    """
+    Sale histories of many items, keyed by (itemName, exteriorName, dopplerPhase).
+
+    Every item's sales are kept as contiguous arrays sorted by time that grow as new sales arrive, so nothing is
+    re-parsed or re-sorted on later runs. The store tracks which items changed: dirty() lists them for callers and
+    predict() refits only the items whose series changed since its last call.
+
+    Example:
+    ```
+    store = TimeSeriesStore()
+    store.ingest(Report_generator.newestsales_df_pipeline(...))
+    print(store.predict())
+    store.ingest(Report_generator.newestsales_df_pipeline(...))  # a later fetch, overlapping the first one
+    print(store.predict())  # only the items with new sales are refitted
+    ```
+    """
+
+    def __init__(self):
+        self._series = {}
+        self._dirty = set()
+        self._predictions = {}
+        self._prediction_params = None
+        self.last_refitted = 0
+
+    @staticmethod
+    def make_key(item_name, exterior_name=None, doppler_phase=None):
+        """
+        :return (tuple): The store key of an item, missing parts normalized to None.
+        """
+        return _key_part(item_name), _key_part(exterior_name), _key_part(doppler_phase)
+
+    def __len__(self):
+        return len(self._series)
+
+    def __contains__(self, key):
+        return key in self._series
+
+    def keys(self):
+        """
+        :return (list): Keys of all items in the store.
+        """
+        return list(self._series)
+
+    def get(self, key):
+        """
+        :param key (tuple): An item key.
+        :return (tuple): Read-only (timestamps, prices) arrays of the item, sorted by time.
+        :raises KeyError: If the item is not in the store.
+        """
+        return self._series[key].values()
+
+    def append(self, key, dates, prices):
+        """
+        Adds new sales of one item.
+        :param key (tuple): The item key, see make_key.
+        :param dates (list or ndarray): Sale dates.
+        :param prices (list or ndarray): Sale prices aligned with dates.
+        """
+        timestamps = to_datetime64(list(dates))
+        prices = np.asarray(prices, dtype=np.float64)
+        if len(timestamps) != len(prices):
+            raise ValueError("Every sale needs a date and a price")
+        if len(timestamps):
+            self._series.setdefault(key, _Series()).extend(timestamps, prices)
+            self._dirty.add(key)
+
+    def ingest(self, newestsales_df, replace_window=True):
+        """
+        Adds the sales of a newestsales_df_pipeline frame (itemName, exteriorName, dopplerPhase, dateSold and price
+        columns). All dates of the frame are parsed by one call.
+        :param newestsales_df (DataFrame): The sales data, one row per item with dateSold / price lists.
+        :param replace_window (bool, optional): Treat every row as a complete window of recent sales, like the 30-day
+            endpoint returns: stored sales from the window's first date onwards are replaced, so re-ingesting an
+            overlapping fetch does not duplicate sales. If False, all rows are appended as new sales.
+        :return (set): Keys of the items that changed.
+        """
+        data = newestsales_df.dropna(subset=['dateSold', 'price'])
+        date_lists = [parse_list(dates, str) for dates in data['dateSold']]
+        price_lists = [parse_list(prices, float) for prices in data['price']]
+        counts = [len(dates) for dates in date_lists]
+        if counts != [len(prices) for prices in price_lists]:
+            raise ValueError("Every sale needs a date and a price")
+        timestamps = to_datetime64([date for dates in date_lists for date in dates])
+        prices = np.array([price for prices in price_lists for price in prices], dtype=np.float64)
+
+        changed = set()
+        start = 0
+        for item_name, exterior_name, doppler_phase, count in zip(
+                data['itemName'], data['exteriorName'], data['dopplerPhase'], counts):
+            key = self.make_key(item_name, exterior_name, doppler_phase)
+            window = slice(start, start + count)
+            start += count
+            if not count:
+                continue
+            series = self._series.setdefault(key, _Series())
+            if replace_window:
+                if series.replace_window(timestamps[window], prices[window]):
+                    changed.add(key)
+            else:
+                series.extend(timestamps[window], prices[window])
+                changed.add(key)
+        self._dirty |= changed
+        return changed
+
+    def dirty(self):
+        """
+        :return (set): Keys of the items changed since the last mark_clean().
+        """
+        return set(self._dirty)
+
+    def mark_clean(self, keys=None):
+        """
+        Clears the dirty flags.
+        :param keys (iterable, optional): Keys to clear, defaults to all.
+        """
+        if keys is None:
+            self._dirty.clear()
+        else:
+            self._dirty.difference_update(keys)
+
+    def to_frame(self, keys=None):
+        """
+        The stored series in the shape of MarketTrends.compute_trend, ready for PricePrediction.price_prediction.
+        :param keys (iterable, optional): Keys of the items to include, defaults to all.
+        :return (DataFrame): itemName, exteriorName, dopplerPhase, dateSold, price and label columns.
+        """
+        keys = self.keys() if keys is None else list(keys)
+        rows = []
+        for key in keys:
+            timestamps, prices = self._series[key].values()
+            rows.append({
+                'itemName': key[0],
+                'exteriorName': key[1],
+                'dopplerPhase': key[2],
+                'dateSold': pd.DatetimeIndex(timestamps).to_list(),
+                'price': prices.tolist(),
+                'label': f"{key[0]} | {key[1]} {key[2]}",
+            })
+        return pd.DataFrame(rows, columns=['itemName', 'exteriorName', 'dopplerPhase', 'dateSold', 'price', 'label'])
+
+    def _series_of(self, keys):
+        """
+        Packs the given items into one SalesSeries, days counted from each item's first sale.
+        """
+        parts = [self._series[key].values() for key in keys]
+        counts = np.array([len(timestamps) for timestamps, _ in parts], dtype=np.int64)
+        if not parts:
+            return SalesSeries([], [], counts, [])
+        timestamps = np.concatenate([timestamps for timestamps, _ in parts])
+        prices = np.concatenate([prices for _, prices in parts])
+        first_dates = np.array([timestamps[0] for timestamps, _ in parts], dtype='datetime64[ns]')
+        days = np.floor_divide(timestamps - np.repeat(first_dates, counts), np.timedelta64(1, 'D'))
+        return SalesSeries(days, prices, counts, first_dates)
+
+    def predict(self, today=None, model=None, level=None):
+        """
+        Predicts every item's price 7 days after `today`, like PricePrediction.price_prediction, refitting only
+        the items that changed since the previous call with the same arguments.
+        :param today (str or datetime, optional): Date the 7 days are counted from, defaults to today.
+        :param model (ForecastModel, optional): Forecasting model, defaults to LinearTrend. Pass the same object on
+            every call to reuse earlier results.
+        :param level (float, optional): If given, adds predicted_lower / predicted_upper interval columns.
+        :return (DataFrame): itemName, exteriorName, dopplerPhase, predicted_price_7_days, the interval columns and
+            fit_r2, fit_n, fit_resid_std, one row per item.
+        """
+        model = model if model is not None else _DEFAULT_MODEL
+        today = pd.to_datetime(today if today is not None else datetime.now().strftime('%Y-%m-%d'))
+        params = (model, today, level)
+        if (self._prediction_params is None or self._prediction_params[0] is not model
+                or self._prediction_params[1:] != params[1:]):
+            self._predictions = {}
+            self._prediction_params = params
+
+        stale = [key for key, series in self._series.items()
+                 if self._predictions.get(key, (None,))[0] != series.version]
+        self.last_refitted = len(stale)
+        if stale:
+            series = self._series_of(stale)
+            fit = model.fit(series)
+            prediction_day = series.days_until(today + timedelta(days=7))
+            predicted = fit.predict(prediction_day)
+            lower, upper = fit.interval(prediction_day, level) if level is not None else (predicted, predicted)
+            for i, key in enumerate(stale):
+                self._predictions[key] = (self._series[key].version, predicted[i], lower[i], upper[i],
+                                          fit.r2[i], fit.n[i], fit.scale[i])
+
+        rows = []
+        for key in self._series:
+            _, predicted, lower, upper, r2, n, scale = self._predictions[key]
+            row = {'itemName': key[0], 'exteriorName': key[1], 'dopplerPhase': key[2],
+                   'predicted_price_7_days': predicted}
+            if level is not None:
+                row['predicted_lower'] = lower
+                row['predicted_upper'] = upper
+            row.update({'fit_r2': r2, 'fit_n': n, 'fit_resid_std': scale})
+            rows.append(row)
+        columns = ['itemName', 'exteriorName', 'dopplerPhase', 'predicted_price_7_days']
+        if level is not None:
+            columns += ['predicted_lower', 'predicted_upper']
+        return pd.DataFrame(rows, columns=columns + ['fit_r2', 'fit_n', 'fit_resid_std'])
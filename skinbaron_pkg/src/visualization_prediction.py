@@ -1,12 +1,60 @@
 
+import os
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
-from sklearn.linear_model import LinearRegression
 
+# matplotlib is imported where a chart is drawn, so importing this module (e.g. only for compute_trend or
+# price_prediction) does not load it
+try:
+    from .forecasting import SalesSeries, LinearTrend, MODELS, parse_list, to_datetime64
+    from .instrumentation import instrumented
+except ImportError:
+    from forecasting import SalesSeries, LinearTrend, MODELS, parse_list, to_datetime64
+    from instrumentation import instrumented
 
 
+def _draw_trends(ax, rows, title):
+    """
+    Draws one line per item of a compute_trend frame on `ax`.
+    """
+    for label, dates, prices in zip(rows['label'], rows['dateSold'], rows['price']):
+        ax.plot(dates, prices, label=label)
+    ax.set_title(title)
+    ax.set_xlabel('Date Sold')
+    ax.set_ylabel('Price')
+
+
+def _render_figure(job):
+    """
+    Renders one grid of price trends to a file. Module level so worker processes can unpickle it.
+    :param job (tuple): (series, path, columns, dpi) where series is a list of (label, dates, prices).
+    :return (str): The written path.
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    series, path, columns, dpi = job
+    columns = max(1, min(columns, len(series)))
+    rows = -(-len(series) // columns)
+    fig = Figure(figsize=(4 * columns, 3 * rows), dpi=dpi)
+    FigureCanvasAgg(fig)
+    try:
+        axes = fig.subplots(rows, columns, squeeze=False).ravel()
+        for ax, (label, dates, prices) in zip(axes, series):
+            ax.plot(dates, prices)
+            ax.set_title(label, fontsize=9)
+            ax.tick_params(labelsize=7)
+            ax.tick_params(axis='x', labelrotation=30)
+        for ax in axes[len(series):]:
+            ax.set_visible(False)
+        fig.tight_layout()
+        fig.savefig(path)
+    finally:
+        fig.clear()
+    return path
+
 
 class MarketTrends:
     """
@@ -14,13 +62,16 @@ class MarketTrends:
     visualize the price trends of different user selected items over time using a line plot.
     """
     @staticmethod
-    def price_trend(newestsales_df):
+    @instrumented('price_trend')
+    def price_trend(newestsales_df, plot=True):
         """
             Processes sales data to show price trends and generates a line plot for visualization.
             This function combinds sales data with the current market price and the lowest price,
             and then visualizes the price trends using a line plot.
 
             :param newestsales_df (DataFrame): DataFrame containing the sales data.
+            :param plot (bool, optional): Whether to show the line plot with plt.show(). Pass False on headless
+                workers and use compute_trend / render_trends instead.
             :return: A DataFrame with updated sales data and visualized price trends.
 
             The function includes internal helper functions to parse date and price lists from strings
@@ -34,79 +85,104 @@ class MarketTrends:
             print(price_trend_df)
             ```
             """
-        data_new_cleaned = newestsales_df.dropna(subset=['dateSold', 'price'])
-        today_date = datetime.now().strftime('%Y-%m-%d')
-
-        data_new_cleaned['dates'] = [data_new_cleaned['dateSold'][i].append(today_date) for i in
-                                     range(data_new_cleaned.shape[0])]
-        data_new_cleaned['prices'] = [data_new_cleaned['price'][i].append(data_new_cleaned['lowestPrice'][i]) for i in
-                                      range(data_new_cleaned.shape[0])]
-        data_new_cleaned = data_new_cleaned[
-            data_new_cleaned.apply(lambda x: len(x['price']) == len(x['dateSold']), axis=1)]
-
-        def parse_date_list(date_str):
-            date_str = date_str.strip('[]')
-            date_list = date_str.split(', ')
-            return [pd.to_datetime(date.strip("'")) for date in date_list]
-
-        def parse_price_list(price_str):
-            price_str = price_str.strip('[]')
-            price_list = price_str.split(', ')
-            return [float(price) for price in price_list]
-
-        updated_dates = []
-        updated_prices = []
-        updated_labels = []
-
-        for index, row in data_new_cleaned.iterrows():
-            label = f"{row['itemName']} | {row['exteriorName']} {row['dopplerPhase']}"
-
-            if isinstance(row['dateSold'], str):
-                x_values = parse_date_list(row['dateSold'])
-                y_values = parse_price_list(row['price'])
-            else:
-                x_values = [pd.to_datetime(date) for date in row['dateSold']]
-                y_values = [float(price) for price in row['price']]
+        data_new_cleaned = MarketTrends.compute_trend(newestsales_df)
+        if plot:
+            import matplotlib.pyplot as plt
+
+            fig, ax = plt.subplots(figsize=(10, 6))
+            _draw_trends(ax, data_new_cleaned, 'Item Price Trends Over Time')
+            ax.legend()
+            plt.show()
+            plt.close(fig)
+        return data_new_cleaned
 
-            # Sort the data based on dates for chronological order
-            combined = sorted(zip(x_values, y_values))
-            x_values_sorted, y_values_sorted = zip(*combined)
+    @staticmethod
+    def compute_trend(newestsales_df):
+        """
+        The data part of price_trend without any plotting: combines the sales data with the current lowest price,
+        parses the date and price lists and sorts them chronologically.
 
-            updated_dates.append(list(x_values_sorted))
-            updated_prices.append(list(y_values_sorted))
-            updated_labels.append(label)
+        :param newestsales_df (DataFrame): DataFrame containing the sales data.
+        :return: The cleaned DataFrame with sorted dateSold / price lists and a label column.
+        """
+        data_new_cleaned = newestsales_df.dropna(subset=['dateSold', 'price']).copy()
+        today_date = datetime.now().strftime('%Y-%m-%d')
 
-        data_new_cleaned['dateSold'] = updated_dates
-        data_new_cleaned['price'] = updated_prices
-        data_new_cleaned['label'] = updated_labels
+        # build new lists rather than appending to the caller's
+        date_lists = [parse_list(dates, str) + [today_date] for dates in data_new_cleaned['dateSold']]
+        price_lists = [parse_list(prices, float) + [lowest_price]
+                       for prices, lowest_price in zip(data_new_cleaned['price'], data_new_cleaned['lowestPrice'])]
+        complete = np.array([len(dates) == len(prices) for dates, prices in zip(date_lists, price_lists)], dtype=bool)
+        data_new_cleaned = data_new_cleaned[complete]
+        date_lists = [dates for dates, keep in zip(date_lists, complete) if keep]
+        price_lists = [prices for prices, keep in zip(price_lists, complete) if keep]
+
+        # parse every date at once and sort all series chronologically in one pass
+        counts = np.array([len(dates) for dates in date_lists], dtype=np.int64)
+        dates = to_datetime64([date for dates in date_lists for date in dates])
+        prices = np.array([price for prices in price_lists for price in prices], dtype=np.float64)
+        order = np.lexsort((prices, dates, np.repeat(np.arange(len(counts)), counts)))
+        timestamps = pd.DatetimeIndex(dates[order]).to_list()
+        sorted_prices = prices[order].tolist()
+        starts = (np.cumsum(counts) - counts).tolist()
+        counts = counts.tolist()
+
+        data_new_cleaned['dateSold'] = [timestamps[start:start + count] for start, count in zip(starts, counts)]
+        data_new_cleaned['price'] = [sorted_prices[start:start + count] for start, count in zip(starts, counts)]
+        data_new_cleaned['label'] = [f"{item_name} | {exterior_name} {doppler_phase}"
+                                     for item_name, exterior_name, doppler_phase in zip(data_new_cleaned['itemName'], data_new_cleaned['exteriorName'],
+                                            data_new_cleaned['dopplerPhase'])]
 
-        data_new_cleaned = data_new_cleaned.drop(columns=['dates', 'prices'])
+        return data_new_cleaned
 
-        # generate plot
-        df = data_new_cleaned.copy()
-        fig, ax = plt.subplots(figsize=(10, 6))
+    @staticmethod
+    def render_trends(trend_df, directory, fmt='png', per_figure=12, columns=3, processes=None, dpi=100):
+        """
+        Writes the price trends to image files without a display, for headless workers and large sweeps.
 
-        for index, row in df.iterrows():
-            label = f"{row['label']}"
-            x_values_sorted = row['dateSold']
-            y_values_sorted = row['price']
+        Items are drawn in grids of `per_figure` subplots, one figure per file. Figures are created with the Agg
+        backend directly (not through pyplot), so nothing is shown, no global figure registry fills up, and every figure
+        is released as soon as its file is written.
 
-            ax.plot(x_values_sorted, y_values_sorted, label=label)
+        :param trend_df (DataFrame): Output of compute_trend / price_trend.
+        :param directory (str): Directory the files are written to, created if missing.
+        :param fmt (str, optional): 'png' or 'svg'.
+        :param per_figure (int, optional): Number of items per figure.
+        :param columns (int, optional): Number of subplot columns in each figure.
+        :param processes (int, optional): Render figures in a pool of this many worker processes, None to render here.
+        :param dpi (int, optional): Resolution of PNG files.
+        :return (list): Paths of the written files, in item order.
 
-        ax.set_title('Item Price Trends Over Time')
-        ax.set_xlabel('Date Sold')
-        ax.set_ylabel('Price')
-        ax.legend()
-        plt.show()
+        Example:
+        ```
+        trend_df = MarketTrends.compute_trend(df)
+        paths = MarketTrends.render_trends(trend_df, 'charts', fmt='svg', per_figure=16, processes=4)
+        ```
+        """
+        if fmt not in ('png', 'svg'):
+            raise ValueError("fmt must be 'png' or 'svg'")
+        os.makedirs(directory, exist_ok=True)
+        jobs = []
+        for number, start in enumerate(range(0, len(trend_df), per_figure)):
+            chunk = trend_df.iloc[start:start + per_figure]
+            series = [(label, np.asarray(dates, dtype='datetime64[ns]'), np.asarray(prices, dtype=np.float64))
+                      for label, dates, prices in zip(chunk['label'], chunk['dateSold'], chunk['price'])]
+            path = os.path.join(directory, f'price_trends_{number:04d}.{fmt}')
+            jobs.append((series, path, columns, dpi))
+
+        if processes and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                return list(pool.map(_render_figure, jobs))
+        return [_render_figure(job) for job in jobs]
 
-        return data_new_cleaned
 
 class PricePrediction:
     """
     predict future prices of items based on historical price trends.
     """
     @staticmethod
-    def price_prediction(price_trend_df):
+    @instrumented('price_prediction')
+    def price_prediction(price_trend_df, today=None, model=None, level=None):
         """
         Predicts future prices of items based on historical price trends.
 
@@ -114,10 +190,20 @@ class PricePrediction:
         based on the price trend data provided. The prediction is 7 days is because it considers CSGO market restrictions
         on selling newly purchased products only after 7 days.
 
+        All items are fitted at once: their series are packed into flat arrays and every slope and intercept comes
+        from the closed-form least-squares solution, giving the same numbers as one LinearRegression per item
+        on days since the item's first sale. Other models from the forecasting module can be plugged in instead.
+
         :param price_trend_df (DataFrame): DataFrame containing price trend data.
-        :return: A DataFrame with predicted prices 7 days into the future and other relevant item details.
+        :param today (str or datetime, optional): Date the 7 days are counted from, defaults to today.
+        :param model (ForecastModel or str, optional): Forecasting model or its name ('linear', 'ewma', 'huber',
+            'theil_sen', 'volume_weighted'), defaults to LinearTrend.
+        :param level (float, optional): If given, adds predicted_lower / predicted_upper columns holding a prediction
+            interval with this coverage probability, e.g. 0.9.
+        :return: A DataFrame with predicted prices 7 days into the future and other relevant item details,
+            plus fit diagnostics: fit_r2 (R²), fit_n (number of data points) and fit_resid_std (residual standard deviation).
 
-        The function includes internal helper functions to parse date and price lists from strings.
+        Dates and prices may also be given as stringified lists.
 
         Example:
         ```
@@ -128,40 +214,27 @@ class PricePrediction:
         ```
         """
         data = price_trend_df
+        if model is None:
+            model = LinearTrend()
+        elif isinstance(model, str):
+            model = MODELS[model]()
 
-        def custom_parse_dates(date_str):
-            if isinstance(date_str, str):
-                date_list = date_str.strip('[]').split(', ')
-                return [pd.to_datetime(date.strip("'")) for date in date_list]
-            else:
-                return [pd.to_datetime(date) for date in date_str]
-
-        def custom_parse_prices(price_str):
-            if isinstance(price_str, str):
-                price_list = price_str.strip('[]').split(', ')
-                return [float(price) for price in price_list]
-            else:
-                return price_str
-
-        today = pd.to_datetime(datetime.now().strftime('%Y-%m-%d'))
+        today = pd.to_datetime(today if today is not None else datetime.now().strftime('%Y-%m-%d'))
         prediction_date = today + timedelta(days=7)
 
-        predictions = []
-        for index, row in data.iterrows():
-            dates = custom_parse_dates(row['dateSold'])
-            prices = custom_parse_prices(row['price'])
-
-            days_since_start = np.array([(date - dates[0]).days for date in dates]).reshape(-1, 1)
-
-            model = LinearRegression()
-            model.fit(days_since_start, prices)
-
-            # Predict price 7 days after today
-            prediction_day = (prediction_date - dates[0]).days
-            predicted_price = model.predict([[prediction_day]])[0]
-            predictions.append(predicted_price)
-
-        data['predicted_price_7_days'] = predictions
+        series = SalesSeries.from_columns(data['dateSold'], data['price'])
+        fit = model.fit(series)
+        prediction_day = series.days_until(prediction_date)
+
+        data['predicted_price_7_days'] = fit.predict(prediction_day)
+        interval_columns = []
+        if level is not None:
+            data['predicted_lower'], data['predicted_upper'] = fit.interval(prediction_day, level)
+            interval_columns = ['predicted_lower', 'predicted_upper']
+        data['fit_r2'] = fit.r2
+        data['fit_n'] = fit.n
+        data['fit_resid_std'] = fit.scale
         data = data[['predicted_price_7_days', 'itemName', 'exteriorName', 'dopplerPhase', 'price', 'dateSold',
-                     'statTrak', 'souvenir', 'lowestPrice', 'quantity', 'url', 'label']]
-        return data
\ No newline at end of file
+                     'statTrak', 'souvenir', 'lowestPrice', 'quantity', 'url', 'label'] + interval_columns +
+                    ['fit_r2', 'fit_n', 'fit_resid_std']]
+        return data
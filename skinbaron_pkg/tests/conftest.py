@@ -0,0 +1,64 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class FakeClock:
+    """
+    Manually advanced stand-in for time.monotonic, sleep() moves it forward instead of blocking.
+    """
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Minimal stand-in for the SkinBaron API.
+    Answers from server.script, a list of (status, headers, body) tuples popped one per request (the last one is repeated),
+    or a callable(endpoint, request_body) returning such a tuple.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        request_body = json.loads(self.rfile.read(length))
+        endpoint = self.path.strip('/')
+        self.server.received.append(request_body)
+        script = self.server.script
+        if callable(script):
+            status, headers, body = script(endpoint, request_body)
+        else:
+            status, headers, body = script.pop(0) if len(script) > 1 else script[0]
+        payload = json.dumps(body).encode() if status != 304 else b''
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.received = []
+    server.script = [(200, {}, {})]
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,106 @@
+import pytest
+import numpy as np
+import pandas as pd
+from skinbaron_pkg.src.alerts import AlertEngine
+from skinbaron_pkg.src.market_analysis import ItemFilter
+from skinbaron_pkg.src.dataparsing import DataProcessor
+
+NAMES = ['AK-47 | Redline', 'AWP | Asiimov', 'M4A4 | Howl', 'Glock-18 | Fade']
+RARITIES = ['Covert', 'Classified', 'Restricted']
+EXTERIORS = ['Factory New', 'Minimal Wear', 'Field-Tested']
+STICKERS = ['Dust II (Gold)', 'Crown (Foil)', 'Howling Dawn']
+
+
+def _listings(n, seed=0):
+    rng = np.random.default_rng(seed)
+    records = []
+    for i in range(n):
+        name = NAMES[rng.integers(len(NAMES))]
+        exterior = EXTERIORS[rng.integers(len(EXTERIORS))]
+        records.append({
+            'salesId': 'id%d' % i,
+            'itemName': name,
+            'marketHashName': f'{name} ({exterior})',
+            'rarityName': RARITIES[rng.integers(len(RARITIES))],
+            'exteriorName': exterior,
+            'isSouvenir': bool(rng.integers(2)),
+            'itemPrice': float(np.round(rng.uniform(1, 100), 2)),
+            'wear': float(rng.uniform(0, 1)),
+            'tradeLockHoursLeft': float(rng.integers(0, 8)),
+            'stickers': [{'localizedName': STICKERS[k]} for k in rng.choice(3, size=rng.integers(0, 3), replace=False)],
+        })
+    return records
+
+
+def _specs(seed=1):
+    rng = np.random.default_rng(seed)
+    specs = []
+    for _ in range(300):
+        spec = {}
+        if rng.random() < 0.5:
+            spec['itemName'] = NAMES[rng.integers(len(NAMES))]
+        if rng.random() < 0.3:
+            spec['rarityName_in'] = list(rng.choice(RARITIES, size=2, replace=False))
+        if rng.random() < 0.3:
+            spec['exteriorName'] = EXTERIORS[rng.integers(len(EXTERIORS))]
+        if rng.random() < 0.3:
+            spec['isSouvenir'] = bool(rng.integers(2))
+        if rng.random() < 0.5:
+            low = float(rng.uniform(0, 60))
+            spec['itemPrice_between'] = (low, low + float(rng.uniform(0, 40)))
+        if rng.random() < 0.3:
+            spec['wear_below'] = float(rng.uniform(0, 1))
+        if rng.random() < 0.3:
+            spec['tradeLockHoursLeft_max'] = float(rng.integers(0, 8))
+        if rng.random() < 0.2:
+            spec['wear'] = int(rng.integers(0, 2))
+        if rng.random() < 0.2:
+            spec['sticker_list'] = [STICKERS[rng.integers(3)]]
+        if rng.random() < 0.2:
+            spec['where'] = [('itemPrice', '>', float(rng.uniform(0, 50)))]
+        specs.append(spec)
+    return specs
+
+
+def test_engine_matches_item_filter():
+    listings = _listings(400)
+    df = pd.DataFrame(listings)
+    item_filter = ItemFilter(df, pd.DataFrame({'salesId': pd.Series(dtype=object)}))
+    engine = AlertEngine()
+    specs = _specs()
+    for alert_id, spec in enumerate(specs):
+        engine.register(alert_id, **spec)
+
+    matched = {alert_id: set() for alert_id in range(len(specs))}
+    for listing in listings:
+        for alert_id in engine.match(listing):
+            matched[alert_id].add(listing['salesId'])
+    for alert_id, spec in enumerate(specs):
+        assert matched[alert_id] == set(item_filter.filter_items(**spec)['salesId']), spec
+
+
+def test_discount_and_frame_matching():
+    engine = AlertEngine()
+    engine.register('deal', min_discount=0.17, itemName='AK-47 | Redline')
+    engine.register('any-cheap', itemPrice_between=(0, 12.3))
+    engine.set_reference_prices({'map': [
+        {'marketHashName': 'AK-47 | Redline (Field-Tested)', 'lowestPrice': 20.0},
+        {'marketHashName': 'AK-47 | Redline (Field-Tested)', 'lowestPrice': 15.0}]})
+    assert engine.references == {'AK-47 | Redline (Field-Tested)': 15.0}
+    deals = {'bestDeals': [
+        {'salesId': 'a', 'itemName': 'AK-47 | Redline', 'marketHashName': 'AK-47 | Redline (Field-Tested)', 'itemPrice': 12.3},
+        {'salesId': 'b', 'itemName': 'AK-47 | Redline', 'marketHashName': 'AK-47 | Redline (Field-Tested)', 'itemPrice': 12.5},
+        {'salesId': 'c', 'itemName': 'AK-47 | Redline', 'marketHashName': 'AK-47 | Redline (Minimal Wear)', 'itemPrice': 1.0}]}
+    # float32 prices after the schema is applied still compare like the decimals they came from
+    df = DataProcessor.json_to_dataframe(deals, endpoint='BestDeals')
+    pairs = engine.match_frame(df)
+    assert sorted(map(tuple, pairs.to_numpy().tolist())) == [(0, 'any-cheap'), (0, 'deal'), (2, 'any-cheap')]
+
+    reported = list(engine.scan([df, df]))
+    assert [(alert_id, listing['salesId']) for alert_id, listing in reported] == [('deal', 'a'), ('any-cheap', 'a'),
+                                                                                  ('any-cheap', 'c')]
+    engine.unregister('deal')
+    assert len(engine) == 1
+    assert engine.match(deals['bestDeals'][0]) == ['any-cheap']
+    with pytest.raises(ValueError):
+        engine.register(where=[('itemPrice', '~', 1)])
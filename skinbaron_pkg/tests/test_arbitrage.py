@@ -0,0 +1,62 @@
+import pytest
+import numpy as np
+import pandas as pd
+from skinbaron_pkg.src.arbitrage import SpreadScanner
+
+
+def _market(n_items=2000, sales_per_item=20, seed=0):
+    rng = np.random.default_rng(seed)
+    names = np.array(['Item %d (Field-Tested)' % i for i in range(n_items)], dtype=object)
+    fair = rng.uniform(1, 200, size=n_items)
+    pricelist = pd.DataFrame({'marketHashName': names, 'lowestPrice': np.round(fair * rng.uniform(0.6, 1.2, n_items), 2),
+                              'quantity': rng.integers(0, 20, n_items), 'dopplerClassName': None})
+    item = np.repeat(np.arange(n_items), sales_per_item)
+    sales = pd.DataFrame({
+        'itemName': names[item],
+        'price': np.round(fair[item] * rng.uniform(0.9, 1.1, len(item)), 2),
+        'dateSold': pd.Timestamp('2023-12-31') - pd.to_timedelta(rng.integers(0, 45, len(item)), unit='D'),
+        'dopplerPhase': '-',
+    })
+    return pricelist, sales
+
+
+def test_sale_statistics():
+    sales = pd.DataFrame({'itemName': ['A', 'A', 'A', 'B'], 'price': [1.0, 3.0, 100.0, 5.0],
+                          'dateSold': ['2023-12-30', '2023-12-20', '2023-10-01', '2023-12-31'],
+                          'dopplerPhase': ['-', None, '-', 'Phase 1']})
+    stats = SpreadScanner.sale_statistics(sales, window_days=30).set_index('marketHashName')
+    assert stats.loc['A', 'sales'] == 2 and stats.loc['A', 'median_price'] == 2.0
+    assert stats.loc['A', 'sales_per_day'] == pytest.approx(2 / 30)
+    assert stats.loc['B', 'dopplerPhase'] == 'Phase 1'
+
+
+def test_scan_matches_per_item_computation():
+    pricelist, sales = _market(300)
+    scanner = SpreadScanner(fee=0.1, window_days=30, min_sales=3)
+    top = scanner.scan(pricelist, sales, top=20, sort_by='expected_profit')
+    assert len(top) == 20
+    assert top['expected_profit'].is_monotonic_decreasing
+
+    # reference: the same numbers item by item
+    recent = sales[pd.to_datetime(sales['dateSold']) > pd.Timestamp('2023-12-31') - pd.Timedelta(days=30)]
+    expected = []
+    for row in pricelist.itertuples():
+        item_sales = recent.loc[recent['itemName'] == row.marketHashName, 'price']
+        if len(item_sales) >= 3 and row.quantity >= 1:
+            expected.append((item_sales.median() * 0.9 - row.lowestPrice, row.marketHashName))
+    expected.sort(reverse=True)
+    assert top['marketHashName'].tolist() == [name for _, name in expected[:20]]
+    np.testing.assert_allclose(top['expected_profit'], [profit for profit, _ in expected[:20]])
+
+
+def test_scan_filters_and_sorting():
+    pricelist, sales = _market(200)
+    scanner = SpreadScanner()
+    stats = SpreadScanner.sale_statistics(sales)
+    everything = scanner.scan(pricelist, stats, top=None)
+    assert everything['score'].is_monotonic_decreasing
+    assert (everything['quantity'] >= 1).all()
+    cheap = scanner.scan(pricelist, stats, top=5, sort_by='roi', max_price=20)
+    assert (cheap['lowestPrice'] <= 20).all() and cheap['roi'].is_monotonic_decreasing
+    with pytest.raises(ValueError):
+        scanner.scan(pricelist, stats, sort_by='price')
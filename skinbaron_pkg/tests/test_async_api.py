@@ -0,0 +1,102 @@
+import asyncio
+import time
+import pytest
+from skinbaron_pkg.src.async_api import AsyncSkinBaronAPI
+from skinbaron_pkg.src.rate_limit import TokenBucket
+from skinbaron_pkg.src.skinbaron_api import SkinBaronHTTPError
+
+api_key = " "
+app_id = " "
+
+
+def _sales_script(endpoint, body):
+    if body["itemName"] == "missing":
+        return 404, {}, {}
+    return 200, {}, {"newestSales30Days": [{"itemName": body["itemName"], "statTrak": body["statTrak"]}]}
+
+
+def test_endpoints(stub_server):
+    stub_server.script = [(200, {}, {"newestItems": []})]
+
+    async def run():
+        async with AsyncSkinBaronAPI(api_key, app_id, base_url=stub_server.url) as api:
+            return await api.newest_items(10)
+
+    assert asyncio.run(run()) == {"newestItems": []}
+    assert stub_server.received == [{"size": 10, "apikey": api_key, "appId": app_id}]
+
+
+def test_close_does_not_block_the_event_loop(stub_server):
+    def slow_script(endpoint, body):
+        time.sleep(0.3)
+        return 200, {}, {"newestItems": []}
+
+    stub_server.script = slow_script
+
+    async def run():
+        api = AsyncSkinBaronAPI(api_key, app_id, base_url=stub_server.url)
+        request = asyncio.ensure_future(api.newest_items(10))
+        await asyncio.sleep(0.05)
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.ensure_future(tick())
+        await api.close()
+        ticker.cancel()
+        assert await request == {"newestItems": []}
+        return ticks
+
+    assert asyncio.run(run()) > 5
+
+
+def test_gather_newest_sales_keeps_order(stub_server):
+    stub_server.script = _sales_script
+    items = [f"item {i}" for i in range(20)] + [("AK-47 | Redline", True, False)]
+
+    async def run():
+        async with AsyncSkinBaronAPI(api_key, app_id, concurrency=4, base_url=stub_server.url) as api:
+            return await api.gather_newest_sales(items)
+
+    results = asyncio.run(run())
+    assert [r["newestSales30Days"][0]["itemName"] for r in results] == [f"item {i}" for i in range(20)] + ["AK-47 | Redline"]
+    assert results[-1]["newestSales30Days"][0]["statTrak"] is True
+
+
+def test_gather_newest_sales_return_exceptions(stub_server):
+    stub_server.script = _sales_script
+
+    async def run():
+        async with AsyncSkinBaronAPI(api_key, app_id, base_url=stub_server.url, max_retries=0) as api:
+            return await api.gather_newest_sales(["AK-47 | Redline", "missing"], return_exceptions=True)
+
+    ok, failed = asyncio.run(run())
+    assert "newestSales30Days" in ok
+    assert isinstance(failed, SkinBaronHTTPError)
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=100, capacity=2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.01, abs=2e-3)
+
+    async def run():
+        start = time.monotonic()
+        await asyncio.gather(*(bucket.acquire_async() for _ in range(10)))
+        return time.monotonic() - start
+
+    assert asyncio.run(run()) >= 0.08
+
+
+def test_token_bucket_try_acquire():
+    bucket = TokenBucket(rate=100, capacity=1)
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == pytest.approx(0.01, abs=2e-3)
+    # a refused try_acquire takes nothing
+    time.sleep(0.012)
+    assert bucket.try_acquire() == 0
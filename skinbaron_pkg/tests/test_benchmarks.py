@@ -0,0 +1,18 @@
+import json
+from skinbaron_pkg.benchmarks.runner import run_benchmarks, compare, main, save
+
+
+def test_run_and_compare(tmp_path):
+    report = run_benchmarks(sizes=[60], repeat=1)
+    assert {result['stage'] for result in report['results']} >= {'newestsales_df_pipeline', 'price_prediction'}
+    assert all(result['seconds_min'] > 0 and result['peak_mb'] > 0 for result in report['results'])
+
+    slower = json.loads(json.dumps(report))
+    slower['results'][0]['seconds_min'] *= 2
+    diff = compare(report, slower, threshold=0.5)
+    assert diff['regression'].tolist() == [True] + [False] * (len(diff) - 1)
+
+    save(report, tmp_path / 'baseline.json')
+    save(slower, tmp_path / 'current.json')
+    assert main(['compare', str(tmp_path / 'baseline.json'), str(tmp_path / 'baseline.json')]) == 0
+    assert main(['compare', str(tmp_path / 'baseline.json'), str(tmp_path / 'current.json'), '--threshold', '0.5']) == 1
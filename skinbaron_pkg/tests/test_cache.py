@@ -0,0 +1,108 @@
+import threading
+import time
+import pytest
+from skinbaron_pkg.src.cache import ResponseCache, MemoryCache, DiskCache, CacheEntry
+from skinbaron_pkg.src.skinbaron_api import SkinBaronAPI
+from conftest import FakeClock
+
+api_key = " "
+app_id = " "
+
+
+def test_memory_cache_evicts_least_recently_used():
+    backend = MemoryCache(max_entries=2)
+    backend.set('a', CacheEntry(1, 10, 0, 1))
+    backend.set('b', CacheEntry(2, 10, 0, 1))
+    backend.get('a')
+    backend.set('c', CacheEntry(3, 10, 0, 1))
+    assert backend.get('b') is None
+    assert backend.get('a').value == 1
+    assert len(backend) == 2
+
+
+def test_ttl_per_endpoint():
+    clock = FakeClock()
+    cache = ResponseCache(ttls={"GetPriceList": 60, "NewestItems": 5}, clock=clock)
+    calls = []
+
+    def fetch(endpoint, data, validators=None):
+        calls.append(endpoint)
+        return {"n": len(calls)}, 100, {}
+
+    assert cache.fetch("GetPriceList", {}, fetch) == {"n": 1}
+    cache.fetch("NewestItems", {"size": 10}, fetch)
+    clock.now += 10
+    assert cache.fetch("GetPriceList", {}, fetch) == {"n": 1}
+    cache.fetch("NewestItems", {"size": 10}, fetch)
+    assert calls == ["GetPriceList", "NewestItems", "NewestItems"]
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 3
+    assert stats["bytes_saved"] == 100
+    assert stats["bytes_fetched"] == 300
+
+
+def test_concurrent_callers_share_one_fetch():
+    cache = ResponseCache()
+    calls = []
+
+    def slow_fetch(endpoint, data, validators=None):
+        calls.append(endpoint)
+        time.sleep(0.1)
+        return {"map": []}, 50, {}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.fetch("GetPriceList", {}, slow_fetch)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == [{"map": []}] * 8
+    assert cache.stats()["coalesced"] == 7
+
+
+def test_mutating_a_response_leaves_the_cache_intact():
+    cache = ResponseCache()
+
+    def fetch(endpoint, data, validators=None):
+        return {"map": [{"marketHashName": "AK-47 | Redline (Field-Tested)"}]}, 50, {}
+
+    first = cache.fetch("GetPriceList", {}, fetch)
+    first["map"].pop()
+    first["extra"] = 1
+    assert cache.fetch("GetPriceList", {}, fetch) == {"map": [{"marketHashName": "AK-47 | Redline (Field-Tested)"}]}
+    assert cache.fetch("GetPriceList", {}, fetch) is not cache.fetch("GetPriceList", {}, fetch)
+
+    shared = ResponseCache(copy_values=False)
+    assert shared.fetch("GetPriceList", {}, fetch) is shared.fetch("GetPriceList", {}, fetch)
+
+
+def test_disk_cache_round_trip(tmp_path):
+    backend = DiskCache(str(tmp_path))
+    backend.set('GetPriceList:{}', CacheEntry({"map": [1, 2]}, 12, 1.0, 2.0, {"etag": '"v1"'}))
+    entry = DiskCache(str(tmp_path)).get('GetPriceList:{}')
+    assert entry.value == {"map": [1, 2]}
+    assert entry.validators == {"etag": '"v1"'}
+    backend.clear()
+    assert backend.get('GetPriceList:{}') is None
+
+
+def test_api_revalidates_stale_price_list(stub_server):
+    def script(endpoint, body):
+        return 200, {'ETag': '"v1"'}, {"map": [{"marketHashName": "AK-47 | Redline (Field-Tested)"}]}
+
+    stub_server.script = script
+    clock = FakeClock()
+    cache = ResponseCache(clock=clock)
+    api = SkinBaronAPI(api_key, app_id, base_url=stub_server.url, cache=cache)
+    first = api.get_price_list()
+    assert api.get_price_list() == first
+    assert len(stub_server.received) == 1
+
+    stub_server.script = [(304, {}, {})]
+    clock.now += ResponseCache.DEFAULT_TTLS["GetPriceList"] + 1
+    assert api.get_price_list() == first
+    assert len(stub_server.received) == 2
+    assert cache.stats()["revalidated"] == 1
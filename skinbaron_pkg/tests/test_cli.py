@@ -0,0 +1,120 @@
+import io
+import json
+import pandas as pd
+import pytest
+from skinbaron_pkg.src.cli import main, load_credentials, FrameWriter
+from skinbaron_pkg.src.simulator import SyntheticMarket, SimulatorServer
+
+
+@pytest.fixture(scope='module')
+def server():
+    with SimulatorServer(SyntheticMarket(items=500, end='2024-01-01')) as server:
+        yield server
+
+
+def _run(capsys, server, *argv):
+    status = main(['--api-key', 'key', '--app-id', 'app', '--base-url', server.url] + list(argv))
+    out, err = capsys.readouterr()
+    return status, out, err
+
+
+def test_load_credentials(tmp_path):
+    config = tmp_path / 'config.ini'
+    config.write_text('[skinbaron]\napi_key = file-key\napp_id = file-app\nbase_url = http://file\n')
+    environ = {'SKINBARON_CONFIG': str(config), 'SKINBARON_APP_ID': 'env-app'}
+    assert load_credentials(environ=environ) == {'api_key': 'file-key', 'app_id': 'env-app', 'base_url': 'http://file'}
+    assert load_credentials(api_key='arg-key', environ=environ)['api_key'] == 'arg-key'
+    assert load_credentials(environ={'SKINBARON_CONFIG': str(tmp_path / 'missing.ini')})['api_key'] is None
+    with pytest.raises(FileNotFoundError):
+        load_credentials(config=str(tmp_path / 'missing.ini'), environ={})
+
+
+def test_missing_credentials(monkeypatch, tmp_path, capsys):
+    for name in ('SKINBARON_API_KEY', 'SKINBARON_APP_ID'):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv('SKINBARON_CONFIG', str(tmp_path / 'none.ini'))
+    with pytest.raises(SystemExit) as exit_info:
+        main(['newest'])
+    assert exit_info.value.code == 2
+    assert 'no credentials' in capsys.readouterr().err
+
+
+def test_frame_writer_chunks(monkeypatch):
+    df = pd.DataFrame({'a': range(5), 'b': list('vwxyz')})
+    out = io.StringIO()
+    monkeypatch.setattr('sys.stdout', out)
+    with FrameWriter('csv', chunk_size=2) as writer:
+        writer.write(df)
+        writer.write(df)
+    assert out.getvalue().splitlines()[0] == 'a,b' and len(out.getvalue().splitlines()) == 11
+    assert writer.rows == 10
+    with pytest.raises(ValueError):
+        FrameWriter('xml')
+
+
+def test_newest_and_pricelist(server, capsys):
+    status, out, _ = _run(capsys, server, 'newest', '--size', '7')
+    rows = [json.loads(line) for line in out.splitlines()]
+    assert status == 0 and len(rows) == 7 and rows[0]['salesId'].startswith('n')
+
+    status, out, _ = _run(capsys, server, 'pricelist', '--format', 'csv', '--chunk-size', '100')
+    lines = out.splitlines()
+    assert status == 0 and lines[0].startswith('marketHashName') and len(lines) == 501
+
+
+def test_filter(server, capsys):
+    status, out, _ = _run(capsys, server, 'filter', '--filter', 'itemPrice_between=[5, 20]')
+    prices = [json.loads(line)['itemPrice'] for line in out.splitlines()]
+    assert status == 0 and prices and all(5 <= price <= 20 for price in prices)
+    with pytest.raises(SystemExit):
+        main(['--api-key', 'k', '--app-id', 'a', 'filter', '--filter', 'no-equals-sign'])
+
+
+def test_report_and_predict(server, capsys, tmp_path):
+    history = str(tmp_path / 'sales.sqlite')
+    status, out, _ = _run(capsys, server, 'report', 'Doppler', '--history', history)
+    assert status == 0 and out
+    status, out, _ = _run(capsys, server, 'predict', 'Doppler', '--model', 'ewma', '--level', '0.9')
+    rows = [json.loads(line) for line in out.splitlines()]
+    assert status == 0 and rows
+    assert {'predicted_price_7_days', 'predicted_lower', 'predicted_upper'} <= set(rows[0])
+
+
+def test_report_and_predict_without_matches(server, capsys):
+    for command in ('sales', 'report', 'predict'):
+        status, out, err = _run(capsys, server, command, 'zzzznotanitem')
+        assert (status, out, err) == (0, '', '')
+
+
+def test_parquet_output(server, capsys, tmp_path):
+    pytest.importorskip('pyarrow')
+    path = str(tmp_path / 'pricelist.parquet')
+    status, _, _ = _run(capsys, server, '--format', 'parquet', '--output', path, 'pricelist', '--chunk-size', '200')
+    assert status == 0
+    assert len(pd.read_parquet(path)) == 500
+
+
+def test_api_error_exit_status(capsys):
+    status = main(['--api-key', 'k', '--app-id', 'a', '--base-url', 'http://127.0.0.1:1', 'newest'])
+    assert status == 1
+    assert capsys.readouterr().err.startswith('skinbaron: ')
+
+
+class UnexpectedPayloadAPI:
+    def __init__(self, api_key, app_id):
+        pass
+
+    def newest_items(self, size):
+        return {'message': 'maintenance'}
+
+    best_deals = newest_items
+
+    def newest_sales_30_days(self, item_name, stat_trak, souvenir, doppler_phase=None):
+        return {'message': 'maintenance'}
+
+
+def test_unexpected_payload_exit_status(capsys):
+    for command in (['newest'], ['deals'], ['sales', 'AK-47'], ['filter']):
+        status = main(['--api-key', 'k', '--app-id', 'a'] + command, api=UnexpectedPayloadAPI)
+        err = capsys.readouterr().err
+        assert status == 1 and err.startswith('skinbaron: unexpected ')
@@ -1,3 +1,4 @@
+import time
 import pytest
 import pandas as pd
 import numpy as np
@@ -46,3 +47,203 @@ def test_newestsales_df_pipeline():
     assert merged_df.shape[0] == 4
     assert all(merged_df['itemName'] == '★ Butterfly Knife | Gamma Doppler')
     assert all(merged_df['statTrak'] == False)
+
+
+def test_parse_market_hash_names_matches_separate_item_and_condition():
+    names = pd.Series(['★ StatTrak™ Karambit | Doppler (Factory New)', 'P90 | Freight (Well-Worn)',
+                       'Item Without Condition', 'Souvenir AWP | Dragon Lore (Field-Tested)',
+                       'ESL One Cologne 2015 Dust II Souvenir Package', 'P90 | Freight (Well-Worn)'],
+                      index=[10, 11, 12, 13, 14, 15])
+    parsed = report_generator.parse_market_hash_names(names)
+    assert list(parsed.index) == list(names.index)
+    for name, (_, row) in zip(names, parsed.iterrows()):
+        assert (row['itemName'], row['exteriorName']) == report_generator.separate_item_and_condition(name)
+    assert parsed['isStar'].tolist() == [True, False, False, False, False, False]
+    assert parsed['isStatTrak'].tolist() == [True, False, False, False, False, False]
+    assert parsed['isSouvenir'].tolist() == [False, False, False, True, False, False]
+    assert parsed['baseName'].iloc[0] == 'Karambit | Doppler'
+
+
+def test_parse_market_hash_names_is_memoized():
+    rg.clear_name_cache()
+    report_generator.parse_market_hash_names(pd.Series(['P90 | Freight (Well-Worn)', 'AK-47 | Redline (Field-Tested)']))
+    table = rg._name_table
+    # a second instance reuses the table instead of parsing again
+    parsed = rg(token, appID).parse_market_hash_names(pd.Series(['AK-47 | Redline (Field-Tested)']))
+    assert rg._name_table is table
+    assert parsed['exteriorName'].tolist() == ['Field-Tested']
+
+
+class FakeSkinBaronAPI:
+    """Offline stand-in for SkinBaronAPI serving a fixed price list and per-item sales."""
+    calls = []
+
+    def __init__(self, api_key, app_id, **kwargs):
+        pass
+
+    def get_price_list(self):
+        FakeSkinBaronAPI.calls.append('GetPriceList')
+        return {"map": [
+            {"marketHashName": "★ Butterfly Knife | Gamma Doppler (Factory New)", "statTrak": False, "souvenir": False,
+             "lowestPrice": 1500.0, "quantity": 2, "url": "u1", "dopplerClassName": "Phase 2"},
+            {"marketHashName": "AK-47 | Redline (Field-Tested)", "statTrak": False, "souvenir": False,
+             "lowestPrice": 12.5, "quantity": 40, "url": "u2", "dopplerClassName": None},
+        ]}
+
+    def newest_sales_30_days(self, item_name, stat_trak, souvenir, doppler_phase=None):
+        FakeSkinBaronAPI.calls.append(item_name)
+        if item_name == 'missing':
+            raise RuntimeError("boom")
+        if item_name.startswith('★'):
+            return {"newestSales30Days": [
+                {"itemName": "★ Butterfly Knife | Gamma Doppler (Factory New)", "price": p, "dateSold": d,
+                 "dopplerPhase": "Phase 2"} for p, d in ((1450.0, '2023-12-01'), (1480.0, '2023-12-05'))]}
+        return {"newestSales30Days": [
+            {"itemName": "AK-47 | Redline (Field-Tested)", "price": 11.0, "dateSold": '2023-12-02', "dopplerPhase": "-"}]}
+
+
+def test_newestsales_df_pipeline_offline():
+    merged_df = report_generator.newestsales_df_pipeline(FakeSkinBaronAPI, dp.json_to_dataframe, report_generator.cheapest,
+                                                         report_generator.separate_item_and_condition, token, appID,
+                                                         '★ Butterfly Knife | Gamma Doppler', False, False)
+    assert merged_df.shape[0] == 1
+    assert merged_df['price'].iloc[0] == [1450.0, 1480.0]
+    assert merged_df['lowestPrice'].iloc[0] == 1500.0
+
+
+def test_newestsales_batch_pipeline():
+    FakeSkinBaronAPI.calls = []
+    queries = [('★ Butterfly Knife | Gamma Doppler', False, False, 'Phase 2'), 'AK-47 | Redline',
+               {'item_name': 'missing'}]
+    merged_df = report_generator.newestsales_batch_pipeline(FakeSkinBaronAPI, dp.json_to_dataframe, queries,
+                                                            concurrency=4, errors='skip')
+    assert FakeSkinBaronAPI.calls.count('GetPriceList') == 1
+    assert merged_df['query_id'].tolist() == [0, 1]
+    assert merged_df['query'].tolist() == ['★ Butterfly Knife | Gamma Doppler', 'AK-47 | Redline']
+    assert merged_df['exteriorName'].tolist() == ['Factory New', 'Field-Tested']
+    assert merged_df['price'].iloc[0] == [1450.0, 1480.0]
+    assert isinstance(report_generator.failed_queries[2], RuntimeError)
+
+    with pytest.raises(RuntimeError):
+        report_generator.newestsales_batch_pipeline(FakeSkinBaronAPI, dp.json_to_dataframe, queries)
+
+
+class CountingLimiter:
+    def __init__(self):
+        self.acquired = 0
+
+    def acquire(self, tokens=1):
+        self.acquired += tokens
+        return 0.0
+
+
+def test_newestsales_batch_pipeline_takes_a_token_per_request():
+    FakeSkinBaronAPI.calls = []
+    limiter = CountingLimiter()
+    report_generator.newestsales_batch_pipeline(FakeSkinBaronAPI, dp.json_to_dataframe, ['AK-47 | Redline'] * 5,
+                                                rate_limiter=limiter)
+    assert limiter.acquired == len(FakeSkinBaronAPI.calls) == 6
+
+
+class SlowFailingAPI(FakeSkinBaronAPI):
+    def newest_sales_30_days(self, item_name, stat_trak, souvenir, doppler_phase=None):
+        if item_name != 'missing':
+            time.sleep(0.05)
+        return super().newest_sales_30_days(item_name, stat_trak, souvenir, doppler_phase)
+
+
+def test_newestsales_batch_pipeline_raises_without_running_the_rest():
+    FakeSkinBaronAPI.calls = []
+    queries = ['missing'] + ['AK-47 | Redline'] * 40
+    with pytest.raises(RuntimeError):
+        report_generator.newestsales_batch_pipeline(SlowFailingAPI, dp.json_to_dataframe, queries, concurrency=2)
+    assert FakeSkinBaronAPI.calls.count('AK-47 | Redline') < 10
+
+
+class NoPhaseAPI(FakeSkinBaronAPI):
+    def newest_sales_30_days(self, item_name, stat_trak, souvenir, doppler_phase=None):
+        return {"newestSales30Days": [{"itemName": "AK-47 | Redline (Field-Tested)", "price": 11.0,
+                                       "dateSold": '2023-12-02'}]}
+
+
+def test_newestsales_batch_pipeline_without_doppler_phase():
+    merged_df = report_generator.newestsales_batch_pipeline(NoPhaseAPI, dp.json_to_dataframe, ['AK-47 | Redline'])
+    assert len(merged_df) == 1
+    assert merged_df['dopplerPhase'].iloc[0] == '-' and merged_df['price'].iloc[0] == [11.0]
+
+
+def test_summarize_and_write_report(capsys):
+    import io
+    import json
+    pricelist_df = pd.DataFrame({'itemName': ['Item1', 'Item2'], 'exteriorName': ['C1', 'C2'],
+                                 'dopplerPhase': ['P1', 'P2'], 'lowestPrice': [100, 3.5], 'quantity': [5, 1],
+                                 'url': ['u1', 'u2']})
+    df = pd.DataFrame({'itemName': ['Item1', 'Item2', 'Item2', 'Item2'], 'exteriorName': ['C1', 'C2', 'C2', 'C2'],
+                       'dopplerPhase': ['P1', 'P2', 'P2', 'P2'], 'price': [100, 3, 5, 4],
+                       'dateSold': ['2020-01-01', '2020-02-01', '2020-02-02', '2020-02-03']})
+    merged_df = report_generator.cheapest(pricelist_df, df, verbose=False)
+    assert capsys.readouterr().out == ''
+
+    summary = report_generator.summarize(merged_df)
+    assert summary['trade_count'].tolist() == [1, 3]
+    assert summary['min_price'].tolist() == [100, 3]
+    assert summary['max_price'].tolist() == [100, 5]
+    assert summary['median_price'].tolist() == [100, 4]
+    assert summary['most_traded'].tolist() == [False, True]
+
+    text = io.StringIO()
+    report_generator.write_report(summary, text, fmt='text', chunk_size=1)
+    assert text.getvalue().count('frequent traded') == 1
+    assert "The 2th item is Item2" in text.getvalue()
+
+    lines = io.StringIO()
+    report_generator.write_report(summary, lines, fmt='json', chunk_size=1)
+    records = [json.loads(line) for line in lines.getvalue().splitlines()]
+    assert [record['trade_count'] for record in records] == [1, 3]
+
+    csv = io.StringIO()
+    report_generator.write_report(summary, csv, fmt='csv', chunk_size=1)
+    assert len(pd.read_csv(io.StringIO(csv.getvalue()))) == 2
+
+
+def test_newestsales_df_pipeline_with_history():
+    from skinbaron_pkg.src.history import SQLiteHistory
+    history = SQLiteHistory(':memory:')
+    history.append(pd.DataFrame({'itemName': ["★ Butterfly Knife | Gamma Doppler (Factory New)"], 'price': [1300.0],
+                                 'dateSold': ['2023-09-01'], 'dopplerPhase': ['Phase 2']}))
+    for _ in range(2):
+        merged_df = report_generator.newestsales_df_pipeline(FakeSkinBaronAPI, dp.json_to_dataframe,
+                                                             report_generator.cheapest,
+                                                             report_generator.separate_item_and_condition, token, appID,
+                                                             '★ Butterfly Knife | Gamma Doppler', False, False,
+                                                             history=history)
+    assert merged_df['price'].iloc[0] == [1300.0, 1450.0, 1480.0]
+    assert len(history.query()) == 3
+
+
+def test_newestsales_df_pipeline_with_history_keeps_phase_and_layout():
+    from skinbaron_pkg.src.history import SQLiteHistory
+    name = '★ Butterfly Knife | Gamma Doppler (Factory New)'
+    received = []
+
+    def capture(pricelist_df, df):
+        received.append(df.copy())
+        return report_generator.cheapest(pricelist_df, df, verbose=False)
+
+    def run(history=None):
+        return report_generator.newestsales_df_pipeline(FakeSkinBaronAPI, dp.json_to_dataframe, capture,
+                                                        report_generator.separate_item_and_condition, token, appID,
+                                                        '★ Butterfly Knife | Gamma Doppler', False, False,
+                                                        dopplerPhase='Phase 2', history=history)
+
+    run()
+    with SQLiteHistory(':memory:') as history:
+        history.append(pd.DataFrame({'itemName': [name, name], 'price': [1300.0, 2000.0],
+                                     'dateSold': ['2023-10-01', '2023-10-02'], 'dopplerPhase': ['Phase 2', 'Phase 3']}))
+        merged_df = run(history)
+    live, stored = received
+    assert merged_df['price'].iloc[0] == [1300.0, 1450.0, 1480.0]
+    assert stored['dopplerPhase'].unique().tolist() == ['Phase 2']
+    assert stored.columns.tolist() == live.columns.tolist()
+    assert stored.dtypes.tolist() == live.dtypes.tolist()
+    assert stored['dateSold'].tolist() == ['2023-10-01', '2023-12-01', '2023-12-05']
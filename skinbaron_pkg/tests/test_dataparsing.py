@@ -30,3 +30,95 @@ def test_json_to_dataframe_invalid():
     with pytest.raises(Exception):
         _ = DataProcessor.json_to_dataframe(json_input)
 
+
+def test_iter_json_to_dataframes_matches_json_to_dataframe():
+    import json
+    json_input = {
+        "map": [
+            {"marketHashName": "★ Karambit | Doppler (Factory New)", "lowestPrice": 1234.5 + i,
+             "exterior": {"name": "Factory New"}, "stickers": [{"localizedName": "Dust II (Gold)"}] if i % 2 else None}
+            for i in range(25)
+        ]
+    }
+    raw = json.dumps(json_input, ensure_ascii=False).encode()
+    # tiny chunks split multi-byte characters and records across chunk boundaries
+    chunks = [raw[i:i + 5] for i in range(0, len(raw), 5)]
+
+    batches = list(DataProcessor.iter_json_to_dataframes(chunks, batch_size=10))
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+
+    expected = DataProcessor.json_to_dataframe(json_input)
+    result = DataProcessor.stream_to_dataframe(chunks, batch_size=10)
+    pd.testing.assert_frame_equal(result, expected[result.columns])
+    assert 'exterior.name' in result.columns
+
+
+def test_iter_json_to_dataframes_selects_key_and_handles_empty():
+    import io
+    raw = b'{"count": 2, "newestItems": [{"id": 1}, {"id": 2, "price": 3.5}]}'
+    result = DataProcessor.stream_to_dataframe(io.BytesIO(raw), key="newestItems")
+    assert list(result.columns) == ['id', 'price']
+    assert result['price'].isna().tolist() == [True, False]
+
+    assert DataProcessor.stream_to_dataframe([b'{"items": []}']).empty
+
+    with pytest.raises(ValueError):
+        DataProcessor.stream_to_dataframe([b'{"items": [{"id": 1} {"id": 2}]}'])
+
+
+def _listings_json(n):
+    exteriors = ['Factory New', 'Minimal Wear', 'Field-Tested', 'Well-Worn', 'Battle-Scarred']
+    return {
+        "newestItems": [
+            {"salesId": f"id{i}", "itemName": f"AK-47 | Skin {i % 40}", "rarityName": "Classified",
+             "exteriorName": exteriors[i % 5], "variantTypeName": "Rifle", "isSouvenir": False,
+             "itemPrice": 1.5 + i % 100, "wear": 0.0123456789 * (i % 80), "isWearPrecise": True, "stackable": False,
+             "tradeLockHoursLeft": i % 168,
+             "stickers": [{"localizedName": "Dust II (Gold)"}, {"localizedName": f"Team {i % 7}"}] if i % 3 else None}
+            for i in range(n)
+        ]
+    }
+
+
+def test_json_to_dataframe_applies_schema():
+    json_input = _listings_json(2000)
+    plain = DataProcessor.json_to_dataframe(json_input)
+    typed = DataProcessor.json_to_dataframe(json_input, endpoint='auto')
+
+    assert typed['exteriorName'].dtype == 'category'
+    assert typed['rarityName'].dtype == 'category'
+    assert typed['itemPrice'].dtype == 'float32'
+    assert typed['isSouvenir'].dtype == bool
+    assert typed['wear'].dtype == 'float64'
+    assert (typed['exteriorName'].astype(object) == plain['exteriorName']).all()
+
+    columns = plain.columns.drop('stickers')
+    assert typed[columns].memory_usage(deep=True).sum() * 3 < plain[columns].memory_usage(deep=True).sum()
+
+
+def test_apply_schema_uses_nullable_dtypes_for_missing_values():
+    df = pd.DataFrame({"statTrak": [True, None], "quantity": [3, None], "other": ["a", "b"]})
+    typed = DataProcessor.apply_schema(df, 'GetPriceList')
+    assert typed['statTrak'].dtype == 'boolean'
+    assert typed['quantity'].dtype == 'Int32'
+    assert typed['other'].dtype == object
+
+
+def test_sales_schema_keeps_prices_and_dates_exact():
+    json_input = {"newestSales30Days": [{"itemName": "AK-47 | Redline", "exteriorName": "Field-Tested", "price": 12.3,
+                                         "dateSold": "2023-12-02"}]}
+    typed = DataProcessor.json_to_dataframe(json_input, endpoint='auto')
+    assert typed['itemName'].dtype == 'category'
+    assert typed['price'].dtype == 'float64' and typed['price'].tolist() == [12.3]
+    assert typed['dateSold'].tolist() == ['2023-12-02']
+
+
+def test_compact_stickers():
+    df = DataProcessor.json_to_dataframe(_listings_json(6), endpoint='NewestItems')
+    compact, table = DataProcessor.compact_stickers(df)
+    assert 'stickers' not in compact.columns
+    assert compact['sticker_count'].tolist() == [0, 2, 2, 0, 2, 2]
+    assert table.names.count('Dust II (Gold)') == 1
+    row = compact.iloc[4]
+    assert table.names_for(row['sticker_start'], row['sticker_count']) == ['Dust II (Gold)', 'Team 4']
+    assert table.to_lists(compact['sticker_start'], compact['sticker_count'])[0] is None
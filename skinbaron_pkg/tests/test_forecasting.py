@@ -0,0 +1,76 @@
+import pytest
+import numpy as np
+import pandas as pd
+from skinbaron_pkg.src.forecasting import (SalesSeries, LinearTrend, EWMATrend, HuberTrend, TheilSenTrend,
+                                           VolumeWeightedTrend, MODELS, backtest)
+
+
+def _frame(n_items=40, n_sales=25, noise=1.0, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(n_items):
+        days = np.sort(rng.integers(0, 30, size=n_sales))
+        prices = 50 + i + 0.5 * days + rng.normal(0, noise, size=n_sales)
+        rows.append({'dateSold': [pd.Timestamp('2023-01-01') + pd.Timedelta(days=int(d)) for d in days],
+                     'price': list(prices)})
+    return pd.DataFrame(rows)
+
+
+def test_sales_series_packing():
+    series = SalesSeries.from_columns([['2023-01-03', '2023-01-05'], "['2023-01-01']", []],
+                                      [[1.0, 2.0], "[3.0]", []])
+    assert series.counts.tolist() == [2, 1, 0]
+    assert series.days.tolist() == [0.0, 2.0, 0.0]
+    assert series.days_until('2023-01-10').tolist()[:2] == [7.0, 9.0]
+    with pytest.raises(ValueError):
+        SalesSeries.from_columns([['2023-01-01']], [[1.0, 2.0]])
+
+
+def test_linear_trend_matches_polyfit():
+    df = _frame()
+    series = SalesSeries.from_columns(df['dateSold'], df['price'])
+    fit = LinearTrend().fit(series)
+    for k in range(len(df)):
+        rows = series.item_of_row == k
+        slope, intercept = np.polyfit(series.days[rows], series.prices[rows], 1)
+        assert fit.slope[k] == pytest.approx(slope)
+        assert fit.intercept[k] == pytest.approx(intercept)
+
+
+def test_robust_models_ignore_outliers():
+    days = list(range(20))
+    prices = [10 + 2 * d for d in days]
+    prices[5] = 500.0
+    prices[12] = 0.0
+    series = SalesSeries.from_columns([[pd.Timestamp('2023-01-01') + pd.Timedelta(days=d) for d in days]], [prices])
+    assert TheilSenTrend().fit(series).slope[0] == pytest.approx(2.0)
+    assert HuberTrend().fit(series).slope[0] == pytest.approx(2.0, abs=0.1)
+    assert abs(LinearTrend().fit(series).slope[0] - 2.0) > 0.5
+
+
+def test_weighted_models_reduce_to_linear():
+    df = _frame(n_items=5)
+    series = SalesSeries.from_columns(df['dateSold'], df['price'])
+    linear = LinearTrend().fit(series)
+    np.testing.assert_allclose(VolumeWeightedTrend(power=1).fit(series).slope, linear.slope)
+    np.testing.assert_allclose(EWMATrend(halflife=1e9).fit(series).slope, linear.slope)
+
+
+def test_forecast_intervals():
+    df = _frame()
+    series = SalesSeries.from_columns(df['dateSold'], df['price'])
+    for name, model in MODELS.items():
+        result = model().forecast(series, series.days_until('2023-02-07'), level=0.9)
+        assert len(result) == len(df)
+        assert (result['lower'] < result['forecast']).all() and (result['forecast'] < result['upper']).all(), name
+
+
+def test_backtest_scores_every_model():
+    scores = backtest(['linear', TheilSenTrend(), EWMATrend(), HuberTrend(), VolumeWeightedTrend()], _frame(),
+                      holdout_days=5)
+    assert set(scores.index) == set(MODELS)
+    assert scores['mae'].is_monotonic_increasing
+    assert (scores['items'] == 40).all()
+    assert scores.loc['linear', 'mae'] < 1.5
+    assert 0.7 < scores.loc['linear', 'coverage'] <= 1.0
+    assert (scores['fit_seconds'] >= 0).all()
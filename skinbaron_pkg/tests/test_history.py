@@ -0,0 +1,78 @@
+import pytest
+import pandas as pd
+from skinbaron_pkg.src.history import SQLiteHistory, ParquetHistory, normalize_sales
+
+
+def _sales(rows):
+    return pd.DataFrame(rows, columns=['itemName', 'price', 'dateSold', 'dopplerPhase'])
+
+
+FIRST = _sales([('AK-47 | Redline (Field-Tested)', 11.0, '2023-01-30', None),
+                ('AK-47 | Redline (Field-Tested)', 11.0, '2023-01-30', None),
+                ('AK-47 | Redline (Field-Tested)', 12.0, '2023-02-02', None),
+                ('★ Karambit | Doppler (Factory New)', 900.0, '2023-02-01', 'Phase 2')])
+# a later fetch of the rolling window: one old sale dropped out, one new sale arrived
+SECOND = _sales([('AK-47 | Redline (Field-Tested)', 11.0, '2023-01-30', None),
+                 ('AK-47 | Redline (Field-Tested)', 11.0, '2023-01-30', None),
+                 ('AK-47 | Redline (Field-Tested)', 12.0, '2023-02-02', None),
+                 ('AK-47 | Redline (Field-Tested)', 13.0, '2023-03-01', None)])
+
+
+def test_normalize_sales_numbers_identical_sales():
+    df = normalize_sales(FIRST, fetched_at='2023-03-02')
+    assert df['occurrence'].tolist() == [0, 1, 0, 0]
+    assert df['dateSold'].iloc[0] == '2023-01-30T00:00:00'
+    assert df['dopplerPhase'].tolist() == ['', '', '', 'Phase 2']
+    assert normalize_sales(None).columns.tolist() == ['itemName', 'dopplerPhase', 'dateSold', 'price', 'occurrence',
+                                                      'fetchedAt']
+
+
+def _check_store(history):
+    assert history.append(FIRST) == 4
+    assert history.append(FIRST) == 0
+    assert history.append(SECOND) == 1
+
+    redline = history.query('AK-47 | Redline (Field-Tested)')
+    assert redline['price'].tolist() == [11.0, 11.0, 12.0, 13.0]
+    assert redline['dopplerPhase'].isna().all()
+
+    in_range = history.query(['AK-47 | Redline (Field-Tested)', '★ Karambit | Doppler (Factory New)'],
+                             start='2023-02-01', end='2023-02-28')
+    assert in_range['price'].tolist() == [12.0, 900.0]
+    assert history.query(doppler_phase='Phase 2')['itemName'].tolist() == ['★ Karambit | Doppler (Factory New)']
+    assert len(history.query(start='2023-03-01')) == 1
+
+
+def test_sqlite_history(tmp_path):
+    path = str(tmp_path / 'sales.sqlite')
+    with SQLiteHistory(path) as history:
+        _check_store(history)
+    with SQLiteHistory(path) as history:
+        assert history.append(SECOND) == 0
+        items = history.items()
+        assert items['sales'].tolist() == [4, 1]
+        assert items['last'].iloc[0] == '2023-03-01T00:00:00'
+
+
+def test_parquet_history(tmp_path):
+    pytest.importorskip('pyarrow')
+    history = ParquetHistory(str(tmp_path / 'history'))
+    _check_store(history)
+    assert sorted(p.name for p in (tmp_path / 'history').iterdir()) == ['month=2023-01', 'month=2023-02',
+                                                                        'month=2023-03']
+
+
+def _check_end_of_day(history):
+    history.append(_sales([('AK-47 | Redline (Field-Tested)', 13.0, '2023-03-01 09:00:00', None),
+                           ('AK-47 | Redline (Field-Tested)', 14.0, '2023-03-31 18:30:00', None),
+                           ('AK-47 | Redline (Field-Tested)', 15.0, '2023-04-01 00:00:00', None)]))
+    # a date-only end covers the whole day, a timestamp is exact
+    assert history.query(end='2023-03-31')['price'].tolist() == [13.0, 14.0]
+    assert history.query(end='2023-03-31 12:00')['price'].tolist() == [13.0]
+
+
+def test_date_only_end_includes_the_day(tmp_path):
+    with SQLiteHistory(':memory:') as history:
+        _check_end_of_day(history)
+    pytest.importorskip('pyarrow')
+    _check_end_of_day(ParquetHistory(str(tmp_path / 'history')))
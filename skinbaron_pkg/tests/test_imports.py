@@ -0,0 +1,56 @@
+import json
+import os
+import subprocess
+import sys
+
+# wall-clock import budgets in seconds, generous so slow CI machines pass, tight enough to catch matplotlib or
+# pandas creeping into a path that should not need them
+CLIENT_BUDGET = 1.0
+OWN_MODULES_BUDGET = 0.1
+HEAVY = ('pandas', 'numpy', 'matplotlib', 'sklearn', 'pyarrow')
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+{statement}
+seconds = time.perf_counter() - start
+{code}
+print(json.dumps({{'seconds': seconds, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def _probe(statement, code=''):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', PROBE.format(statement=statement, code=code,
+                                                                                 heavy=HEAVY)],
+                         capture_output=True, text=True, env=env, check=True)
+    result = json.loads(out.stdout)
+    # self time (microseconds) of the package's own modules, third-party imports excluded
+    own = 0
+    for line in out.stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[2].strip().startswith('skinbaron_pkg'):
+            own += int(parts[0].split(':')[1])
+    result['own_seconds'] = own / 1e6
+    return result
+
+
+def test_client_import_is_light():
+    result = _probe('from skinbaron_pkg.src import SkinBaronAPI, AsyncSkinBaronAPI, ResponseCache, METRICS')
+    assert result['loaded'] == []
+    assert result['seconds'] < CLIENT_BUDGET
+    assert result['own_seconds'] < OWN_MODULES_BUDGET
+
+
+def test_analysis_without_plotting_skips_matplotlib():
+    code = """
+import pandas as pd
+from skinbaron_pkg.src import PricePrediction
+df = pd.DataFrame({'itemName': ['A'], 'exteriorName': ['Field-Tested'], 'dopplerPhase': ['-'], 'statTrak': [False],
+                   'souvenir': [False], 'lowestPrice': [10.0], 'quantity': [1], 'url': ['u'],
+                   'price': [[9.0, 11.0, 12.0]], 'dateSold': [['2023-12-01', '2023-12-05', '2023-12-09']]})
+PricePrediction.price_prediction(MarketTrends.price_trend(df, plot=False), today='2023-12-10')
+"""
+    result = _probe('from skinbaron_pkg.src import DataProcessor, ItemFilter, Report_generator, MarketTrends', code)
+    assert 'matplotlib' not in result['loaded'] and 'sklearn' not in result['loaded']
+    assert result['own_seconds'] < OWN_MODULES_BUDGET
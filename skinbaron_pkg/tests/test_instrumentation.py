@@ -0,0 +1,97 @@
+import json
+import time
+import pytest
+from skinbaron_pkg.src.instrumentation import Histogram, Metrics, METRICS, instrumented
+from skinbaron_pkg.src.simulator import SyntheticMarket, SimulatorServer
+from skinbaron_pkg.src.skinbaron_api import SkinBaronAPI
+from skinbaron_pkg.src.dataparsing import DataProcessor
+from skinbaron_pkg.src.data_utils import Report_generator
+from skinbaron_pkg.src.visualization_prediction import MarketTrends, PricePrediction
+
+
+@pytest.fixture
+def metrics():
+    METRICS.reset()
+    METRICS.enable()
+    yield METRICS
+    METRICS.disable()
+    METRICS.reset()
+
+
+def test_histogram():
+    histogram = Histogram((1, 2, 5))
+    for value in (0.5, 1, 1.5, 3, 10):
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1, 1]
+    assert histogram.to_dict()['buckets'] == {'1': 2, '2': 3, '5': 4, '+Inf': 5}
+    assert histogram.min == 0.5 and histogram.max == 10 and histogram.sum == 16
+    assert 1 <= histogram.quantile(0.5) <= 2
+    assert Histogram((1,)).quantile(0.5) is None
+
+
+def test_requests_and_stages_recorded(metrics):
+    metrics.enable(memory=True)
+    market = SyntheticMarket(items=300, end='2024-01-01')
+    with SimulatorServer(market, rate_limit=20, burst=1, retry_after=None) as server:
+        api = SkinBaronAPI('key', 'app', base_url=server.url, max_retries=20, backoff_factor=0.02)
+        api.newest_items(10)
+        api.newest_items(10)  # first attempt gets a 429
+        report = Report_generator('key', 'app')
+        merged = report.newestsales_df_pipeline(lambda api_key, app_id: api, DataProcessor.json_to_dataframe,
+                                                lambda p, d: report.cheapest(p, d, verbose=False),
+                                                report.separate_item_and_condition, 'key', 'app', 'Doppler',
+                                                False, False)
+    PricePrediction.price_prediction(MarketTrends.price_trend(merged, plot=False), today='2024-01-01')
+
+    snapshot = metrics.to_dict()
+    counters = {(c['name'], tuple(sorted(c['labels'].items()))): c['value'] for c in snapshot['counters']}
+    assert counters[('skinbaron_responses_total', (('endpoint', 'NewestItems'), ('status', '200')))] == 2
+    assert counters[('skinbaron_responses_total', (('endpoint', 'NewestItems'), ('status', '429')))] >= 1
+    assert counters[('skinbaron_responses_total', (('endpoint', 'GetPriceList'), ('status', '200')))] == 1
+    histograms = {(h['name'], tuple(h['labels'].values())): h for h in snapshot['histograms']}
+    # every attempt is measured, the 429s included
+    requests = sum(value for (name, labels), value in counters.items() if ('endpoint', 'GetNewestSales30Days') in labels)
+    assert histograms[('skinbaron_request_seconds', ('GetNewestSales30Days',))]['count'] == requests
+    assert histograms[('skinbaron_response_bytes', ('GetPriceList',))]['max'] > 10000
+    for stage in ('json_to_dataframe', 'newestsales_df_pipeline', 'price_trend', 'price_prediction'):
+        assert histograms[('skinbaron_stage_seconds', (stage,))]['count'] >= 1
+    assert histograms[('skinbaron_stage_seconds', ('json_to_dataframe',))]['count'] == 2
+    peaks = {g['labels']['stage']: g['value'] for g in snapshot['gauges']}
+    # the pipeline's peak includes the parsing it does
+    assert peaks['newestsales_df_pipeline'] >= peaks['json_to_dataframe'] > 0
+    json.loads(metrics.to_json())
+
+    text = metrics.to_prometheus()
+    assert '# TYPE skinbaron_request_seconds histogram' in text
+    assert 'skinbaron_request_seconds_bucket{endpoint="NewestItems",le="+Inf"} ' in text
+    assert 'skinbaron_responses_total{endpoint="NewestItems",status="429"}' in text
+    assert 'skinbaron_stage_peak_bytes{stage="price_trend"}' in text
+
+
+def test_stage_errors_and_labels_escaped():
+    metrics = Metrics(enabled=True)
+    with pytest.raises(ValueError):
+        with metrics.stage('bad "stage"'):
+            raise ValueError()
+    text = metrics.to_prometheus()
+    assert 'skinbaron_stage_errors_total{stage="bad \\"stage\\""} 1' in text
+    assert Metrics().stage('x').__class__.__name__ == '_NoOp'
+
+
+def test_disabled_overhead_is_small():
+    def raw():
+        return 1
+
+    wrapped = instrumented('noop')(raw)
+    assert not METRICS.enabled
+    calls = 200000
+    start = time.perf_counter()
+    for _ in range(calls):
+        raw()
+    raw_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(calls):
+        wrapped()
+    wrapped_seconds = time.perf_counter() - start
+    assert (wrapped_seconds - raw_seconds) / calls < 2e-6
+    assert not METRICS.histograms
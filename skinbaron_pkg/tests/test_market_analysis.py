@@ -6,24 +6,31 @@ from skinbaron_pkg.src.skinbaron_api import SkinBaronAPI
 from skinbaron_pkg.src.dataparsing import DataProcessor as dp
 api_key = " "
 app_id = " "
-api = SkinBaronAPI(api_key, app_id)
-newitems = api.newest_items(size=100)
-bestdeals = api.best_deals(size=100)
-newitems_df = dp.json_to_dataframe(newitems)
-bestdeals_df = dp.json_to_dataframe(bestdeals)
 
-def test_filter_items_no_params():
+
+@pytest.fixture(scope="module")
+def live_frames():
+    api = SkinBaronAPI(api_key, app_id)
+    newitems = api.newest_items(size=100)
+    bestdeals = api.best_deals(size=100)
+    return dp.json_to_dataframe(newitems), dp.json_to_dataframe(bestdeals)
+
+
+def test_filter_items_no_params(live_frames):
+    newitems_df, bestdeals_df = live_frames
     item_filter = ItemFilter(newitems_df, bestdeals_df)
     filtered_df = item_filter.filter_items()
     assert not filtered_df.empty
     assert len(filtered_df) == len(newitems_df) + len(bestdeals_df)
 
-def test_filter_items_by_name():
+def test_filter_items_by_name(live_frames):
+    newitems_df, bestdeals_df = live_frames
     item_filter = ItemFilter(newitems_df, bestdeals_df)
     filtered_df = item_filter.filter_items(itemName= 'SG 553 | Bleached')
     assert all(filtered_df['itemName'] == 'SG 553 | Bleached')
 
-def test_filter_items_by_rarity_and_exterior():
+def test_filter_items_by_rarity_and_exterior(live_frames):
+    newitems_df, bestdeals_df = live_frames
     item_filter = ItemFilter(newitems_df, bestdeals_df)
     filtered_df = item_filter.filter_items(rarityName='Consumer Grade', exteriorName='Factory New')
     assert not filtered_df.empty
@@ -31,3 +38,107 @@ def test_filter_items_by_rarity_and_exterior():
     assert all(filtered_df['exteriorName'] == 'Factory New')
 
 
+def _listings(n, offset=0, seed=0):
+    rng = np.random.default_rng(seed)
+    stickers = ['Dust II (Gold)', 'IEM (Gold) | Rio 2022', 'Crown (Foil)', 'Howl']
+    rows = []
+    for i in range(offset, offset + n):
+        count = int(rng.integers(0, 5))
+        rows.append({
+            "salesId": f"id{i}",
+            "itemName": ['SG 553 | Bleached', 'M249 | Humidor', 'AK-47 | Redline'][i % 3],
+            "rarityName": ['Consumer Grade', 'Mil-Spec Grade'][i % 2],
+            "exteriorName": ['Factory New', 'Battle-Scarred', 'Field-Tested'][i % 3],
+            "variantTypeName": 'Rifle',
+            "isSouvenir": bool(i % 5 == 0),
+            "itemPrice": round(float(rng.uniform(0.03, 50)), 2),
+            "wear": float(rng.uniform(0, 10)),
+            "isWearPrecise": True,
+            "stackable": False,
+            "tradeLockHoursLeft": float(rng.integers(0, 168)),
+            "stickers": [{"localizedName": name} for name in rng.choice(stickers, count)] if count else None,
+        })
+    return pd.DataFrame(rows)
+
+
+def test_filter_items_offline_matches_row_by_row():
+    newitems_df = _listings(300)
+    bestdeals_df = _listings(300, offset=200, seed=1)
+    item_filter = ItemFilter(newitems_df, bestdeals_df)
+    merged = item_filter.merged_df
+    assert len(merged) == 500
+    assert not any(column.endswith(('_x', '_y')) for column in merged.columns)
+
+    wanted = ['Dust II (Gold)', 'Howl']
+    filtered = item_filter.filter_items(exteriorName='Factory New', sticker_list=wanted)
+    expected = [i for i, row in merged.iterrows()
+                if row['exteriorName'] == 'Factory New' and row['sticker_list'] is not None
+                and set(wanted).issubset(row['sticker_list'])]
+    assert list(filtered.index) == expected
+    assert len(expected) > 0
+
+    filtered = item_filter.filter_items(wear=3, tradeLockHoursLeft=merged['tradeLockHoursLeft'].iloc[0])
+    assert (np.around(filtered['wear']) == 3).all()
+    # the merged frame is shared between calls and must not be rounded in place
+    assert not (merged['wear'] == np.around(merged['wear'])).all()
+
+    assert item_filter.filter_items(sticker_count=0)['sticker_list'].isna().all()
+    assert item_filter.filter_items(sticker_list=['No Such Sticker']).empty
+
+
+def test_filter_items_offline_categorical_columns():
+    newitems_df = dp.apply_schema(_listings(50), 'NewestItems')
+    bestdeals_df = dp.apply_schema(_listings(50, offset=25), 'BestDeals')
+    item_filter = ItemFilter(newitems_df, bestdeals_df)
+    filtered = item_filter.filter_items(itemName='M249 | Humidor', isSouvenir=False)
+    assert len(filtered) > 0
+    assert (filtered['itemName'] == 'M249 | Humidor').all()
+    assert item_filter.filter_items(rarityName='Covert').empty
+
+
+def test_filter_items_range_and_in_predicates():
+    newitems_df = dp.apply_schema(_listings(400), 'NewestItems')
+    bestdeals_df = dp.apply_schema(_listings(400, offset=300, seed=3), 'BestDeals')
+    item_filter = ItemFilter(newitems_df, bestdeals_df)
+    merged = item_filter.merged_df
+
+    filtered = item_filter.filter_items(itemPrice_between=(5, 20), wear_below=4.5, tradeLockHoursLeft_max=100,
+                                        exteriorName_in=['Factory New', 'Field-Tested'],
+                                        where=[('sticker_count', '>=', 1)])
+    expected = merged[(merged['itemPrice'] >= 5) & (merged['itemPrice'] <= 20) & (merged['wear'] < 4.5)
+                      & (merged['tradeLockHoursLeft'] <= 100)
+                      & merged['exteriorName'].isin(['Factory New', 'Field-Tested'])
+                      & (merged['sticker_count'] >= 1)]
+    assert len(expected) > 0
+    assert list(filtered.index) == list(expected.index)
+
+    # float32 prices match the value they were parsed from
+    price = float(newitems_df['itemPrice'].iloc[0])
+    assert len(item_filter.filter_items(itemPrice=round(price, 2))) >= 1
+    assert item_filter.filter_items(rarityName_in=['Covert']).empty
+
+
+def test_plan_orders_by_selectivity():
+    item_filter = ItemFilter(_listings(300), _listings(300, offset=300, seed=4))
+    plan = item_filter.plan([('exteriorName', 'in', ['Factory New', 'Battle-Scarred']),
+                             ('itemPrice', 'between', (1, 2)),
+                             ('rarityName', '==', 'Consumer Grade')])
+    counts = [count for _, count in plan]
+    assert counts == sorted(counts)
+    assert plan[0][0][0] == 'itemPrice'
+    assert counts[-1] == 400
+
+    with pytest.raises(ValueError):
+        item_filter.filter_items(where=[('rarityName', '<', 'Covert')])
+
+
+def test_repeated_in_values_and_inverted_between():
+    item_filter = ItemFilter(_listings(300), _listings(300, offset=300, seed=5))
+    once = item_filter.filter_items(exteriorName_in=['Factory New'])
+    twice = item_filter.filter_items(exteriorName_in=['Factory New', 'Factory New'])
+    assert len(once) > 0
+    assert list(twice.index) == list(once.index)
+
+    plan = item_filter.plan([('itemPrice', 'between', (20, 5)), ('rarityName', '==', 'Consumer Grade')])
+    assert plan[0][1] == 0
+    assert item_filter.filter_items(itemPrice_between=(20, 5)).empty
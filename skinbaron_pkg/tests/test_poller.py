@@ -0,0 +1,112 @@
+import asyncio
+import pytest
+from skinbaron_pkg.src.poller import NewestItemsPoller, SeenSet
+from skinbaron_pkg.src.skinbaron_api import SkinBaronConnectionError
+from conftest import FakeClock
+
+
+def _listing(sales_id, price=10.0, rarity='Covert'):
+    return {'salesId': str(sales_id), 'itemName': 'AK-47 | Redline', 'itemPrice': price, 'rarityName': rarity,
+            'exteriorName': 'Field-Tested', 'stickers': []}
+
+
+class FakeFeed:
+    """Serves scripted NewestItems responses, newest listing first; an exception in the script is raised."""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.calls = 0
+
+    def newest_items(self, size):
+        self.calls += 1
+        response = self.script.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return {'newestItems': response[:size]}
+
+
+def test_seen_set_is_bounded():
+    seen = SeenSet(capacity=3)
+    assert [seen.add(i) for i in (1, 2, 1, 3, 4)] == [True, True, False, True, True]
+    assert 2 not in seen and 1 in seen and len(seen) == 3
+
+
+def test_poller_emits_only_new_listings_and_adapts():
+    window = [_listing(i) for i in range(10, 0, -1)]
+    script = [window, window, [_listing(11), _listing(12)] + window[:8], window[:10],
+              [_listing(i) for i in range(100, 90, -1)]]
+    clock = FakeClock()
+    poller = NewestItemsPoller(FakeFeed(script), size=10, min_interval=1, max_interval=60, clock=clock,
+                               sleep=clock.sleep)
+    batches = list(poller.listings(max_polls=5))
+    assert [len(batch) for batch in batches] == [10, 2, 10]
+    assert batches[1]['salesId'].tolist() == ['11', '12']
+    assert poller.polls == 5 and poller.emitted == 22
+    # nothing new on the second and fourth poll doubled the interval; the fully new fifth window snapped it back
+    assert poller.overflows == 1
+    assert poller.interval == 1
+    assert poller.rate > 0
+
+
+def test_poller_interval_follows_arrival_rate():
+    clock = FakeClock()
+    poller = NewestItemsPoller(None, size=100, min_interval=1, max_interval=600, fill_target=0.5, smoothing=1.0,
+                               clock=clock)
+    poller.process({'newestItems': [_listing(i) for i in range(100)]})
+    clock.now += 10
+    poller.process({'newestItems': [_listing(i) for i in range(5, 105)]})
+    # 5 new listings in 10 s: half a window of 100 takes 100 s
+    assert poller.rate == pytest.approx(0.5)
+    assert poller.interval == pytest.approx(100)
+
+
+def test_poller_filters_and_errors():
+    script = [[_listing(1, 5.0), _listing(2, 80.0), _listing(3, 6.0, 'Mil-Spec Grade')],
+              SkinBaronConnectionError("down", endpoint="NewestItems"),
+              [_listing(4, 7.0)]]
+    clock = FakeClock()
+    poller = NewestItemsPoller(FakeFeed(script), min_interval=1, clock=clock, sleep=clock.sleep,
+                               filters={'itemPrice_between': (0, 50), 'rarityName_in': ['Covert']})
+    batches = list(poller.listings(max_polls=3))
+    assert [batch['salesId'].tolist() for batch in batches] == [['1'], ['4']]
+    assert poller.errors == 1
+
+
+def test_poller_counts_unparseable_listings_as_errors(monkeypatch):
+    monkeypatch.setattr('skinbaron_pkg.src.poller.DataProcessor.json_to_dataframe', lambda json, endpoint=None: None)
+    clock = FakeClock()
+    poller = NewestItemsPoller(FakeFeed([[_listing(1)], [_listing(2)]]), clock=clock, sleep=clock.sleep)
+    assert list(poller.listings(max_polls=2)) == []
+    assert poller.errors == 2 and poller.emitted == 0
+
+
+def test_poller_retries_listings_after_a_parse_failure(monkeypatch):
+    from skinbaron_pkg.src.dataparsing import DataProcessor
+    parse = DataProcessor.json_to_dataframe
+    calls = []
+
+    def flaky(json, endpoint=None):
+        calls.append(json)
+        return None if len(calls) == 1 else parse(json, endpoint=endpoint)
+
+    monkeypatch.setattr('skinbaron_pkg.src.poller.DataProcessor.json_to_dataframe', flaky)
+    clock = FakeClock()
+    poller = NewestItemsPoller(FakeFeed([[_listing(1), _listing(2)], [_listing(3), _listing(1), _listing(2)]]),
+                               clock=clock, sleep=clock.sleep)
+    batches = list(poller.listings(max_polls=2))
+    assert [batch['salesId'].tolist() for batch in batches] == [['3', '1', '2']]
+    assert poller.errors == 1 and poller.new_items == 3
+
+
+def test_poller_async_iterator():
+    script = [[_listing(1)], [_listing(2), _listing(1)]]
+
+    class AsyncFeed(FakeFeed):
+        async def newest_items(self, size):
+            return FakeFeed.newest_items(self, size)
+
+    async def collect():
+        poller = NewestItemsPoller(AsyncFeed(script), min_interval=0, max_interval=0)
+        return [batch['salesId'].tolist() async for batch in poller.alistings(max_polls=2)]
+
+    assert asyncio.run(collect()) == [['1'], ['2']]
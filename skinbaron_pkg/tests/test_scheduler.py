@@ -0,0 +1,122 @@
+import threading
+import pytest
+from skinbaron_pkg.src.scheduler import RequestScheduler, PRIORITIES
+from skinbaron_pkg.src.instrumentation import Metrics
+from skinbaron_pkg.src.simulator import SyntheticMarket, SimulatorServer
+from skinbaron_pkg.src.skinbaron_api import SkinBaronAPI, SkinBaronHTTPError
+
+
+class RecordingClient:
+    calls = []
+    lock = threading.Lock()
+    # set to an Event to hold every call until it is set
+    gate = None
+    started = None
+
+    def __init__(self, api_key, app_id):
+        self.app_id = app_id
+
+    def newest_items(self, size):
+        with self.lock:
+            self.calls.append((self.app_id, size))
+        if self.gate is not None:
+            self.started.set()
+            self.gate.wait(5)
+        if size < 0:
+            raise SkinBaronHTTPError('bad size', 'NewestItems', 400)
+        return {'newestItems': [], 'size': size}
+
+
+class QuotaLimiter:
+    """
+    Grants a fixed number of tokens and then none, so dispatching does not depend on the wall clock.
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.lock = threading.Lock()
+
+    def try_acquire(self, tokens=1):
+        with self.lock:
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0.0
+            return 1.0
+
+
+@pytest.fixture
+def calls():
+    RecordingClient.calls = []
+    yield RecordingClient.calls
+    RecordingClient.gate = RecordingClient.started = None
+
+
+def test_interactive_goes_before_queued_bulk(calls):
+    RecordingClient.gate, RecordingClient.started = threading.Event(), threading.Event()
+    with RequestScheduler([('key', 'a')], rate_limit=1000, burst=100, workers=1,
+                          client_factory=RecordingClient) as scheduler:
+        bulk = [scheduler.submit('newest_items', 100, priority='bulk')]
+        # the only worker is now busy, everything below has to queue
+        assert RecordingClient.started.wait(5)
+        bulk += [scheduler.submit('newest_items', 100 + i, priority='bulk') for i in range(1, 10)]
+        urgent = scheduler.submit('newest_items', 1, priority='interactive')
+        RecordingClient.gate.set()
+        assert urgent.result(timeout=5) == {'newestItems': [], 'size': 1}
+        for future in bulk:
+            future.result(timeout=5)
+    # within a class calls keep their order
+    assert [size for _, size in calls] == [100, 1] + list(range(101, 110))
+    stats = scheduler.queue_stats()['priorities']
+    assert stats['bulk']['completed'] == 10 and stats['bulk']['max_queued'] == 9
+    assert stats['interactive']['wait']['count'] == 1
+
+
+def test_accounts_share_work_within_their_quota(calls):
+    metrics = Metrics(enabled=True)
+    limiters = [QuotaLimiter(5), QuotaLimiter(15)]
+    with RequestScheduler([('k1', 'a'), ('k2', 'b')], limiters=limiters, client_factory=RecordingClient,
+                          metrics=metrics) as scheduler:
+        futures = [scheduler.submit('newest_items', i, priority='bulk') for i in range(20)]
+        for future in futures:
+            future.result(timeout=5)
+    # round robin until account a has used its quota, the rest goes to b
+    assert [limiter.tokens for limiter in limiters] == [0, 0]
+    assert [app_id for app_id, _ in calls].count('a') == 5
+    assert [a['dispatched'] for a in scheduler.queue_stats()['accounts']] == [5, 15]
+    assert 'skinbaron_scheduler_wait_seconds_bucket{priority="bulk",le="+Inf"} 20' in metrics.to_prometheus()
+
+
+def test_errors_cancel_and_shutdown(calls):
+    scheduler = RequestScheduler([('key', 'a')], rate_limit=10, burst=1, workers=1, client_factory=RecordingClient)
+    with pytest.raises(SkinBaronHTTPError):
+        scheduler.submit('newest_items', -1).result(timeout=5)
+    pending = [scheduler.submit('newest_items', i, priority='bulk') for i in range(20)]
+    scheduler.shutdown(cancel_pending=True)
+    assert any(future.cancelled() for future in pending)
+    stats = scheduler.queue_stats()['priorities']
+    assert stats['normal']['failed'] == 1 and stats['bulk']['queued'] == 0
+    with pytest.raises(RuntimeError):
+        scheduler.submit('newest_items', 1)
+    with RequestScheduler([('key', 'a')], client_factory=RecordingClient) as other:
+        with pytest.raises(ValueError):
+            other.submit('stream_price_list')
+        with pytest.raises(ValueError):
+            other.client('urgent')
+    assert PRIORITIES[0] == 'interactive'
+
+
+def test_scheduled_clients_against_simulator():
+    market = SyntheticMarket(items=200, end='2024-01-01')
+    with SimulatorServer(market, rate_limit=10, burst=2, retry_after=None) as server:
+        factory = lambda api_key, app_id: SkinBaronAPI(api_key, app_id, base_url=server.url, max_retries=0)
+        with RequestScheduler([('k1', 'a'), ('k2', 'b')], rate_limit=8, burst=1,
+                              client_factory=factory) as scheduler:
+            bulk = scheduler.client('bulk')
+            sweep = [scheduler.submit('newest_sales_30_days', 'Doppler', False, False, priority='bulk')
+                     for _ in range(10)]
+            deals = scheduler.client('interactive').best_deals(5)
+            assert len(deals['bestDeals']) == 5
+            assert 'lowestPrice' in bulk.get_price_list()['map'][0]
+            # paced below each key's limit, so the server never had to answer 429
+            assert all(future.result(timeout=10)['newestSales30Days'] for future in sweep)
+        assert 429 not in server.stats['statuses'] and '429' not in server.stats['statuses']
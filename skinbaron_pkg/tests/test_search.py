@@ -0,0 +1,78 @@
+import pickle
+import time
+import pandas as pd
+import pytest
+from skinbaron_pkg.src.search import ItemIndex, normalize
+from skinbaron_pkg.src.simulator import SyntheticMarket
+
+NAMES = [
+    'AK-47 | Redline (Field-Tested)',
+    'StatTrak™ AK-47 | Redline (Field-Tested)',
+    'AK-47 | Redline (Minimal Wear)',
+    'AWP | Asiimov (Battle-Scarred)',
+    '★ Karambit | Doppler (Factory New)',
+    '★ StatTrak™ Karambit | Doppler (Factory New)',
+    'M4A1-S | Hyper Beast (Well-Worn)',
+]
+
+
+@pytest.fixture
+def index():
+    return ItemIndex(NAMES)
+
+
+def test_normalize():
+    assert normalize('★ StatTrak™ Karambit | Doppler (Factory New)') == 'stattrak karambit doppler factory new'
+
+
+def test_exact_prefix_and_typos(index):
+    assert index.search('AK-47 | Redline (Field-Tested)')[0] == 'AK-47 | Redline (Field-Tested)'
+    assert index.search('ak redline ft') == ['AK-47 | Redline (Field-Tested)', 'StatTrak™ AK-47 | Redline (Field-Tested)']
+    assert index.search('redl mw') == ['AK-47 | Redline (Minimal Wear)']
+    assert index.search('ak47 redlnie', limit=1) == ['AK-47 | Redline (Field-Tested)']
+    assert index.resolve('karambit dopler fn') == '★ Karambit | Doppler (Factory New)'
+    assert index.resolve('stattrk karambit') == '★ StatTrak™ Karambit | Doppler (Factory New)'
+    assert index.resolve('m4a1s hyperbeast') is None
+    assert index.resolve('m4a1s hyper beest') == 'M4A1-S | Hyper Beast (Well-Worn)'
+    assert index.search('awp redline') == [] and index.search(' | ') == []
+    # a word of three letters or less has to be exact or a prefix
+    assert index.search('awq') == []
+    assert index.search('ak', prefix=False, limit=None) == index.search('ak47', limit=None)
+
+
+def test_refresh_is_incremental(index):
+    price_list = {'map': [{'marketHashName': name, 'lowestPrice': 1.0} for name in NAMES[1:]] +
+                  [{'marketHashName': 'Glock-18 | Fade (Factory New)', 'lowestPrice': 1.0}]}
+    assert index.refresh(price_list) == (1, 1)
+    assert index.version == 1 and len(index) == len(NAMES)
+    assert 'AK-47 | Redline (Field-Tested)' not in index
+    assert index.search('ak redline ft') == ['StatTrak™ AK-47 | Redline (Field-Tested)']
+    assert index.resolve('glock fade') == 'Glock-18 | Fade (Factory New)'
+    assert index.refresh(pd.DataFrame({'marketHashName': index.names})) == (0, 0) and index.version == 1
+    # removing every name leaves an empty index behind
+    index.refresh([])
+    assert len(index) == 0 and index.search('fade') == [] and not index._postings and not index._grams
+
+
+def test_pickle_roundtrip(index, tmp_path):
+    clone = pickle.loads(pickle.dumps(index))
+    assert clone.search('karambit') == index.search('karambit')
+    path = str(tmp_path / 'items.idx')
+    index.save(path)
+    assert ItemIndex.load(path).resolve('asiimov bs') == 'AWP | Asiimov (Battle-Scarred)'
+    with open(path, 'wb') as fh:
+        pickle.dump({'not': 'an index'}, fh)
+    with pytest.raises(TypeError):
+        ItemIndex.load(path)
+
+
+def test_market_sized_index_is_fast():
+    index = ItemIndex.from_price_list(SyntheticMarket(items=25000, end='2024-01-01').get_price_list())
+    assert len(index) == 25000
+    name = index.names[1234]
+    assert index.resolve(name) == name
+    start = time.perf_counter()
+    for _ in range(100):
+        found = index.search('karambit dopler fn', limit=5)
+    assert found and all('Karambit | Doppler' in name and 'Factory New' in name for name in found)
+    assert (time.perf_counter() - start) / 100 < 0.01
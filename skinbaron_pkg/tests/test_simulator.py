@@ -0,0 +1,95 @@
+import time
+import pytest
+import requests
+from skinbaron_pkg.src.simulator import SyntheticMarket, SimulatorServer, market_hash_names
+from skinbaron_pkg.src.skinbaron_api import SkinBaronAPI, SkinBaronRateLimitError
+from skinbaron_pkg.src.cache import ResponseCache
+from skinbaron_pkg.src.dataparsing import DataProcessor
+from skinbaron_pkg.src.data_utils import Report_generator
+from conftest import FakeClock
+
+api_key = "key"
+app_id = "app"
+
+
+def test_market_is_deterministic():
+    assert len(set(market_hash_names(5000))) == 5000
+    market = SyntheticMarket(items=300, end='2024-01-01')
+    assert market.get_price_list() == SyntheticMarket(items=300, end='2024-01-01').get_price_list()
+    first = market.listings(20, newest=100)['newestItems']
+    later = market.listings(30, newest=110)['newestItems']
+    # the same listing looks the same in every page it appears in
+    assert later[10:] == first
+    sales = market.newest_sales_30_days('doppler', False, False)['newestSales30Days']
+    assert len(sales) == len(market.matching_items('Doppler', False, False)) * market.sales_per_item
+    assert not any('StatTrak™' in sale['itemName'] for sale in sales)
+    stat_trak = [market.names[i] for i in market.matching_items('Doppler', True)]
+    assert stat_trak and all('StatTrak™' in name for name in stat_trak)
+    assert len(market.matching_items('Doppler')) > len(stat_trak)
+    assert all('Doppler' in sale['itemName'] and sale['dopplerPhase'] != '-' for sale in sales)
+    assert min(sale['dateSold'] for sale in sales) > '2023-12-01'
+
+
+def test_client_against_simulator():
+    market = SyntheticMarket(items=500, end='2024-01-01')
+    with SimulatorServer(market, new_listings=3) as server:
+        api = SkinBaronAPI(api_key, app_id, base_url=server.url)
+        assert len(api.get_price_list()['map']) == 500
+        first = api.newest_items(10)['newestItems']
+        second = api.newest_items(10)['newestItems']
+        assert [item['salesId'] for item in second[3:]] == [item['salesId'] for item in first[:7]]
+        assert len(api.best_deals(100)['bestDeals']) == 100
+        response = requests.post(f"{server.url}/BestDeals", json={'size': 101, 'apikey': api_key})
+        assert response.status_code == 400
+        assert requests.post(f"{server.url}/BestDeals", json={'size': 1}).status_code == 403
+    assert server.stats['endpoints'] == {'GetPriceList': 1, 'NewestItems': 2, 'BestDeals': 3}
+    assert server.stats['statuses'] == {200: 4, 400: 1, 403: 1}
+
+
+def test_errors_and_rate_limit():
+    with SimulatorServer(SyntheticMarket(items=50), error_rate=0.5, retry_after=None, seed=3) as server:
+        api = SkinBaronAPI(api_key, app_id, base_url=server.url, max_retries=10, backoff_factor=0.001)
+        for _ in range(10):
+            api.best_deals(5)
+        assert server.stats['statuses'][503] == api.retries > 0
+
+    with SimulatorServer(SyntheticMarket(items=50), rate_limit=4, burst=2) as server:
+        api = SkinBaronAPI(api_key, app_id, base_url=server.url, max_retries=0)
+        api.best_deals(5)
+        api.best_deals(5)
+        with pytest.raises(SkinBaronRateLimitError) as error:
+            api.best_deals(5)
+        assert error.value.retry_after == 1
+        # every API key has its own quota
+        SkinBaronAPI('other', app_id, base_url=server.url).best_deals(5)
+        time.sleep(0.3)
+        api.best_deals(5)
+
+
+def test_price_list_revalidation():
+    market = SyntheticMarket(items=200)
+    clock = FakeClock()
+    cache = ResponseCache(clock=clock)
+    with SimulatorServer(market) as server:
+        api = SkinBaronAPI(api_key, app_id, base_url=server.url, cache=cache)
+        first = api.get_price_list()
+        clock.now += 10 ** 6
+        assert api.get_price_list() == first
+        assert cache.stats()['revalidated'] == 1 and server.stats['statuses'] == {200: 1, 304: 1}
+        market.reprice(share=0.5)
+        clock.now += 10 ** 6
+        assert api.get_price_list() != first
+
+
+def test_pipeline_against_simulator():
+    market = SyntheticMarket(items=1000, end='2024-01-01')
+    with SimulatorServer(market) as server:
+        report = Report_generator(api_key, app_id)
+        client = lambda api_key, app_id: SkinBaronAPI(api_key, app_id, base_url=server.url)
+        merged = report.newestsales_df_pipeline(client, DataProcessor.json_to_dataframe,
+                                                lambda p, d: report.cheapest(p, d, verbose=False),
+                                                report.separate_item_and_condition, api_key, app_id,
+                                                'Gamma Doppler', False, False)
+    assert len(merged) == len(market.matching_items('Gamma Doppler', False, False))
+    assert merged['lowestPrice'].notna().all()
+    assert (merged['price'].map(len) == market.sales_per_item).all()
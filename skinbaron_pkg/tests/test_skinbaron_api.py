@@ -1,5 +1,6 @@
 import pytest
-from skinbaron_pkg.src.skinbaron_api import SkinBaronAPI
+from skinbaron_pkg.src.skinbaron_api import (SkinBaronAPI, SkinBaronHTTPError, SkinBaronRateLimitError,
+                                              SkinBaronConnectionError)
 
 api_key = " "
 app_id = " "
@@ -29,3 +30,50 @@ def test_newest_sales_30_days():
     response = api.newest_sales_30_days(item_name, stat_trak, souvenir)
     assert isinstance(response, dict)
     assert 'newestSales30Days' in response
+
+
+def _stub_api(server, **kwargs):
+    return SkinBaronAPI(api_key, app_id, base_url=server.url, backoff_factor=0, **kwargs)
+
+
+def test_post_request_reuses_connection(stub_server):
+    stub_server.script = [(200, {}, {"newestItems": []})]
+    stub_api = _stub_api(stub_server)
+    for _ in range(3):
+        assert stub_api.newest_items(10) == {"newestItems": []}
+    stats = stub_api.connection_stats()
+    assert stats["requests"] == 3
+    assert stats["new_connections"] == 1
+    assert stats["reused_connections"] == 2
+    assert stub_server.received[0] == {"size": 10, "apikey": api_key, "appId": app_id}
+
+
+def test_post_request_retries_rate_limit(stub_server):
+    stub_server.script = [(429, {'Retry-After': '0'}, {}), (503, {}, {}), (200, {}, {"bestDeals": []})]
+    stub_api = _stub_api(stub_server)
+    assert stub_api.best_deals(10) == {"bestDeals": []}
+    assert stub_api.connection_stats()["retries"] == 2
+
+
+def test_post_request_raises_typed_errors(stub_server):
+    stub_server.script = [(429, {'Retry-After': '0'}, {})]
+    with pytest.raises(SkinBaronRateLimitError) as excinfo:
+        _stub_api(stub_server, max_retries=1).best_deals(10)
+    assert excinfo.value.retry_after == 0
+
+    stub_server.script = [(403, {}, {"message": "wrong apikey"})]
+    with pytest.raises(SkinBaronHTTPError) as excinfo:
+        _stub_api(stub_server).get_price_list()
+    assert excinfo.value.status_code == 403
+    assert excinfo.value.endpoint == "GetPriceList"
+
+    closed = SkinBaronAPI(api_key, app_id, base_url="http://127.0.0.1:1", max_retries=0)
+    with pytest.raises(SkinBaronConnectionError):
+        closed.newest_items(10)
+
+
+def test_post_request_does_not_wait_past_backoff_max(stub_server):
+    stub_server.script = [(429, {'Retry-After': '120'}, {}), (200, {}, {"bestDeals": []})]
+    with pytest.raises(SkinBaronRateLimitError) as excinfo:
+        _stub_api(stub_server, backoff_max=5).best_deals(10)
+    assert excinfo.value.retry_after == 120 and len(stub_server.received) == 1
@@ -0,0 +1,77 @@
+import pytest
+import numpy as np
+import pandas as pd
+from skinbaron_pkg.src.timeseries import TimeSeriesStore
+from skinbaron_pkg.src.visualization_prediction import PricePrediction
+
+
+def _sales(items):
+    return pd.DataFrame({
+        'itemName': [item[0] for item in items],
+        'exteriorName': ['Factory New'] * len(items),
+        'dopplerPhase': [None] * len(items),
+        'dateSold': [item[1] for item in items],
+        'price': [item[2] for item in items],
+    })
+
+
+def test_append_keeps_series_sorted():
+    store = TimeSeriesStore()
+    key = store.make_key('AK-47 | Redline', 'Field-Tested', float('nan'))
+    assert key == ('AK-47 | Redline', 'Field-Tested', None)
+    sales = [('2023-01-03', 3.0), ('2023-01-01', 1.0), ('2023-01-04', 4.0), ('2023-01-02', 2.0)]
+    sales += [('2023-01-%02d' % (day % 28 + 1), float(day)) for day in range(5, 40)]
+    store.append(key, [sales[0][0], sales[1][0]], [sales[0][1], sales[1][1]])
+    for date, price in sales[2:]:
+        store.append(key, [date], [price])
+    timestamps, prices = store.get(key)
+    expected = sorted((pd.Timestamp(date), price) for date, price in sales)
+    assert list(zip(pd.DatetimeIndex(timestamps), prices.tolist())) == expected
+    with pytest.raises(ValueError):
+        prices[0] = 0.0
+
+
+def test_ingest_replaces_overlapping_windows():
+    store = TimeSeriesStore()
+    first = _sales([('Item1', ['2023-01-01', '2023-01-02'], [10.0, 11.0]),
+                    ('Item2', "['2023-01-01', '2023-01-03']", "[20.0, 21.0]")])
+    original_lists = first['dateSold'].iloc[0]
+    assert store.ingest(first) == {('Item1', 'Factory New', None), ('Item2', 'Factory New', None)}
+    assert original_lists == ['2023-01-01', '2023-01-02']
+    store.mark_clean()
+
+    # the next fetch overlaps the first one: only Item1 got a new sale
+    second = _sales([('Item1', ['2023-01-02', '2023-01-04'], [11.0, 12.0]),
+                     ('Item2', ['2023-01-01', '2023-01-03'], [20.0, 21.0])])
+    assert store.ingest(second) == {('Item1', 'Factory New', None)}
+    assert store.dirty() == {('Item1', 'Factory New', None)}
+    assert store.get(('Item1', 'Factory New', None))[1].tolist() == [10.0, 11.0, 12.0]
+
+    frame = store.to_frame()
+    assert frame['price'].tolist() == [[10.0, 11.0, 12.0], [20.0, 21.0]]
+    assert frame['label'].iloc[0] == 'Item1 | Factory New None'
+
+
+def test_predict_refits_only_changed_items():
+    store = TimeSeriesStore()
+    store.ingest(_sales([('Item%d' % i, ['2023-01-01', '2023-01-02', '2023-01-04'], [10.0 + i, 11.0 + i, 13.0 + i])
+                         for i in range(5)]))
+    first = store.predict(today='2023-01-05')
+    assert store.last_refitted == 5
+    assert first['predicted_price_7_days'].iloc[0] == pytest.approx(21.0)
+
+    frame = store.to_frame()
+    for column in ['statTrak', 'souvenir', 'lowestPrice', 'quantity', 'url']:
+        frame[column] = None
+    expected = PricePrediction.price_prediction(frame, today='2023-01-05')
+    np.testing.assert_allclose(first['predicted_price_7_days'], expected['predicted_price_7_days'])
+
+    store.append(store.make_key('Item3', 'Factory New'), ['2023-01-05'], [30.0])
+    second = store.predict(today='2023-01-05')
+    assert store.last_refitted == 1
+    assert second['predicted_price_7_days'].iloc[0] == first['predicted_price_7_days'].iloc[0]
+    assert second['predicted_price_7_days'].iloc[3] > first['predicted_price_7_days'].iloc[3]
+    assert second['fit_n'].tolist() == [3, 3, 3, 4, 3]
+
+    store.predict(today='2023-01-06', level=0.9)
+    assert store.last_refitted == 5
@@ -34,3 +34,88 @@ def test_price_prediction():
     # print("!!!!!!!!!!!!", type(processed_df['predicted_price_7_days'].iloc[0]))
     assert isinstance(processed_df['predicted_price_7_days'].iloc[0], np.float64)
 
+
+def _per_row_predictions(df, today):
+    from sklearn.linear_model import LinearRegression
+    prediction_date = pd.to_datetime(today) + pd.Timedelta(days=7)
+    predictions = []
+    for dates, prices in zip(df['dateSold'], df['price']):
+        dates = [pd.to_datetime(date) for date in dates]
+        days = np.array([(date - dates[0]).days for date in dates]).reshape(-1, 1)
+        model = LinearRegression().fit(days, prices)
+        predictions.append(model.predict([[(prediction_date - dates[0]).days]])[0])
+    return np.array(predictions)
+
+def test_price_prediction_matches_per_row_regression():
+    rng = np.random.default_rng(3)
+    rows = []
+    for i in range(50):
+        n = int(rng.integers(1, 12))
+        start = pd.Timestamp('2023-01-01') + pd.Timedelta(days=int(rng.integers(0, 30)))
+        offsets = np.sort(rng.integers(0, 40, size=n))
+        rows.append({'dateSold': [str((start + pd.Timedelta(days=int(o), hours=int(rng.integers(0, 24)))).date()) for o in offsets],
+                     'price': list(np.round(rng.uniform(1, 500, size=n), 2))})
+    rows.append({'dateSold': ['2023-02-01', '2023-02-01'], 'price': [10.0, 14.0]})
+    df = pd.DataFrame(rows)
+    for column in ['itemName', 'exteriorName', 'dopplerPhase', 'statTrak', 'souvenir', 'lowestPrice', 'quantity', 'url', 'label']:
+        df[column] = None
+
+    expected = _per_row_predictions(df, '2023-03-01')
+    result = PricePrediction.price_prediction(df, today='2023-03-01')
+    np.testing.assert_allclose(result['predicted_price_7_days'].to_numpy(), expected, rtol=1e-9, atol=1e-6)
+    assert result['predicted_price_7_days'].iloc[-1] == 12.0
+    assert result['fit_n'].tolist() == [len(prices) for prices in df['price']]
+
+def test_price_prediction_diagnostics():
+    df = pd.DataFrame({'dateSold': [['2023-01-01', '2023-01-02', '2023-01-03'], "['2023-01-01', '2023-01-03', '2023-01-04']"],
+                       'price': [[10, 12, 14], "[5.0, 9.0, 5.0]"]})
+    for column in ['itemName', 'exteriorName', 'dopplerPhase', 'statTrak', 'souvenir', 'lowestPrice', 'quantity', 'url', 'label']:
+        df[column] = None
+    result = PricePrediction.price_prediction(df, today='2023-01-03')
+    assert result['predicted_price_7_days'].iloc[0] == pytest.approx(28.0)
+    assert result['fit_r2'].iloc[0] == pytest.approx(1.0)
+    assert result['fit_resid_std'].iloc[0] == pytest.approx(0.0)
+    assert 0.0 <= result['fit_r2'].iloc[1] < 1.0
+    assert result['fit_resid_std'].iloc[1] > 0
+
+def _sales_frame(n_items):
+    return pd.DataFrame({
+        'dateSold': [['2023-01-01', '2023-01-0%d' % (2 + i % 5)] for i in range(n_items)],
+        'price': [[100.0 + i, 110.0 + i] for i in range(n_items)],
+        'lowestPrice': [105.0 + i for i in range(n_items)],
+        'itemName': ['Item%d' % i for i in range(n_items)],
+        'exteriorName': ['Factory New'] * n_items,
+        'dopplerPhase': [None] * n_items,
+    })
+
+def test_price_trend_without_plot(monkeypatch):
+    import matplotlib.pyplot as plt
+    monkeypatch.setattr(plt, 'show', lambda *args, **kwargs: pytest.fail('plt.show called'))
+    trend_df = MarketTrends.price_trend(_sales_frame(2), plot=False)
+    assert trend_df['label'].tolist() == ['Item0 | Factory New None', 'Item1 | Factory New None']
+    assert MarketTrends.compute_trend(_sales_frame(2))['price'].tolist() == trend_df['price'].tolist()
+
+@pytest.mark.parametrize('fmt, processes', [('png', None), ('svg', 2)])
+def test_render_trends(tmp_path, fmt, processes):
+    import matplotlib.pyplot as plt
+    trend_df = MarketTrends.compute_trend(_sales_frame(10))
+    paths = MarketTrends.render_trends(trend_df, str(tmp_path / 'charts'), fmt=fmt, per_figure=4, processes=processes)
+    assert [p.rsplit('/', 1)[-1] for p in paths] == ['price_trends_0000.' + fmt, 'price_trends_0001.' + fmt,
+                                                     'price_trends_0002.' + fmt]
+    with open(paths[0], 'rb') as f:
+        header = f.read(64)
+    assert header.startswith(b'\x89PNG') if fmt == 'png' else b'<?xml' in header
+    assert plt.get_fignums() == []
+    with pytest.raises(ValueError):
+        MarketTrends.render_trends(trend_df, str(tmp_path), fmt='jpg')
+
+def test_price_trend_leaves_input_untouched():
+    sales = _sales_frame(3)
+    before = sales.copy(deep=True)
+    before_lists = [list(dates) for dates in sales['dateSold']]
+    trend_df = MarketTrends.compute_trend(sales)
+    assert [list(dates) for dates in sales['dateSold']] == before_lists
+    assert list(sales.columns) == list(before.columns)
+    assert 'dates' not in trend_df.columns and 'prices' not in trend_df.columns
+    assert [len(prices) for prices in trend_df['price']] == [3, 3, 3]
+    assert trend_df['price'].iloc[0][-1] == 105.0